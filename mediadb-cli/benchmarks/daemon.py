@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import tempfile
+import subprocess
+import typing as tp
+import mediadb.cli.client as client
+
+
+"""the request sent, creating a serie document"""
+REQUEST = {"method": "create",
+           "params": {"type": "serie",
+                      "fields": {"title": "Lost",
+                                 "language": "EN",
+                                 "season": 1,
+                                 "episode": 2,
+                                 "file": "/series/Lost/Lost.S01E02.mkv"}}}
+
+
+async def connection(path: str, count: int, latencies: tp.List[float]) \
+    -> None:
+    """
+    Sends requests one after the other on a connection.
+    Args:
+        path: the daemon socket path.
+        count: the number of requests.
+        latencies: where to append the request latencies, in seconds.
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    data = client.encode(REQUEST)
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(data)
+        size, = client.HEADER.unpack(
+                    await reader.readexactly(client.HEADER.size))
+        answer = json.loads(await reader.readexactly(size))
+        latencies.append(time.perf_counter() - start)
+        assert("result" in answer)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(path: str, connections: int, count: int) \
+    -> tp.List[float]:
+    """
+    Sends requests on concurrent connections.
+    Args:
+        path: the daemon socket path.
+        connections: the number of connections.
+        count: the number of requests per connection.
+    Returns: the request latencies, in seconds.
+    """
+    latencies = []
+    await asyncio.gather(*(connection(path, count, latencies)
+                           for _ in range(connections)))
+    return latencies
+
+
+def main(connections: int, count: int) \
+    -> None:
+    """
+    Starts a daemon and measures its throughput and latency under
+    concurrent connections.
+    Args:
+        connections: the number of concurrent connections.
+        count: the number of requests per connection.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "mediadb.sock")
+    daemon = subprocess.Popen([sys.executable, "-m", "mediadb.cli", "serve",
+                               "--socket", path],
+                              stderr=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.01)
+        start = time.perf_counter()
+        latencies = sorted(asyncio.run(run(path, connections, count)))
+        elapsed = time.perf_counter() - start
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    print(f"{len(latencies)} requests on {connections} connections: "
+          f"{len(latencies) / elapsed:.0f} requests/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+          f"p99 {latencies[len(latencies) * 99 // 100] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100)
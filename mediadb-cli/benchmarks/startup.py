@@ -0,0 +1,63 @@
+import sys
+import time
+import subprocess
+import typing as tp
+
+
+"""the maximum time the CLI may take to print its help, in seconds, on
+top of the time the interpreter takes to start"""
+BUDGET = 0.050
+
+"""the maximum time the CLI may take to print the help of a command, which
+imports its module, on top of the time the interpreter takes to start"""
+COMMAND_BUDGET = 0.080
+
+
+def run(commands: tp.List[tp.List[str]], count: int) \
+    -> tp.List[float]:
+    """
+    Times commands, one run of each in turn, such that a slower period
+    of the machine slows them all rather than one of them.
+    Args:
+        commands: the commands and their arguments.
+        count: the number of runs of each command.
+    Returns: the shortest run time of each command, in seconds, as the
+        least disturbed by the rest of the machine.
+    """
+    times = [[] for _ in commands]
+    for _ in range(count):
+        for args, runs in zip(commands, times):
+            start = time.perf_counter()
+            subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+            runs.append(time.perf_counter() - start)
+    return [min(x) for x in times]
+
+
+def main(count: int) \
+    -> int:
+    """
+    Times the CLI help messages against the interpreter startup, which
+    is not under our control, and checks them against BUDGET and
+    COMMAND_BUDGET.
+    Args:
+        count: the number of runs of each command.
+    Returns: the exit status, 1 if over budget.
+    """
+    cases = (["--help"], ["scan", "--help"], ["find", "--help"])
+    python, *elapsed = run([[sys.executable, "-c", "pass"]] +
+                           [[sys.executable, "-m", "mediadb.cli"] + x
+                            for x in cases],
+                           count)
+    print(f"    python: {python * 1000:.1f}ms")
+    status = 0
+    for args, value in zip(cases, elapsed):
+        value -= python
+        over = value > (BUDGET if len(args) == 1 else COMMAND_BUDGET)
+        status |= over
+        print(f"{' '.join(args):>16}: +{value * 1000:.1f}ms"
+              f"{' over budget' if over else ''}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
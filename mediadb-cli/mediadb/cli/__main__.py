@@ -0,0 +1,4 @@
+import mediadb.cli.main as main
+
+
+main.main()
@@ -0,0 +1,307 @@
+import os
+import sys
+import click
+
+
+"""the media types (see mediadb.models.constants.VideoType), spelled out
+such that the help messages do not import the models"""
+VIDEO_TYPES = ["serie", "movie", "documentary", "unknown"]
+
+"""the accepted language values, for the help messages"""
+LANGUAGES = "an ISO 639 code (e.g. EN or fre), a language name (e.g. " \
+            "French or Français) or unknown"
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(dir_okay=False))
+@click.argument("input",
+                type=click.File("r"),
+                default="-")
+@click.option("--rejects",
+              type=click.File("w"),
+              default=None,
+              help="Where to write the rejected records, stderr by default.")
+def load_documents(database: str,
+                   input,
+                   rejects):
+    """
+    Validates a stream of media documents in JSONL format (stdin by 
+    default) and adds them to the catalogue DATABASE, which is created 
+    if needed. Documents replace those of the same file.
+    """
+    import mediadb.models.ingest as ingest
+    import mediadb.store.catalogue as catalogue
+    if rejects is None:
+        rejects = sys.stderr
+
+    def documents():
+        for document in ingest.validate(ingest.read_jsonl(input)):
+            if isinstance(document, ingest.Reject):
+                rejects.write(document.model_dump_json() + "\n")
+            else:
+                yield document
+
+    with catalogue.Catalogue(database) as c:
+        c.add_many(documents())
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("--title",
+              type=str,
+              default=None,
+              help="The media title")
+@click.option("--type",
+              "video_type",
+              type=click.Choice(VIDEO_TYPES),
+              default=None,
+              help="The media type")
+@click.option("--language",
+              default=None,
+              help=f"The media language, as {LANGUAGES}")
+@click.option("--subtitles",
+              type=str,
+              default=None,
+              help=f"The media subtitle language, as " \
+                   f"{LANGUAGES}")
+@click.option("--season",
+              type=int,
+              default=None,
+              help="The season number")
+@click.option("--min-season",
+              type=int,
+              default=None,
+              help="The first season number")
+@click.option("--max-season",
+              type=int,
+              default=None,
+              help="The last season number")
+@click.option("--episode",
+              type=int,
+              default=None,
+              help="The episode number")
+@click.option("--limit",
+              type=click.IntRange(min=0),
+              default=None,
+              help="The maximum number of documents")
+def find_documents(database: str,
+                   title: str,
+                   video_type: str,
+                   language: str,
+                   subtitles: str,
+                   season: int,
+                   min_season: int,
+                   max_season: int,
+                   episode: int,
+                   limit: int):
+    """
+    Prints the documents of the catalogue DATABASE matching all the 
+    given criteria in JSONL format. 
+    """
+    import mediadb.cli.client as client
+    criteria = {"title": title,
+                "type": video_type,
+                "language": language,
+                "subtitles": subtitles,
+                "season": season,
+                "episode": episode,
+                "min_season": min_season,
+                "max_season": max_season}
+    try:
+        documents = client.request("find",
+                                   {"database": os.path.abspath(database),
+                                    "criteria": criteria,
+                                    "limit": limit})
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    for document in documents:
+        click.echo(document)
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(exists=True, dir_okay=False))
+@click.argument("text",
+                type=str)
+@click.option("--limit",
+              type=click.IntRange(min=1),
+              default=10,
+              help="The maximum number of documents")
+def search_documents(database: str,
+                     text: str,
+                     limit: int):
+    """
+    Prints the documents of the catalogue DATABASE whose title or 
+    episode name best match TEXT, tolerating typos, in JSONL format, 
+    best first.
+    """
+    import mediadb.store.catalogue as catalogue
+    with catalogue.Catalogue(database) as c:
+        for _, document in c.search(text, limit=limit):
+            click.echo(document.model_dump_json())
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(exists=True, dir_okay=False))
+@click.argument("output",
+                type=click.Path(dir_okay=False))
+@click.option("--format",
+              "fmt",
+              type=click.Choice(["parquet", "arrow", "snapshot"]),
+              default="parquet",
+              help="The output format, Parquet, Arrow IPC or a compact "
+                   "binary snapshot.")
+@click.option("--compression",
+              type=click.Choice(["none", "zlib", "zstd"]),
+              default="zlib",
+              help="The block compression of snapshots, zstd requiring "
+                   "zstandard.")
+def export_documents(database: str,
+                     output: str,
+                     fmt: str,
+                     compression: str):
+    """
+    Writes all the documents of the catalogue DATABASE into a columnar 
+    OUTPUT file, e.g. to load them into a dataframe, which requires 
+    pyarrow, or into a binary snapshot.
+    """
+    import mediadb.store.catalogue as catalogue
+    with catalogue.Catalogue(database) as c:
+        if fmt == "snapshot":
+            import mediadb.models.snapshot as snapshot
+            with open(output, "wb") as f:
+                try:
+                    snapshot.write(c, f, compression=compression)
+                except ValueError as e:
+                    raise click.ClickException(str(e))
+        else:
+            # pyarrow is an optional dependency
+            import mediadb.store.columnar as columnar
+            columnar.write(c, output, fmt=fmt)
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(dir_okay=False))
+@click.argument("input",
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("--validate/--no-validate",
+              default=False,
+              help="Whether to validate the documents, which are trusted " \
+                   "by default as written by the export command.")
+def import_documents(database: str,
+                     input: str,
+                     validate: bool):
+    """
+    Adds the documents of a columnar INPUT file, Parquet or Arrow IPC, 
+    which requires pyarrow, or of a binary snapshot, to the catalogue 
+    DATABASE, which is created if needed. Documents replace those of 
+    the same file.
+    """
+    import mediadb.store.catalogue as catalogue
+    import mediadb.models.snapshot as snapshot
+    with open(input, "rb") as f:
+        is_snapshot = f.read(len(snapshot.MAGIC)) == snapshot.MAGIC
+    try:
+        if is_snapshot:
+            with open(input, "rb") as f, \
+                    catalogue.Catalogue(database) as c:
+                c.add_many(x for batch in snapshot.read(f, validate=validate)
+                           for x in batch)
+            return
+        # pyarrow is an optional dependency
+        import mediadb.store.columnar as columnar
+        documents = columnar.read(input, validate=validate)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    with catalogue.Catalogue(database) as c:
+        c.add_many(documents)
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("--processes",
+              type=click.IntRange(min=0),
+              default=os.cpu_count(),
+              help="The number of processes reading the files, 0 to " \
+                   "read them in the main process, one per core by default.")
+@click.option("--full/--sample",
+              default=False,
+              help="Whether to hash the whole files, rather than their " \
+                   "size and samples of their head, middle and tail.")
+@click.option("--all",
+              "everything",
+              is_flag=True,
+              default=False,
+              help="Whether to compute the fingerprints again for the " \
+                   "documents having one.")
+def fingerprint_documents(database: str,
+                          processes: int,
+                          full: bool,
+                          everything: bool):
+    """
+    Computes the content fingerprints of the media files of the 
+    catalogue DATABASE which do not have one yet and records them in 
+    their documents. The files that cannot be read are printed on 
+    stderr.
+    """
+    import mediadb.store.catalogue as catalogue
+    import mediadb.scan.fingerprint as fingerprint
+    with catalogue.Catalogue(database) as c:
+        files = [x.file for x in c if everything or x.fingerprint is None]
+        fingerprints = []
+        for file, value in fingerprint.fingerprint_many(files,
+                                                        processes=processes,
+                                                        full=full):
+            if value is None:
+                click.echo(f"cannot read {file}", err=True)
+            else:
+                fingerprints.append((file, value))
+        c.set_fingerprints(fingerprints)
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(exists=True, dir_okay=False))
+def duplicate_documents(database: str):
+    """
+    Prints the groups of documents of the catalogue DATABASE whose 
+    media files have the same content, as told by their fingerprints 
+    (see the fingerprint command), one JSON array per line.
+    """
+    import json
+    import mediadb.store.catalogue as catalogue
+    with catalogue.Catalogue(database) as c:
+        for group in c.duplicates():
+            click.echo(json.dumps([x.model_dump(mode="json")
+                                   for x in group]))
+
+
+@click.command()
+@click.argument("database",
+                type=click.Path(dir_okay=False))
+@click.option("--host",
+              type=str,
+              default="127.0.0.1",
+              help="The address to listen on.")
+@click.option("--port",
+              type=click.IntRange(min=0, max=65535),
+              default=8000,
+              help="The port to listen on.")
+def serve_api(database: str,
+              host: str,
+              port: int):
+    """
+    Serves the catalogue DATABASE, which is created if needed, over HTTP 
+    until interrupted: POST /validate validates a document, POST /medias 
+    adds one and GET /medias finds them, with the find options as query 
+    parameters, page by page (limit, cursor) or streamed in JSONL format 
+    (format=jsonl).
+    """
+    import mediadb.store.api as api
+    click.echo(f"serving {database} on http://{host}:{port}", err=True)
+    api.Server(database).run(host, port)
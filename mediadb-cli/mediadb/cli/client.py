@@ -0,0 +1,171 @@
+import os
+import json
+import socket
+import struct
+import tempfile
+import typing as tp
+
+
+"""the header of the messages, their length in bytes"""
+HEADER = struct.Struct(">I")
+
+"""the maximum length of a message, in bytes"""
+MAX_MESSAGE = 1 << 26
+
+"""the environment variable giving the daemon socket path"""
+SOCKET_VARIABLE = "MEDIADB_SOCKET"
+
+"""the time to wait for an answer of the daemon, in seconds"""
+TIMEOUT = 60.0
+
+
+class NotRunning(Exception):
+    """
+    Raised when the daemon is not running.
+    """
+    pass
+
+
+def private_directory() \
+    -> str:
+    """
+    Gives the directory of the daemon socket when the user has no runtime
+    directory, a directory of the temporary directory that only the user
+    can access (see daemon.Server.serve), such that the other users
+    cannot put a socket in place of the daemon one.
+    Returns: the directory path.
+    """
+    return os.path.join(tempfile.gettempdir(), f"mediadb-{os.getuid()}")
+
+
+def default_socket() \
+    -> str:
+    """
+    Gives the path of the daemon socket.
+    Returns: the path given by $MEDIADB_SOCKET, else mediadb-UID.sock in
+        the user runtime directory, else mediadb.sock in the private
+        directory.
+    """
+    if os.environ.get(SOCKET_VARIABLE):
+        return os.environ[SOCKET_VARIABLE]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"],
+                            f"mediadb-{os.getuid()}.sock")
+    return os.path.join(private_directory(), "mediadb.sock")
+
+
+def check_owner(connection: socket.socket, path: str) \
+    -> None:
+    """
+    Checks that the daemon answering on a socket runs as the user, from
+    the credentials of the connection where the system gives them, else
+    from the owner of the socket file.
+    Args:
+        connection: the connection to the daemon.
+        path: the socket path.
+    Raises:
+        PermissionError if the daemon runs as another user.
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        _, uid, _ = struct.unpack("3i", connection.getsockopt(
+                                            socket.SOL_SOCKET,
+                                            socket.SO_PEERCRED,
+                                            struct.calcsize("3i")))
+    else:
+        uid = os.stat(path).st_uid
+    if uid != os.getuid():
+        raise PermissionError(f"{path} is served by another user")
+
+
+def encode(message: tp.Any) \
+    -> bytes:
+    """
+    Encodes a message, as JSON prefixed by its length.
+    Args:
+        message: the message.
+    Returns: the bytes to send.
+    """
+    data = json.dumps(message, separators=(",", ":")).encode()
+    return HEADER.pack(len(data)) + data
+
+
+def _receive(connection: socket.socket, size: int) \
+    -> bytes:
+    """
+    Receives a given number of bytes.
+    Args:
+        connection: the connection.
+        size: the number of bytes.
+    Returns: the bytes.
+    Raises:
+        ConnectionError if the connection is closed before.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed by the daemon")
+        data += chunk
+    return bytes(data)
+
+
+def call(method: str,
+         params: tp.Dict[str, tp.Any],
+         path: tp.Optional[str] = None) \
+    -> tp.Any:
+    """
+    Calls a method of the daemon.
+    Args:
+        method: the method name.
+        params: the method parameters.
+        path: the daemon socket path, default_socket() if None.
+    Returns: the method result.
+    Raises:
+        NotRunning if no daemon listens on the socket.
+        PermissionError if the daemon runs as another user.
+        ValueError if the method failed, with its error message.
+    """
+    path = default_socket() if path is None else path
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            connection.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise NotRunning(str(e)) from e
+        check_owner(connection, path)
+        connection.settimeout(TIMEOUT)
+        connection.sendall(encode({"method": method, "params": params}))
+        size, = HEADER.unpack(_receive(connection, HEADER.size))
+        answer = json.loads(_receive(connection, size))
+    finally:
+        connection.close()
+    if "error" in answer:
+        raise ValueError(answer["error"])
+    return answer["result"]
+
+
+def request(method: str,
+            params: tp.Dict[str, tp.Any],
+            path: tp.Optional[str] = None) \
+    -> tp.Any:
+    """
+    Calls a method of the daemon if it is running, else in the calling
+    process, such that the commands use the daemon transparently. The
+    method is called in the calling process as well if the daemon does
+    not answer, e.g. when timing out or closing the connection, or runs
+    as another user, the methods reading only.
+    Args:
+        method: the method name.
+        params: the method parameters.
+        path: the daemon socket path, default_socket() if None.
+    Returns: the method result.
+    Raises:
+        ValueError if the method failed, with its error message.
+    """
+    try:
+        return call(method, params, path)
+    except (NotRunning, OSError):
+        # imports the models, which the daemon keeps loaded
+        import mediadb.cli.daemon as daemon
+        with daemon.Methods() as methods:
+            return methods.call(method, params)
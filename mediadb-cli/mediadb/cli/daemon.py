@@ -0,0 +1,291 @@
+import os
+import json
+import stat
+import signal
+import socket
+import sqlite3
+import asyncio
+import concurrent.futures as futures
+import typing as tp
+import mediadb.models.ingest as ingest
+import mediadb.store.catalogue as catalogue
+import mediadb.store.query as query
+import mediadb.cli.client as client
+
+
+"""the criteria of the find method compared for equality"""
+EQUALS = ("title", "type", "language", "subtitles", "season", "episode")
+
+
+class Methods:
+    """
+    The methods served by the daemon, also run in the client process
+    when the daemon is not running, such that the commands give the
+    same results either way. The catalogues are kept open between calls,
+    and reopened if their file is replaced.
+    """
+
+    def __init__(self):
+        """the open catalogues, by path, with the file inode"""
+        self.catalogues: tp.Dict[str, tp.Tuple[
+                                    int, catalogue.Catalogue]] = {}
+
+    def __enter__(self) \
+        -> "Methods":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def close(self) \
+        -> None:
+        """
+        Closes the open catalogues.
+        """
+        for _, c in self.catalogues.values():
+            c.close()
+        self.catalogues.clear()
+
+    def call(self, method: str, params: tp.Dict[str, tp.Any]) \
+        -> tp.Any:
+        """
+        Calls a method.
+        Args:
+            method: the method name, one of ping, create, validate and
+                find.
+            params: the method parameters, as keyword arguments.
+        Returns: the method result.
+        Raises:
+            ValueError if the method or its parameters are not valid,
+                with one message per failure, or if the catalogue cannot
+                be read, whether called by the daemon or not.
+        """
+        if method not in ("ping", "create", "validate", "find"):
+            raise ValueError(f"unknown method: {method}")
+        try:
+            return getattr(self, method)(**params)
+        except TypeError as e:
+            raise ValueError(f"invalid parameters: {e}")
+        except ValueError as e:
+            raise ValueError("\n".join(ingest.error_messages(e)))
+        except (OSError, sqlite3.Error) as e:
+            # e.g. a missing catalogue or a file that is not one
+            raise ValueError(str(e))
+
+    def ping(self) \
+        -> int:
+        """
+        Returns: the process identifier.
+        """
+        return os.getpid()
+
+    def create(self, type: str, fields: tp.Dict[str, tp.Any]) \
+        -> str:
+        """
+        Creates a media document.
+        Args:
+            type: the media type.
+            fields: the document fields.
+        Returns: the document, in JSON format.
+        """
+        return ingest.validate_record(dict(fields, type=type)) \
+                     .model_dump_json()
+
+    def validate(self, record: tp.Any) \
+        -> str:
+        """
+        Validates a media record, its type field picking the model.
+        Args:
+            record: a dict of fields or a JSON object string.
+        Returns: the document, in JSON format.
+        """
+        return ingest.validate_record(record).model_dump_json()
+
+    def find(self,
+             database: str,
+             criteria: tp.Dict[str, tp.Any],
+             limit: tp.Optional[int] = None) \
+        -> tp.List[str]:
+        """
+        Finds the documents of a catalogue.
+        Args:
+            database: the absolute path to the catalogue.
+            criteria: the values of the EQUALS fields and the min_season
+                and max_season bounds, None values being ignored.
+            limit: the maximum number of documents, None for all.
+        Returns: the matching documents, in JSON format.
+        """
+        q = query.Query(**{key: criteria[key] for key in EQUALS
+                           if criteria.get(key) is not None})
+        if criteria.get("min_season") is not None:
+            q = q.filter(query.SEASON >= criteria["min_season"])
+        if criteria.get("max_season") is not None:
+            q = q.filter(query.SEASON <= criteria["max_season"])
+        inode = os.stat(database).st_ino
+        if database in self.catalogues and \
+                self.catalogues[database][0] != inode:
+            self.catalogues.pop(database)[1].close()
+        if database not in self.catalogues:
+            self.catalogues[database] = (inode,
+                                         catalogue.Catalogue(database))
+        return [x.model_dump_json()
+                for x in self.catalogues[database][1].find(q.limit(limit))]
+
+
+class Server:
+    """
+    A daemon serving Methods on a Unix domain socket, keeping the models
+    loaded and the catalogues open between requests. The messages are
+    JSON documents prefixed by their length as a 4 bytes big endian
+    integer, the requests being {"method": name, "params": {...}} and
+    the responses {"result": value} or {"error": message}, in the order
+    of the requests of a connection. The requests are served by an
+    asyncio event loop, the catalogue queries by a single worker thread
+    such that a long query does not hold the other requests.
+    """
+
+    def __init__(self, path: tp.Optional[str] = None):
+        """
+        Args:
+            path: the socket path, client.default_socket() if None.
+        """
+        """the socket path"""
+        self.path = client.default_socket() if path is None else path
+        """the served methods"""
+        self.methods = Methods()
+        """the thread querying the catalogues"""
+        self.worker = futures.ThreadPoolExecutor(max_workers=1)
+
+    async def call(self, request: tp.Any) \
+        -> tp.Dict[str, tp.Any]:
+        """
+        Serves a request.
+        Args:
+            request: the decoded request.
+        Returns: the response.
+        """
+        try:
+            if not isinstance(request, dict) or \
+                    not isinstance(request.get("params", {}), dict):
+                raise ValueError("invalid request")
+            method = request.get("method")
+            params = request.get("params", {})
+            if method == "find":
+                result = await asyncio.get_running_loop().run_in_executor(
+                            self.worker, self.methods.call, method, params)
+            else:
+                result = self.methods.call(method, params)
+            return {"result": result}
+        except ValueError as e:
+            return {"error": str(e)}
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Serves the requests of a connection until it is closed.
+        Args:
+            reader: the connection input.
+            writer: the connection output.
+        """
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(client.HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                size, = client.HEADER.unpack(header)
+                if size > client.MAX_MESSAGE:
+                    writer.write(client.encode({"error": "too long"}))
+                    break
+                try:
+                    request = json.loads(await reader.readexactly(size))
+                except ValueError:
+                    request = None
+                writer.write(client.encode(await self.call(request)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _check(self) \
+        -> None:
+        """
+        Checks that no other daemon listens on the socket, removing the
+        socket of a daemon that did not stop cleanly.
+        Raises:
+            RuntimeError if a daemon is running.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            client.call("ping", {}, self.path)
+        except (client.NotRunning, ConnectionError):
+            os.unlink(self.path)
+            return
+        except PermissionError as e:
+            raise RuntimeError(str(e))
+        raise RuntimeError(f"a daemon is running on {self.path}")
+
+    def _private(self) \
+        -> None:
+        """
+        Creates the private directory of the socket (see
+        client.private_directory), if the socket is there, checking that
+        only the user can access it.
+        Raises:
+            RuntimeError if the directory is not private.
+        """
+        directory = os.path.dirname(self.path)
+        if directory != client.private_directory():
+            return
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        status = os.lstat(directory)
+        if not stat.S_ISDIR(status.st_mode) or \
+                status.st_uid != os.getuid() or \
+                status.st_mode & 0o077:
+            raise RuntimeError(f"{directory} is not a directory of the "
+                               f"user only")
+
+    async def serve(self) \
+        -> None:
+        """
+        Serves requests until interrupted by SIGINT or SIGTERM.
+        Raises:
+            RuntimeError if a daemon is running or if the socket
+            directory is not private.
+        """
+        self._private()
+        self._check()
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set_result, None)
+        old = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle,
+                                                     self.path,
+                                                     backlog=socket.SOMAXCONN)
+        finally:
+            os.umask(old)
+        try:
+            async with server:
+                await stopped
+        finally:
+            os.unlink(self.path)
+            # the catalogues are closed by the thread that opened them
+            self.worker.submit(self.methods.close).result()
+            self.worker.shutdown()
+
+    def run(self) \
+        -> None:
+        """
+        Runs serve() in an event loop.
+        """
+        asyncio.run(self.serve())
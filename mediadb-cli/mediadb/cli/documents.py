@@ -0,0 +1,202 @@
+import sys
+import click
+import typing as tp
+
+
+"""the accepted language values, for the help messages"""
+LANGUAGES = "an ISO 639 code (e.g. EN or fre), a language name (e.g. " \
+            "French or Français) or unknown"
+
+
+def echo_document(video_type: str, fields: tp.Dict[str, tp.Any]) \
+    -> None:
+    """
+    Prints a media document in JSON format, created by the daemon if it
+    is running.
+    Args:
+        video_type: the media type.
+        fields: the document fields.
+    """
+    import mediadb.cli.client as client
+    try:
+        click.echo(client.request("create", {"type": video_type,
+                                             "fields": fields}))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@click.command()
+@click.option("--title", 
+              required=True,
+              type=str,
+              help="The movie title")
+@click.option("--language",
+              required=True,
+              help=f"The movie language, as {LANGUAGES}")
+@click.option("--subtitles",
+              type=str,
+              default=None,
+              help=f"The movie subtitle language, as " \
+                  f"{LANGUAGES}")
+@click.option("--file",
+              required=True,
+              type=click.Path(dir_okay=False),
+              help="The path to the media file")
+def create_movie_document(title: str,
+                          language: str,
+                          subtitles: str,
+                          file: str):
+    """
+    Prints a Movie document in JSON format on stdout. 
+    """
+    echo_document("movie", {"title": title,
+                            "language": language,
+                            "subtitles": subtitles,
+                            "file": file})
+
+
+@click.command()
+@click.option("--title", 
+              required=True,
+              type=str,
+              help="The movie title")
+@click.option("--language",
+              required=True,
+              help=f"The movie language, as {LANGUAGES}")
+@click.option("--subtitles",
+              type=str,
+              default=None,
+              help=f"The movie subtitle language, as " \
+                   f"{LANGUAGES}")
+@click.option("--file",
+              required=True,
+              type=click.Path(dir_okay=False),
+              help="The path to the media file")
+def create_documentary_document(title: str,
+                                language: str,
+                                subtitles: str,
+                                file: str):
+    """
+    Prints a Documentary document in JSON format on stdout. 
+    """
+    echo_document("documentary", {"title": title,
+                                  "language": language,
+                                  "subtitles": subtitles,
+                                  "file": file})
+
+
+@click.command()
+@click.option("--title", 
+              required=True,
+              type=str,
+              help="The movie title")
+@click.option("--language",
+              required=True,
+              help=f"The movie language, as {LANGUAGES}")
+@click.option("--subtitles",
+              type=str,
+              default=None,
+              help=f"The movie subtitle language, as " \
+                  f"{LANGUAGES}")
+@click.option("--season", 
+              type=int,
+              required=True,
+              help="The season number")
+@click.option("--episode", 
+              type=int,
+              required=True,
+              help="The episode number")
+@click.option("--name",
+              type=str,
+              default=None,
+              help="Episode name.")
+@click.option("--file",
+              required=True,
+              type=click.Path(dir_okay=False),
+              help="The path to the media file")
+def create_serie_document(title: str,
+                          language: str,
+                          subtitles: str,
+                          season: int,
+                          episode: int,
+                          name: str,
+                          file: str):
+    """
+    Prints a Serie document in JSON format on stdout. 
+    """
+    echo_document("serie", {"title": title,
+                            "language": language,
+                            "subtitles": subtitles,
+                            "season": season,
+                            "episode": episode,
+                            "episode_name": name,
+                            "file": file})
+
+
+@click.command()
+@click.argument("input",
+                type=click.File("r"),
+                default="-")
+@click.option("--format",
+              "fmt",
+              # ingest.FORMATS, not imported to keep --help fast
+              type=click.Choice(["jsonl", "csv"]),
+              default="jsonl",
+              help="The input format, JSONL or CSV with a header row.")
+@click.option("--output",
+              type=click.File("w"),
+              default="-",
+              help="Where to write the valid documents, stdout by default.")
+@click.option("--rejects",
+              type=click.File("w"),
+              default=None,
+              help="Where to write the rejected records, stderr by default.")
+def ingest_documents(input,
+                     fmt: str,
+                     output,
+                     rejects):
+    """
+    Validates a stream of media records (stdin by default), dispatching 
+    each one to the model matching its type field, and prints the 
+    documents in JSONL format. 
+    """
+    import mediadb.models.ingest as ingest
+    if rejects is None:
+        rejects = sys.stderr
+    ingest.ingest(input, output, rejects, fmt=fmt)
+
+
+@click.command()
+@click.argument("input",
+                type=click.Path(exists=True, dir_okay=False))
+@click.option("--processes",
+              type=click.IntRange(min=0),
+              default=None,
+              help="The number of processes validating the file, one per "
+                   "CPU by default, 0 to validate it in this process.")
+@click.option("--rejects",
+              type=click.File("w"),
+              default="-",
+              help="Where to write the rejected records, stdout by default.")
+def validate_documents(input: str,
+                       processes: tp.Optional[int],
+                       rejects):
+    """
+    Validates a file of media documents in JSONL format, e.g. a dump of
+    millions of documents, in parallel, and prints the rejected records
+    with their line numbers. Exits with status 1 if any is rejected.
+    """
+    import os
+    import mediadb.models.bulk as bulk
+    if processes is None:
+        processes = os.cpu_count() or 1
+    n_valid = 0
+    n_reject = 0
+    for report in bulk.validate_file(input, processes):
+        for reject in report.rejects:
+            rejects.write(reject.model_dump_json() + "\n")
+        n_valid += report.valid
+        n_reject += len(report.rejects)
+    click.echo(f"{n_valid} valid, {n_reject} rejected", err=True)
+    if n_reject:
+        sys.exit(1)
@@ -0,0 +1,179 @@
+import sys
+import typing as tp
+import click
+
+
+"""the commands, by name, as the module and the function defining them
+and their short help, the modules being imported when a command is used
+only"""
+COMMANDS = {
+    "create-movie-document": ("mediadb.cli.documents",
+                              "create_movie_document",
+                              "Prints a Movie document."),
+    "create-documentary-document": ("mediadb.cli.documents",
+                                    "create_documentary_document",
+                                    "Prints a Documentary document."),
+    "create-serie-document": ("mediadb.cli.documents",
+                              "create_serie_document",
+                              "Prints a Serie document."),
+    "ingest": ("mediadb.cli.documents",
+               "ingest_documents",
+               "Validates a stream of media records."),
+    "validate": ("mediadb.cli.documents",
+                 "validate_documents",
+                 "Validates a file of media documents in parallel."),
+    "scan": ("mediadb.cli.scan",
+             "scan_documents",
+             "Scans the video files of a file store."),
+    "serve": ("mediadb.cli.serve",
+              "serve_documents",
+              "Runs a daemon serving the documents."),
+    "watch": ("mediadb.cli.scan",
+              "watch_documents",
+              "Keeps the documents of a file store up to date."),
+    "load": ("mediadb.cli.catalogue",
+             "load_documents",
+             "Adds media documents to a catalogue."),
+    "find": ("mediadb.cli.catalogue",
+             "find_documents",
+             "Finds the documents of a catalogue."),
+    "search": ("mediadb.cli.catalogue",
+               "search_documents",
+               "Searches the documents of a catalogue."),
+    "export": ("mediadb.cli.catalogue",
+               "export_documents",
+               "Exports a catalogue into a columnar file or a snapshot."),
+    "import": ("mediadb.cli.catalogue",
+               "import_documents",
+               "Imports a columnar file or a snapshot into a catalogue."),
+    "api": ("mediadb.cli.catalogue",
+            "serve_api",
+            "Serves a catalogue over HTTP."),
+    "fingerprint": ("mediadb.cli.catalogue",
+                    "fingerprint_documents",
+                    "Fingerprints the files of a catalogue."),
+    "duplicates": ("mediadb.cli.catalogue",
+                   "duplicate_documents",
+                   "Groups the files of a catalogue by content."),
+}
+
+
+class LazyGroup(click.Group):
+    """
+    A group of commands imported when used only, such that running a
+    command does not import the modules of the others. The command
+    modules defer importing the models to the command functions, such
+    that the help messages do not import them at all.
+    """
+
+    def list_commands(self, ctx: click.Context) \
+        -> tp.List[str]:
+        return sorted(COMMANDS)
+
+    def get_command(self, ctx: click.Context, name: str) \
+        -> tp.Optional[click.Command]:
+        if name not in COMMANDS:
+            return None
+        import importlib
+        module, function, _ = COMMANDS[name]
+        return getattr(importlib.import_module(module), function)
+
+    def format_commands(self,
+                        ctx: click.Context,
+                        formatter: click.HelpFormatter) \
+        -> None:
+        # the short help of the registry, not to import all the commands
+        with formatter.section("Commands"):
+            formatter.write_dl([(name, COMMANDS[name][2])
+                                for name in self.list_commands(ctx)])
+
+
+@click.group(cls=LazyGroup)
+@click.option("--profile",
+              type=click.Path(dir_okay=False, allow_dash=True),
+              default=None,
+              help="Where to dump the cProfile stats of the command, to "
+                   "read with pstats, - to print the slowest functions on "
+                   "stderr.")
+@click.option("--metrics",
+              type=click.Path(dir_okay=False, allow_dash=True),
+              default=None,
+              help="Where to write the metrics of the command (documents "
+                   "validated, rejected and stage latencies), - for "
+                   "stderr.")
+@click.option("--metrics-format",
+              type=click.Choice(["prometheus", "json"]),
+              default="prometheus",
+              help="The format of the metrics, the Prometheus text format "
+                   "by default.")
+@click.pass_context
+def cli(ctx: click.Context,
+        profile: tp.Optional[str],
+        metrics: tp.Optional[str],
+        metrics_format: str):
+    """
+    CLI entry point for other commands.
+    """
+    # the options cost nothing, not even an import, when not given
+    if metrics is not None:
+        ctx.call_on_close(record_metrics(metrics, metrics_format))
+    if profile is not None:
+        ctx.call_on_close(record_profile(profile))
+
+
+def record_metrics(file: str, fmt: str) \
+    -> tp.Callable[[], None]:
+    """
+    Enables the metrics, for the command to run.
+    Args:
+        file: where to write the metrics, - for stderr.
+        fmt: the metrics format, prometheus or json.
+    Returns: the function writing the metrics, once the command is done.
+    """
+    import mediadb.models.metrics as metrics
+    registry = metrics.enable()
+
+    def write():
+        text = registry.to_json() + "\n" if fmt == "json" \
+               else registry.to_prometheus()
+        if file == "-":
+            sys.stderr.write(text)
+        else:
+            with open(file, "w") as f:
+                f.write(text)
+
+    return write
+
+
+def record_profile(file: str) \
+    -> tp.Callable[[], None]:
+    """
+    Profiles the command to run with cProfile.
+    Args:
+        file: where to dump the stats, - to print the slowest functions
+            on stderr.
+    Returns: the function dumping the stats, once the command is done.
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def dump():
+        profiler.disable()
+        if file == "-":
+            import pstats
+            pstats.Stats(profiler, stream=sys.stderr) \
+                .sort_stats("cumulative") \
+                .print_stats(30)
+        else:
+            profiler.dump_stats(file)
+
+    return dump
+
+
+def main() \
+    -> None:
+    """
+    Runs the CLI, the mediadb console script.
+    """
+    cli()
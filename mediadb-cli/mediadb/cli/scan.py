@@ -0,0 +1,211 @@
+import os
+import sys
+import click
+
+
+@click.command()
+@click.argument("root",
+                type=click.Path(exists=True, file_okay=False))
+@click.option("--threads",
+              type=click.IntRange(min=1),
+              default=None,
+              help="The number of threads listing directories.")
+@click.option("--processes",
+              type=click.IntRange(min=0),
+              default=0,
+              help="The number of processes building the documents, 0 to " \
+                   "build them in the main process.")
+@click.option("--probe",
+              "probed",
+              is_flag=True,
+              default=False,
+              help="Whether to read the languages the paths do not give " \
+                   "from the audio and subtitle tracks of the MKV and MP4 " \
+                   "files, which reads their headers.")
+@click.option("--cache/--no-cache",
+              "cached",
+              default=True,
+              help="Whether to cache the documents built, such that only " \
+                   "those of the files changed since are built again. " \
+                   "The cache is kept in $XDG_CACHE_HOME/mediadb.")
+@click.option("--manifest",
+              "manifest_file",
+              type=click.Path(dir_okay=False),
+              default=None,
+              help="A manifest of the previous scan, to only print the " \
+                   "documents created, changed or deleted since then. " \
+                   "The manifest is created if missing and updated.")
+@click.option("--output",
+              type=click.File("w"),
+              default="-",
+              help="Where to write the documents, stdout by default.")
+@click.option("--rejects",
+              type=click.File("w"),
+              default=None,
+              help="Where to write the rejected files, stderr by default.")
+def scan_documents(root: str,
+                   threads: int,
+                   processes: int,
+                   probed: bool,
+                   cached: bool,
+                   manifest_file: str,
+                   output,
+                   rejects):
+    """
+    Scans the video files under ROOT, infers their document from their 
+    path and prints the documents in JSONL format. With a manifest, 
+    prints {"action": ..., "file": ..., "document": ...} changes instead.
+    """
+    import mediadb.models.ingest as ingest
+    import mediadb.scan.scanner as scanner
+    import mediadb.scan.manifest as manifest
+    import mediadb.scan.cache as cache
+    if rejects is None:
+        rejects = sys.stderr
+    # the files of the documents are absolute, cached or not, as watched
+    root = os.path.abspath(root)
+    document_cache = cache.Cache(cache.default_file()) if cached else None
+    try:
+        if manifest_file is None:
+            if document_cache is None:
+                scanned = scanner.scan(root,
+                                       threads=threads,
+                                       processes=processes,
+                                       probed=probed)
+            else:
+                scanned = document_cache.scan(root,
+                                              threads=threads,
+                                              processes=processes,
+                                              probed=probed)
+            ingest.write(scanned, output, rejects)
+            return
+        entries = manifest.load(manifest_file)
+        ingest.write(manifest.rescan(root,
+                                     entries,
+                                     threads=threads,
+                                     processes=processes,
+                                     probed=probed,
+                                     cached=document_cache),
+                     output,
+                     rejects)
+        manifest.save(manifest_file, entries)
+    finally:
+        if document_cache is not None:
+            document_cache.close()
+
+
+@click.command()
+@click.argument("root",
+                type=click.Path(exists=True, file_okay=False))
+@click.argument("output",
+                type=click.Path(dir_okay=False))
+@click.option("--format",
+              "fmt",
+              type=click.Choice(["jsonl", "sqlite"]),
+              default=None,
+              help="The output format, JSONL or a SQLite catalogue, " \
+                   "sqlite if OUTPUT ends with .db or .sqlite, jsonl " \
+                   "otherwise by default.")
+@click.option("--manifest",
+              "manifest_file",
+              type=click.Path(dir_okay=False),
+              default=None,
+              help="A manifest of the previous scan, to only build the " \
+                   "documents of the files changed since then. The " \
+                   "manifest is created if missing and updated on exit.")
+@click.option("--probe",
+              "probed",
+              is_flag=True,
+              default=False,
+              help="Whether to read the languages the paths do not give " \
+                   "from the audio and subtitle tracks of the MKV and MP4 " \
+                   "files, which reads their headers.")
+@click.option("--cache/--no-cache",
+              "cached",
+              default=True,
+              help="Whether to cache the documents built, shared with " \
+                   "the scan command, such that only those of the files " \
+                   "changed since are built again. The cache is kept in " \
+                   "$XDG_CACHE_HOME/mediadb.")
+@click.option("--poll",
+              "polled",
+              is_flag=True,
+              default=False,
+              help="Whether to poll the directories rather than use " \
+                   "inotify, e.g. on network file systems.")
+@click.option("--delay",
+              type=click.FloatRange(min=0),
+              default=2.0,
+              help="The time without changes after which the documents " \
+                   "are updated, in seconds.")
+@click.option("--interval",
+              type=click.FloatRange(min=0.1),
+              default=5.0,
+              help="The time between two polls, in seconds.")
+@click.option("--rejects",
+              type=click.File("w"),
+              default=None,
+              help="Where to write the rejected files, stderr by default.")
+def watch_documents(root: str,
+                    output: str,
+                    fmt: str,
+                    manifest_file: str,
+                    probed: bool,
+                    cached: bool,
+                    polled: bool,
+                    delay: float,
+                    interval: float,
+                    rejects):
+    """
+    Watches the video files under ROOT until interrupted and keeps their 
+    documents in OUTPUT, a JSONL file or a SQLite catalogue, up to date, 
+    the documents being created, changed or deleted as the files are.
+    """
+    import signal
+    import mediadb.scan.scanner as scanner
+    import mediadb.scan.manifest as manifest
+    import mediadb.scan.watch as watch
+    import mediadb.scan.cache as cache
+    if rejects is None:
+        rejects = sys.stderr
+    if fmt is None:
+        fmt = "sqlite" if output.endswith((".db", ".sqlite")) else "jsonl"
+    # SIGTERM exits cleanly too, saving the manifest
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    entries = {} if manifest_file is None else manifest.load(manifest_file)
+    out = watch.JSONLOutput(output) if fmt == "jsonl" \
+          else watch.CatalogueOutput(output)
+    document_cache = cache.Cache(cache.default_file()) if cached else None
+    try:
+        with out, watch.Watcher(root,
+                                entries,
+                                polled=polled,
+                                probed=probed,
+                                delay=delay,
+                                interval=interval,
+                                cached=document_cache) as watcher:
+            for i, batch in enumerate(watcher.batches()):
+                changes = [x for x in batch
+                           if not isinstance(x, scanner.Reject)]
+                for reject in batch:
+                    if isinstance(reject, scanner.Reject):
+                        rejects.write(reject.model_dump_json() + "\n")
+                rejects.flush()
+                if changes:
+                    out.apply(changes)
+                if i == 0:
+                    # the documents of the files deleted while not watched
+                    out.retain(root, watcher.files)
+                if changes:
+                    click.echo(", ".join(
+                                f"{sum(x.action == action for x in changes)} "
+                                f"{action}"
+                                for action in (manifest.CREATED,
+                                               manifest.CHANGED,
+                                               manifest.DELETED)),
+                               err=True)
+    finally:
+        if manifest_file is not None:
+            manifest.save(manifest_file, entries)
+        if document_cache is not None:
+            document_cache.close()
@@ -0,0 +1,25 @@
+import click
+
+
+@click.command()
+@click.option("--socket",
+              "socket_path",
+              type=click.Path(dir_okay=False),
+              default=None,
+              help="The socket path, $MEDIADB_SOCKET, mediadb-UID.sock " \
+                   "in $XDG_RUNTIME_DIR or mediadb.sock in a mediadb-UID " \
+                   "directory of /tmp only the user can access by " \
+                   "default.")
+def serve_documents(socket_path: str):
+    """
+    Runs a daemon keeping the models loaded, which the create-*-document 
+    and find commands use when it is running, serving requests on a Unix 
+    domain socket until interrupted.
+    """
+    import mediadb.cli.daemon as daemon
+    server = daemon.Server(socket_path)
+    click.echo(f"serving on {server.path}", err=True)
+    try:
+        server.run()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
@@ -0,0 +1,154 @@
+import os
+import json
+import socket
+import pytest
+import threading
+import mediadb.cli.client as client
+
+
+class TestMessages:
+    """
+    A test suite for mediadb.cli.client.encode and _receive
+    """
+
+    def test_round_trip(self):
+        """
+        Tests sending a message on a connection and receiving it.
+        Expected to give back the message, prefixed by its length.
+        """
+        message = {"method": "find", "params": {"title": "Amélie"}}
+        data = client.encode(message)
+        size, = client.HEADER.unpack(data[:client.HEADER.size])
+        assert(size == len(data) - client.HEADER.size)
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(data)
+            size, = client.HEADER.unpack(
+                        client._receive(right, client.HEADER.size))
+            assert(json.loads(client._receive(right, size)) == message)
+
+    def test_closed(self):
+        """
+        Tests receiving a message from a connection closed before its
+        end.
+        Expected to raise ConnectionError.
+        """
+        data = client.encode({"result": 1})
+        left, right = socket.socketpair()
+        with right:
+            left.sendall(data[:-1])
+            left.close()
+            with pytest.raises(ConnectionError):
+                client._receive(right, len(data))
+
+
+class TestSocket:
+    """
+    A test suite for mediadb.cli.client.default_socket
+    """
+
+    def test_default(self, monkeypatch):
+        """
+        Tests the socket path, from the environment or not.
+        Expected to be the MEDIADB_SOCKET path, else in the runtime
+        directory, else in the private directory of the user.
+        """
+        monkeypatch.setenv(client.SOCKET_VARIABLE, "/run/mediadb.sock")
+        assert(client.default_socket() == "/run/mediadb.sock")
+        monkeypatch.delenv(client.SOCKET_VARIABLE)
+        monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+        assert(client.default_socket() ==
+               f"/run/user/1000/mediadb-{os.getuid()}.sock")
+        monkeypatch.delenv("XDG_RUNTIME_DIR")
+        assert(client.default_socket() ==
+               os.path.join(client.private_directory(), "mediadb.sock"))
+        assert(os.path.basename(client.private_directory()) ==
+               f"mediadb-{os.getuid()}")
+
+
+class TestRequest:
+    """
+    A test suite for mediadb.cli.client.call and request
+    """
+
+    fields = {"title": "Alien", "file": "/movies/alien.mkv"}
+
+    def test_missing(self, tmp_path):
+        """
+        Tests calling a method without a daemon socket.
+        Expected to raise NotRunning, and to call it in process when
+        requested.
+        """
+        path = str(tmp_path / "missing.sock")
+        with pytest.raises(client.NotRunning):
+            client.call("ping", {}, path)
+        document = json.loads(client.request("create",
+                                             {"type": "movie",
+                                              "fields": self.fields},
+                                             path))
+        assert(document["title"] == "Alien")
+
+    def test_stale(self, tmp_path):
+        """
+        Tests calling a method on the socket of a daemon that did not
+        stop cleanly, i.e. on which nothing listens.
+        Expected to raise NotRunning, and to call it in process when
+        requested.
+        """
+        path = str(tmp_path / "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(path)
+        with pytest.raises(client.NotRunning):
+            client.call("ping", {}, path)
+        assert(client.request("ping", {}, path) == os.getpid())
+
+    def test_closed(self, tmp_path):
+        """
+        Tests calling a method of a daemon that closes the connections
+        without answering.
+        Expected to call it in process.
+        """
+        path = str(tmp_path / "closed.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(path)
+            s.listen()
+
+            def close():
+                for _ in range(2):
+                    s.accept()[0].close()
+
+            thread = threading.Thread(target=close)
+            thread.start()
+            with pytest.raises(ConnectionError):
+                client.call("ping", {}, path)
+            assert(client.request("ping", {}, path) == os.getpid())
+            thread.join()
+
+    def test_other_user(self, tmp_path, monkeypatch):
+        """
+        Tests calling a method of a daemon running as another user.
+        Expected to raise PermissionError, and to call it in process
+        when requested.
+        """
+        path = str(tmp_path / "other.sock")
+        monkeypatch.setattr(os, "getuid", lambda: os.geteuid() + 1)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(path)
+            s.listen()
+            with pytest.raises(PermissionError):
+                client.call("ping", {}, path)
+            assert(client.request("ping", {}, path) == os.getpid())
+
+    def test_error(self, tmp_path):
+        """
+        Tests calling a method that fails, in process.
+        Expected to raise ValueError, as the daemon answers it.
+        """
+        path = str(tmp_path / "missing.sock")
+        for method, params in (("create", {"type": "movie",
+                                           "fields": {"title": ""}}),
+                               ("find", {"database": str(tmp_path / "no.db"),
+                                         "criteria": {}}),
+                               ("delete", {})):
+            with pytest.raises(ValueError):
+                client.request(method, params, path)
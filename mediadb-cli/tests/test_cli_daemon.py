@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import signal
+import pytest
+import subprocess
+import mediadb.cli.client as client
+import mediadb.cli.daemon as daemon
+import mediadb.models.medias as medias
+import mediadb.store.catalogue as catalogue
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Creates a catalogue of a movie and of the episodes of a serie.
+    Returns: the absolute path to the catalogue.
+    """
+    file = str(tmp_path / "catalogue.db")
+    with catalogue.Catalogue(file) as c:
+        c.add_many([medias.Movie(title="Alien", file="/movies/alien.mkv")] +
+                   [medias.Serie(title="Lost",
+                                 season=season,
+                                 episode=1,
+                                 file=f"/series/lost.s0{season}e01.mkv")
+                    for season in (1, 2, 3)])
+    return file
+
+
+@pytest.fixture
+def server(tmp_path):
+    """
+    Runs a daemon, in another process.
+    Returns: the socket path.
+    """
+    path = str(tmp_path / "mediadb.sock")
+    process = subprocess.Popen([sys.executable, "-m", "mediadb.cli",
+                                "serve", "--socket", path],
+                               stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(200):
+            try:
+                client.call("ping", {}, path)
+                break
+            except client.NotRunning:
+                time.sleep(0.05)
+        yield path
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(10)
+    assert(not os.path.exists(path))
+
+
+class TestMethods:
+    """
+    A test suite for mediadb.cli.daemon.Methods
+    """
+
+    def test_find(self, database):
+        """
+        Tests finding documents by field and season bounds.
+        Expected to give the matching documents in JSON format.
+        """
+        with daemon.Methods() as methods:
+            documents = methods.call("find", {"database": database,
+                                              "criteria": {"title": "Lost",
+                                                           "min_season": 2}})
+            assert(sorted(json.loads(x)["season"] for x in documents) ==
+                   [2, 3])
+            assert(len(methods.call("find", {"database": database,
+                                             "criteria": {},
+                                             "limit": 2})) == 2)
+
+    def test_errors(self, database, tmp_path):
+        """
+        Tests calling unknown methods, with invalid parameters, invalid
+        documents and catalogues that cannot be read.
+        Expected to raise ValueError.
+        """
+        not_catalogue = tmp_path / "text.db"
+        not_catalogue.write_text("not a catalogue " * 100)
+        with daemon.Methods() as methods:
+            for method, params, message in (
+                    ("delete", {}, "unknown method"),
+                    ("ping", {"pid": 1}, "invalid parameters"),
+                    ("find", {"criteria": {}}, "invalid parameters"),
+                    ("create", {"type": "movie",
+                                "fields": {"title": "", "file": "/a.mkv"}},
+                     "title"),
+                    ("find", {"database": str(tmp_path / "no.db"),
+                              "criteria": {}},
+                     "No such file"),
+                    ("find", {"database": str(not_catalogue),
+                              "criteria": {}},
+                     "not a database")):
+                with pytest.raises(ValueError, match=message):
+                    methods.call(method, params)
+
+
+class TestServer:
+    """
+    A test suite for mediadb.cli.daemon.Server
+    """
+
+    def test_serve(self, server, database):
+        """
+        Tests calling the methods of a running daemon.
+        Expected to answer them, the errors included, from the daemon
+        process, the socket being of the user only.
+        """
+        assert(client.call("ping", {}, server) != os.getpid())
+        documents = client.call("find", {"database": database,
+                                         "criteria": {"type": "movie"}},
+                                server)
+        assert([json.loads(x)["title"] for x in documents] == ["Alien"])
+        with pytest.raises(ValueError, match="No such file"):
+            client.call("find", {"database": database + ".missing",
+                                 "criteria": {}},
+                        server)
+        assert(os.stat(server).st_mode & 0o077 == 0)
+
+    def test_running(self, server):
+        """
+        Tests running a daemon on the socket of a running one.
+        Expected to raise RuntimeError.
+        """
+        with pytest.raises(RuntimeError, match="running"):
+            daemon.Server(server)._check()
+
+    def test_private(self, tmp_path, monkeypatch):
+        """
+        Tests creating the private directory of the socket, and using
+        one that other users can access.
+        Expected to create it for the user only, and to raise
+        RuntimeError.
+        """
+        directory = tmp_path / "private"
+        monkeypatch.setattr(client, "private_directory",
+                            lambda: str(directory))
+        server = daemon.Server(str(directory / "mediadb.sock"))
+        server._private()
+        assert(os.stat(directory).st_mode & 0o777 == 0o700)
+        os.chmod(directory, 0o777)
+        with pytest.raises(RuntimeError, match="user only"):
+            server._private()
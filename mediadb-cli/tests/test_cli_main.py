@@ -0,0 +1,134 @@
+import sys
+import json
+import pstats
+import pytest
+import subprocess
+import click
+import click.testing
+import mediadb.cli.main as main
+import mediadb.models.metrics as metrics
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    """
+    Runs the commands without a daemon, the metrics being disabled
+    after, stderr being part of the output.
+    Returns: the runner.
+    """
+    monkeypatch.setenv("MEDIADB_SOCKET", str(tmp_path / "missing.sock"))
+    yield click.testing.CliRunner()
+    metrics.disable()
+
+
+"""the arguments of a command creating a movie document"""
+CREATE = ["create-movie-document", "--title", "Alien", "--language", "EN",
+          "--file", "/movies/alien.mkv"]
+
+
+class TestLazyGroup:
+    """
+    A test suite for mediadb.cli.main.LazyGroup
+    """
+
+    def test_help(self):
+        """
+        Tests printing the help of the CLI and of some commands, in a
+        new process.
+        Expected to list the commands with their short help, importing
+        neither the models nor pydantic.
+        """
+        code = "import sys, click.testing, mediadb.cli.main as main\n" \
+               "for args in (['--help'], ['scan', '--help'], " \
+               "['find', '--help']):\n" \
+               "    result = click.testing.CliRunner().invoke(main.cli, " \
+               "args)\n" \
+               "    assert result.exit_code == 0, result.output\n" \
+               "print(sorted(x for x in sys.modules " \
+               "if x.startswith(('mediadb.models', 'mediadb.store', " \
+               "'pydantic'))))"
+        output = subprocess.run([sys.executable, "-c", code],
+                                check=True,
+                                capture_output=True,
+                                text=True).stdout
+        assert(output.strip() == "[]")
+        result = click.testing.CliRunner().invoke(main.cli, ["--help"])
+        output = " ".join(result.output.split())
+        for name, (_, _, short) in main.COMMANDS.items():
+            assert(f"{name} {short}" in output)
+
+    def test_commands(self):
+        """
+        Tests resolving each registered command.
+        Expected to give the click command of its module, and None for
+        an unknown command.
+        """
+        ctx = click.Context(main.cli)
+        assert(main.cli.list_commands(ctx) == sorted(main.COMMANDS))
+        for name in main.COMMANDS:
+            assert(isinstance(main.cli.get_command(ctx, name),
+                              click.Command))
+        assert(main.cli.get_command(ctx, "delete") is None)
+
+    def test_create(self, runner):
+        """
+        Tests running a command, without and with the --file option.
+        Expected to print the document, and to fail without it.
+        """
+        result = runner.invoke(main.cli, CREATE)
+        assert(result.exit_code == 0)
+        assert(json.loads(result.output)["file"] == "/movies/alien.mkv")
+        result = runner.invoke(main.cli, CREATE[:-2])
+        assert(result.exit_code == 2)
+        assert("--file" in result.output)
+
+
+class TestOptions:
+    """
+    A test suite for the --metrics and --profile options of
+    mediadb.cli.main.cli
+    """
+
+    @pytest.mark.parametrize("fmt", ["prometheus", "json"])
+    def test_metrics(self, runner, tmp_path, fmt):
+        """
+        Tests writing the metrics of a command, to a file and to stderr.
+        Expected to count the document validated, in the given format.
+        """
+        file = tmp_path / "metrics.txt"
+        result = runner.invoke(main.cli, ["--metrics", str(file),
+                                          "--metrics-format", fmt] + CREATE)
+        assert(result.exit_code == 0)
+        if fmt == "json":
+            counters = json.loads(file.read_text())["counters"]
+            assert({"name": metrics.VALIDATED,
+                    "labels": {"model": "Movie"},
+                    "value": 1} in counters)
+        else:
+            assert(f'{metrics.VALIDATED}{{model="Movie"}} 1'
+                   in file.read_text().splitlines())
+        metrics.disable()
+        result = runner.invoke(main.cli, ["--metrics", "-"] + CREATE)
+        assert(f'{metrics.VALIDATED}{{model="Movie"}} 1'
+               in result.output.splitlines())
+
+    def test_profile(self, runner, tmp_path):
+        """
+        Tests profiling a command, to a file and to stderr.
+        Expected to dump stats that pstats reads, and to print them.
+        """
+        file = tmp_path / "create.prof"
+        result = runner.invoke(main.cli, ["--profile", str(file)] + CREATE)
+        assert(result.exit_code == 0)
+        assert(pstats.Stats(str(file)).total_calls > 0)
+        result = runner.invoke(main.cli, ["--profile", "-"] + CREATE)
+        assert(result.exit_code == 0)
+        assert("cumulative" in result.output)
+
+    def test_disabled(self, runner):
+        """
+        Tests running a command without the options.
+        Expected to leave the metrics disabled.
+        """
+        assert(runner.invoke(main.cli, CREATE).exit_code == 0)
+        assert(metrics.REGISTRY is None)
@@ -0,0 +1,139 @@
+import sys
+import time
+import json
+import random
+import asyncio
+import tempfile
+import typing as tp
+import pathlib as path
+import mediadb.models.medias as medias
+import mediadb.store.api as api
+import mediadb.store.catalogue as catalogue
+
+
+"""the maximum 99th percentile of the request latencies, in seconds"""
+BUDGET = 0.020
+
+
+def make_catalogue(file: path.Path, count: int) \
+    -> None:
+    """
+    Makes a catalogue of serie episodes, 100 per title.
+    Args:
+        file: the catalogue path.
+        count: the number of documents.
+    """
+    with catalogue.Catalogue(file) as c:
+        c.add_many(medias.Serie(title=f"Serie {i // 100}",
+                                season=1 + i % 100 // 10,
+                                episode=1 + i % 10,
+                                file=f"/series/{i // 100}/{i}.mkv")
+                   for i in range(count))
+
+
+def make_requests(titles: int) \
+    -> tp.List[bytes]:
+    """
+    Makes requests as a front-end would send: pages of the episodes of a
+    serie mostly, validations and creations.
+    Args:
+        titles: the number of serie titles.
+    Returns: the requests.
+    """
+    requests = []
+    for i in range(1000):
+        title = f"Serie%20{random.randrange(titles)}"
+        if i % 10 == 0:
+            body = json.dumps({"type": "movie", "title": f"Movie {i}",
+                               "file": f"/movies/{i}.mkv"}).encode()
+            target = "/validate" if i % 20 else "/medias"
+            requests.append(b"POST %s HTTP/1.1\r\nContent-Length: %d\r\n"
+                            b"\r\n%s" % (target.encode(), len(body), body))
+        else:
+            requests.append(b"GET /medias?title=%s&min_season=2&limit=20 "
+                            b"HTTP/1.1\r\n\r\n" % title.encode())
+    return requests
+
+
+async def client(port: int,
+                 requests: tp.List[bytes],
+                 rate: float,
+                 end: float,
+                 latencies: tp.List[float]) \
+    -> None:
+    """
+    Sends requests on a connection at a given rate, from the start time
+    they are due, such that slow answers are accounted for.
+    Args:
+        port: the server port.
+        requests: the requests to pick from.
+        rate: the number of requests per second.
+        end: the time to stop at.
+        latencies: where to append the request latencies, in seconds.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    due = time.perf_counter() + random.random() / rate
+    while due < end:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        writer.write(random.choice(requests))
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = int(headers.split(b"Content-Length: ")[1].split(b"\r")[0])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - due)
+        due += 1 / rate
+    writer.close()
+
+
+async def run(file: path.Path,
+              titles: int,
+              connections: int,
+              rate: float,
+              duration: float) \
+    -> tp.List[float]:
+    """
+    Serves a catalogue and sends it requests.
+    Args:
+        file: the catalogue path.
+        titles: the number of serie titles.
+        connections: the number of client connections.
+        rate: the total number of requests per second.
+        duration: the time to send requests for, in seconds.
+    Returns: the sorted request latencies, in seconds.
+    """
+    server = api.Server(file)
+    port = await server.start(port=0)
+    latencies = []
+    requests = make_requests(titles)
+    end = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, requests, rate / connections, end,
+                                  latencies)
+                           for _ in range(connections)))
+    await server.close()
+    return sorted(latencies)
+
+
+def main(count: int, rate: float) \
+    -> int:
+    """
+    Measures the latencies of the API over a catalogue at a given request
+    rate, the clients sharing the event loop of the server, and checks
+    their 99th percentile against BUDGET.
+    Args:
+        count: the number of documents of the catalogue.
+        rate: the number of requests per second.
+    Returns: the exit status, 1 if over budget.
+    """
+    file = path.Path(tempfile.mkdtemp(), "catalogue.db")
+    make_catalogue(file, count)
+    latencies = asyncio.run(run(file, count // 100, 20, rate, 10.0))
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[len(latencies) * 99 // 100]
+    print(f"{len(latencies)} requests at {rate:.0f}/s over {count} "
+          f"documents: p50 {p50 * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms"
+          f"{' over budget' if p99 > BUDGET else ''}")
+    return int(p99 > BUDGET)
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+                  float(sys.argv[2]) if len(sys.argv) > 2 else 300))
@@ -0,0 +1,70 @@
+import sys
+import time
+import tracemalloc
+import typing as tp
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+import mediadb.store.query as query
+import mediadb.store.table as table
+
+
+def make_documents(count: int) \
+    -> tp.Iterator[medias.VideoMedia]:
+    """
+    Makes documents, mostly serie episodes of a few thousand series,
+    then movies and documentaries.
+    Args:
+        count: the number of documents.
+    Returns: an iterator over the documents.
+    """
+    for i in range(count):
+        if i % 10 < 6:
+            title = f"Serie {i % 5000}"
+            season = i % 7 + 1
+            episode = i % 20 + 1
+            yield medias.Serie(title=title,
+                               language=const.Language.FRENCH,
+                               season=season,
+                               episode=episode,
+                               episode_name=f"Episode {i}",
+                               file=f"/media/series/{title}/Season {season}/"
+                                    f"{title} S{season:02d}E{episode:02d}.mkv")
+        elif i % 10 < 9:
+            yield medias.Movie(title=f"Movie {i}",
+                               language=const.Language.ENGLISH,
+                               subtitles=const.Language.FRENCH,
+                               file=f"/media/movies/Movie {i} (2001).mkv")
+        else:
+            yield medias.Documentary(title=f"Documentary {i}",
+                                     file=f"/media/docs/Documentary {i}.mkv")
+
+
+def main(count: int) \
+    -> None:
+    """
+    Compares the memory held by a list of documents and by a MediaTable
+    of the same documents, and times a query on the table.
+    Args:
+        count: the number of documents.
+    """
+    tracemalloc.start()
+    documents = list(make_documents(count))
+    size_list = tracemalloc.get_traced_memory()[0]
+    del documents
+    start = tracemalloc.get_traced_memory()[0]
+    t = table.MediaTable(make_documents(count))
+    size_table = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    print(f"      list: {size_list / count:.0f} bytes/document")
+    print(f"     table: {size_table / count:.0f} bytes/document "
+          f"({size_list / size_table:.1f}x less)")
+    q = query.Query(type=const.VideoType.SERIE,
+                    language=const.Language.FRENCH) \
+             .filter(query.SEASON >= 3, query.SEASON <= 4)
+    start = time.perf_counter()
+    n = len(t.indices(q))
+    print(f"     query: {time.perf_counter() - start:.3f}s ({n} documents)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
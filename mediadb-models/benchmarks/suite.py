@@ -0,0 +1,293 @@
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import itertools
+import statistics
+import subprocess
+import tracemalloc
+import importlib.util
+import typing as tp
+import pathlib as path
+import pydantic
+import synthetic
+import mediadb.models.medias as medias
+import mediadb.models.snapshot as snapshot
+import mediadb.models.constants as const
+
+
+"""the number of documents timed at once, such that millions of them can
+be streamed"""
+BATCH_SIZE = 10000
+
+"""the maximum number of documents held to measure their memory"""
+MEMORY_SAMPLE = 100000
+
+"""the number of runs of the CLI help, of which the median is kept"""
+HELP_RUNS = 10
+
+"""the default relative slowdown over the baseline flagged as a
+regression"""
+TOLERANCE = 0.25
+
+"""the version of the format of the results"""
+VERSION = 1
+
+"""the command running the CLI"""
+CLI = [sys.executable, "-m", "mediadb.cli"]
+
+
+def batches(count: int, seed: int) \
+    -> tp.Iterator[tp.List[tp.Dict[str, tp.Any]]]:
+    """
+    Makes the synthetic records, by batches.
+    Args:
+        count: the number of records.
+        seed: the seed of the generator.
+    Returns: an iterator over the batches of records.
+    """
+    records = synthetic.make_records(count, seed)
+    while True:
+        batch = list(itertools.islice(records, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def time_models(count: int, seed: int) \
+    -> tp.Dict[str, float]:
+    """
+    Times the construction of documents from their fields, their
+    serialization with model_dump_json and into a snapshot, and their
+    validation with model_validate_json and loading from the snapshot,
+    a batch of documents at a time.
+    Args:
+        count: the number of documents.
+        seed: the seed of the generator.
+    Returns: the total times, in seconds, by case name.
+    """
+    classes = {x.value: y for x, y in medias.MEDIA_CLASSES.items()}
+    totals = dict.fromkeys(("construct", "dump_json", "validate_json",
+                            "dump_snapshot", "load_snapshot"), 0.0)
+    for batch in batches(count, seed):
+        types = [classes[x["type"]] for x in batch]
+        start = time.perf_counter()
+        documents = [cls(**x) for cls, x in zip(types, batch)]
+        totals["construct"] += time.perf_counter() - start
+        start = time.perf_counter()
+        data = [x.model_dump_json() for x in documents]
+        totals["dump_json"] += time.perf_counter() - start
+        start = time.perf_counter()
+        for cls, x in zip(types, data):
+            cls.model_validate_json(x)
+        totals["validate_json"] += time.perf_counter() - start
+        start = time.perf_counter()
+        data = snapshot.dump(documents)
+        totals["dump_snapshot"] += time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot.load(data)
+        totals["load_snapshot"] += time.perf_counter() - start
+    return totals
+
+
+def measure_sizes(count: int, seed: int) \
+    -> tp.Dict[str, float]:
+    """
+    Measures the size of the documents in JSONL format and in snapshots,
+    with each compression codec available.
+    Args:
+        count: the number of documents.
+        seed: the seed of the generator.
+    Returns: the number of bytes per document, by case name.
+    """
+    codecs = [x for x in snapshot.COMPRESSIONS
+              if x != "zstd" or importlib.util.find_spec("zstandard")]
+    sizes = dict.fromkeys(["jsonl_size"] +
+                          [f"snapshot_{x}_size" for x in codecs], 0)
+    for batch in batches(count, seed):
+        documents = medias.load_many(batch)
+        sizes["jsonl_size"] += sum(len(x.model_dump_json()) + 1
+                                   for x in documents)
+        for codec in codecs:
+            sizes[f"snapshot_{codec}_size"] += \
+                len(snapshot.dump(documents, compression=codec))
+    return {name: size / count for name, size in sizes.items()}
+
+
+def measure_memory(count: int, seed: int) \
+    -> float:
+    """
+    Measures the memory held by documents, on a sample of at most
+    MEMORY_SAMPLE of them.
+    Args:
+        count: the number of documents.
+        seed: the seed of the generator.
+    Returns: the number of bytes per document.
+    """
+    count = min(count, MEMORY_SAMPLE)
+    records = list(synthetic.make_records(count, seed))
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    documents = [medias.MEDIA_CLASSES[const.VideoType(x["type"])](**x)
+                 for x in records]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del documents
+    return size / count
+
+
+def run(args: tp.List[str], stdin: tp.Optional[path.Path] = None) \
+    -> float:
+    """
+    Times a CLI command.
+    Args:
+        args: the command arguments.
+        stdin: the file to read the standard input from, if any.
+    Returns: the run time, in seconds.
+    """
+    f = subprocess.DEVNULL if stdin is None else open(stdin, "rb")
+    try:
+        start = time.perf_counter()
+        subprocess.run(CLI + args, check=True, stdin=f,
+                       stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    finally:
+        if stdin is not None:
+            f.close()
+
+
+def time_cli(count: int, seed: int) \
+    -> tp.Dict[str, float]:
+    """
+    Times the CLI: its startup, and the validation and ingestion of a
+    dump of the documents.
+    Args:
+        count: the number of documents.
+        seed: the seed of the generator.
+    Returns: the times, in seconds, by case name.
+    """
+    dump = path.Path(tempfile.mkdtemp(), "dump.jsonl")
+    with open(dump, "w") as f:
+        for batch in batches(count, seed):
+            f.writelines(json.dumps(x) + "\n" for x in batch)
+    try:
+        return {"cli_help": statistics.median(run(["--help"])
+                                              for _ in range(HELP_RUNS)),
+                "cli_validate": run(["validate", "--processes", "0",
+                                     str(dump)]),
+                "cli_ingest": run(["ingest"], stdin=dump)}
+    finally:
+        dump.unlink()
+        dump.parent.rmdir()
+
+
+def measure(count: int, seed: int, repeat: int, cli: bool) \
+    -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+    """
+    Runs the benchmarks, keeping the best time of each case over the
+    runs as the least disturbed by the rest of the machine.
+    Args:
+        count: the number of documents.
+        seed: the seed of the generator.
+        repeat: the number of runs.
+        cli: whether to time the CLI too.
+    Returns: the results by case name, as their value and unit.
+    """
+    times = {}
+    for _ in range(repeat):
+        run_times = time_models(count, seed)
+        if cli:
+            run_times.update(time_cli(count, seed))
+        for name, value in run_times.items():
+            times[name] = min(times.get(name, value), value)
+    results = {name: {"value": value / count * 1e6, "unit": "us/document"}
+               for name, value in times.items()}
+    if "cli_help" in results:
+        results["cli_help"] = {"value": times["cli_help"] * 1e3,
+                               "unit": "ms"}
+    results["memory"] = {"value": measure_memory(count, seed),
+                         "unit": "bytes/document"}
+    results.update({name: {"value": value, "unit": "bytes/document"}
+                    for name, value in measure_sizes(count, seed).items()})
+    return results
+
+
+def compare(results: tp.Dict[str, tp.Any],
+            baseline: tp.Dict[str, tp.Any],
+            tolerance: float) \
+    -> int:
+    """
+    Prints the results next to those of a baseline, all being lower
+    the better, and flags the regressions.
+    Args:
+        results: the results.
+        baseline: the baseline results.
+        tolerance: the relative increase over the baseline flagged as a
+            regression.
+    Returns: the number of regressions.
+    """
+    if (results["count"], results["seed"]) != \
+            (baseline["count"], baseline["seed"]):
+        print(f"warning: the baseline is of {baseline['count']} documents "
+              f"of seed {baseline['seed']}")
+    regressions = 0
+    for name, result in results["results"].items():
+        line = f"{name:>18}: {result['value']:10.2f} {result['unit']}"
+        if name in baseline["results"]:
+            reference = baseline["results"][name]["value"]
+            change = result["value"] / reference - 1
+            regression = change > tolerance
+            regressions += regression
+            line += f" (baseline {reference:.2f}, {change:+.0%})" \
+                    f"{' regression' if regression else ''}"
+        print(line)
+    return regressions
+
+
+def main() \
+    -> int:
+    """
+    Benchmarks the models and the CLI over synthetic documents, saves
+    the results in JSON format and compares them with a baseline.
+    Returns: the exit status, 1 if any case regressed.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.split(".")[0])
+    parser.add_argument("count", type=int, nargs="?", default=100000,
+                        help="the number of documents, 100000 by default")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="the seed of the document generator")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="the number of runs, the best being kept")
+    parser.add_argument("--no-cli", action="store_true",
+                        help="not to time the CLI")
+    parser.add_argument("--output", type=path.Path,
+                        help="where to save the results")
+    parser.add_argument("--baseline", type=path.Path,
+                        help="the results to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="the relative slowdown flagged as a "
+                             "regression")
+    args = parser.parse_args()
+    cli = not args.no_cli and \
+        importlib.util.find_spec("mediadb.cli") is not None
+    results = {"version": VERSION,
+               "python": platform.python_version(),
+               "pydantic": pydantic.VERSION,
+               "count": args.count,
+               "seed": args.seed,
+               "results": measure(args.count, args.seed, args.repeat, cli)}
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    baseline = {"count": args.count, "seed": args.seed, "results": {}}
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+    return int(compare(results, baseline, args.tolerance) > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
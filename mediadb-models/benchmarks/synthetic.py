@@ -0,0 +1,98 @@
+import random
+import typing as tp
+import mediadb.models.constants as const
+
+
+"""the words the titles are made of"""
+WORDS = ("the", "of", "a", "night", "city", "last", "man", "war", "blue",
+         "house", "river", "dark", "story", "king", "road", "north", "lost",
+         "world", "time", "secret", "summer", "island", "crown", "fire",
+         "heart", "empire", "garden", "shadow", "winter", "ocean")
+
+"""the languages of the documents, and their weights"""
+LANGUAGES = ((const.Language.ENGLISH, 6),
+             (const.Language.FRENCH, 2),
+             (const.Language.GERMAN, 1),
+             (const.Language.UNKNOWN, 1))
+
+"""the subtitle languages, none mostly"""
+SUBTITLES = (None, None, None, const.Language.FRENCH.value,
+             const.Language.ENGLISH.value)
+
+"""the media file extensions"""
+EXTENSIONS = (".mkv", ".mkv", ".mkv", ".mp4", ".avi")
+
+
+def _title(rng: random.Random) \
+    -> str:
+    """
+    Returns: a title of 1 to 5 words.
+    """
+    return " ".join(rng.choice(WORDS)
+                    for _ in range(rng.randint(1, 5))).title()
+
+
+def _language(rng: random.Random) \
+    -> const.Language:
+    """
+    Returns: a language, drawn from LANGUAGES.
+    """
+    return rng.choices([x for x, _ in LANGUAGES],
+                       [w for _, w in LANGUAGES])[0]
+
+
+def make_records(count: int, seed: int = 0) \
+    -> tp.Iterator[tp.Dict[str, tp.Any]]:
+    """
+    Makes the records of a realistic collection, the same for a given
+    seed: 60% of serie episodes, whole seasons of a few thousand series,
+    30% of movies and 10% of documentaries, mostly in English, some with
+    subtitles. The records are made lazily, such that millions of them
+    can be streamed.
+    Args:
+        count: the number of records.
+        seed: the seed of the random generator.
+    Returns: an iterator over the records, as field values by name.
+    """
+    rng = random.Random(seed)
+    # the serie season being made, its file extension and episodes left
+    season = None
+    extension = None
+    episodes = 0
+    for _ in range(count):
+        draw = rng.random()
+        if draw < 0.6:
+            if episodes == 0:
+                season = {"type": const.VideoType.SERIE.value,
+                          "title": _title(rng),
+                          "language": _language(rng).value,
+                          "subtitles": rng.choice(SUBTITLES),
+                          "season": rng.randint(1, 10),
+                          "episode": 0}
+                extension = rng.choice(EXTENSIONS)
+                episodes = rng.randint(6, 24)
+            episodes -= 1
+            season["episode"] += 1
+            title = season["title"]
+            number = f"S{season['season']:02d}E{season['episode']:02d}"
+            yield dict(season,
+                       episode_name=_title(rng) if rng.random() < 0.8
+                                    else None,
+                       file=f"/media/series/{title}/Season "
+                            f"{season['season']}/{title} {number}"
+                            f"{extension}")
+            continue
+        if draw < 0.9:
+            video_type = const.VideoType.MOVIE
+            directory = "movies"
+        else:
+            video_type = const.VideoType.DOCUMENTARY
+            directory = "docs"
+        title = _title(rng)
+        yield {"type": video_type.value,
+               "title": title,
+               "language": _language(rng).value,
+               "subtitles": rng.choice(SUBTITLES),
+               "file": f"/media/{directory}/{title} "
+                       f"({rng.randint(1950, 2024)})"
+                       f"{rng.choice(EXTENSIONS)}"}
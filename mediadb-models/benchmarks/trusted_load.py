@@ -0,0 +1,71 @@
+import gc
+import sys
+import time
+import typing as tp
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+def make_records(count: int) \
+    -> tp.List[tp.Dict[str, tp.Any]]:
+    """
+    Makes the records of documents of all types, as they are stored,
+    i.e. serialized and validated.
+    Args:
+        count: the number of records.
+    Returns: the records.
+    """
+    documents = (medias.Movie(title="Alien",
+                              language=const.Language.ENGLISH,
+                              subtitles=const.Language.FRENCH,
+                              file="/movies/alien.mkv"),
+                 medias.Documentary(title="Bowling for Columbine",
+                                    file="/docs/bowling.mkv"),
+                 medias.Serie(title="Generation Kill",
+                              language=const.Language.FRENCH,
+                              season=1,
+                              episode=3,
+                              episode_name="Screwby",
+                              file="/series/gk.s01e03.mkv"))
+    records = [x.model_dump(mode="json") for x in documents]
+    return [records[i % len(records)] for i in range(count)]
+
+
+def load_validated(records: tp.List[tp.Dict[str, tp.Any]]) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Loads documents, validating them.
+    Args:
+        records: the records.
+    Returns: the documents.
+    """
+    return [medias.MEDIA_CLASSES[const.VideoType(x["type"])](**x)
+            for x in records]
+
+
+def main(count: int) \
+    -> None:
+    """
+    Compares the time needed to reload documents with and without
+    validation.
+    Args:
+        count: the number of documents.
+    """
+    records = make_records(count)
+    timings = {}
+    for name, load in (("validated", load_validated),
+                       ("trusted", medias.load_many)):
+        gc.collect()
+        start = time.perf_counter()
+        documents = load(records)
+        timings[name] = time.perf_counter() - start
+        del documents
+        print(f"{name:>10}: {timings[name]:.2f}s "
+              f"({count / timings[name]:,.0f} documents/s)")
+    sample = records[:1000]
+    assert(medias.load_many(sample) == load_validated(sample))
+    print(f"   speedup: {timings['validated'] / timings['trusted']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,262 @@
+import os
+import itertools
+import collections
+import concurrent.futures as futures
+import typing as tp
+import pathlib as path
+import pydantic
+import mediadb.models.medias as medias
+import mediadb.models.ingest as ingest
+import mediadb.models.metrics as metrics
+
+
+"""the default number of documents per JSONL chunk"""
+CHUNK_SIZE = 10000
+
+"""the default size of the shards of the JSONL files validated in
+parallel, in bytes"""
+SHARD_SIZE = 1 << 24
+
+"""validates and serializes lists of media documents of any (known) type"""
+MEDIA_LIST: pydantic.TypeAdapter[tp.List[medias.Media]] = \
+    pydantic.TypeAdapter(tp.List[medias.Media])
+
+
+def load_json(data: tp.Union[str, bytes]) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Validates a JSON array of media documents of any type, in a single
+    pass of pydantic, the garbage collector being paused.
+    Args:
+        data: the JSON array.
+    Returns: the media documents.
+    Raises:
+        ValueError if the data is not a valid array of documents.
+    """
+    with medias.gc_paused():
+        return MEDIA_LIST.validate_json(data)
+
+
+def dump_json(documents: tp.Sequence[medias.VideoMedia]) \
+    -> bytes:
+    """
+    Serializes media documents of any type into a JSON array, in a
+    single pass of pydantic.
+    Args:
+        documents: the media documents.
+    Returns: the JSON array.
+    """
+    return MEDIA_LIST.dump_json(documents)
+
+
+def load_jsonl(stream: tp.Iterable[tp.Union[str, bytes]],
+               chunk_size: int = CHUNK_SIZE) \
+    -> tp.Iterator[tp.List[medias.VideoMedia]]:
+    """
+    Validates a JSONL stream of media documents lazily, by chunks of
+    lines, such that large streams are processed in bounded memory, the
+    garbage collector being paused. Each line is validated as a single
+    JSON document, such that a line holding several values is not valid.
+    Blank lines are skipped.
+    Args:
+        stream: the lines of the stream.
+        chunk_size: the number of lines per chunk.
+    Returns: an iterator over the media documents of each chunk.
+    Raises:
+        ValueError if a line is not a valid document, naming the line.
+    """
+    lines = enumerate(stream, start=1)
+    validate = medias.AnyMedia.validate_json
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        documents = []
+        with medias.gc_paused(), metrics.stage("validate_chunk"):
+            for line_num, line in chunk:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    documents.append(validate(line))
+                except pydantic.ValidationError as e:
+                    raise ValueError(f"line {line_num} is not a valid "
+                                     f"document ({e})") from e
+        _count_validated(documents)
+        yield documents
+
+
+def _count_validated(documents: tp.List[medias.VideoMedia]) \
+    -> None:
+    """
+    Counts the documents of a chunk validated, by model, if the metrics
+    are enabled.
+    Args:
+        documents: the documents.
+    """
+    if metrics.REGISTRY is not None:
+        for model, n in collections.Counter(type(x).__name__
+                                            for x in documents).items():
+            metrics.count(metrics.VALIDATED, n, model=model)
+
+
+def dump_jsonl(documents: tp.Iterable[medias.VideoMedia],
+               stream: tp.BinaryIO,
+               chunk_size: int = CHUNK_SIZE) \
+    -> int:
+    """
+    Serializes media documents of any type into a JSONL stream, by
+    chunks written at once.
+    Args:
+        documents: the media documents.
+        stream: the binary stream to write to.
+        chunk_size: the number of documents per chunk.
+    Returns: the number of documents written.
+    """
+    documents = iter(documents)
+    count = 0
+    while True:
+        chunk = list(itertools.islice(documents, chunk_size))
+        if not chunk:
+            return count
+        with metrics.stage("dump_chunk"):
+            stream.write(b"\n".join(map(medias.AnyMedia.dump_json, chunk))
+                         + b"\n")
+        count += len(chunk)
+
+
+class Report(tp.NamedTuple):
+    """
+    The validation report of a shard of a JSONL file.
+    """
+
+    """the number of valid documents"""
+    valid: int
+    """the lines that are not valid documents, in line order"""
+    rejects: tp.List[ingest.Reject]
+
+
+def shards(file: tp.Union[str, path.Path],
+           size: int = SHARD_SIZE) \
+    -> tp.List[tp.Tuple[int, int]]:
+    """
+    Splits a file into shards of whole lines.
+    Args:
+        file: the path to the file.
+        size: the approximate size of the shards, in bytes.
+    Returns: the (start, end) byte offsets of the shards, in file order.
+    """
+    total = os.path.getsize(file)
+    bounds = [0]
+    with open(file, "rb") as f:
+        while bounds[-1] < total:
+            # the end of the line at the size, a seek and a line read
+            f.seek(bounds[-1] + size)
+            f.readline()
+            bounds.append(min(f.tell(), total))
+    return list(zip(bounds, bounds[1:]))
+
+
+def validate_shard(file: tp.Union[str, path.Path],
+                   start: int,
+                   end: int,
+                   chunk_size: int = CHUNK_SIZE,
+                   metered: bool = False) \
+    -> tp.Tuple[int, Report, tp.Optional[metrics.Registry]]:
+    """
+    Validates the JSONL documents of a shard of a file, by chunks of
+    lines, the garbage collector being paused. Each line is validated as
+    a single JSON document, such that a line holding several values is
+    rejected. Blank lines are skipped.
+    Args:
+        file: the path to the file.
+        start: the offset of the shard, at the start of a line.
+        end: the offset of the end of the shard, at the end of a line.
+        chunk_size: the number of lines per chunk.
+        metered: whether to record the metrics in a new registry, sent
+            back, e.g. by a worker process, rather than in the registry
+            in use.
+    Returns: the number of lines of the shard, its report, the line
+        numbers of the rejects being relative to the shard, and the
+        registry of the metrics if metered, else None.
+    """
+    if metered:
+        with metrics.recording() as registry:
+            count, report, _ = validate_shard(file, start, end, chunk_size)
+        return count, report, registry
+    with open(file, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    valid = 0
+    rejects = []
+    for offset in range(0, len(lines), chunk_size):
+        chunk = enumerate(lines[offset:offset + chunk_size],
+                          start=offset + 1)
+        with medias.gc_paused(), metrics.stage("validate_chunk"):
+            for line_num, line in chunk:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ingest.validate_record(line)
+                except ValueError as e:
+                    rejects.append(ingest.Reject(
+                                    line_num,
+                                    line.decode(errors="replace"),
+                                    ingest.error_messages(e)))
+                else:
+                    valid += 1
+    return len(lines), Report(valid, rejects), None
+
+
+def validate_file(file: tp.Union[str, path.Path],
+                  processes: int = 0,
+                  shard_size: int = SHARD_SIZE) \
+    -> tp.Iterator[Report]:
+    """
+    Validates the documents of a JSONL file, e.g. a dump of millions of
+    documents, shard by shard (see validate_shard), either in the
+    calling process or in a process pool, one task per shard. The
+    workers only send back their reports, and their metrics if they are
+    enabled, merged into the registry of the calling process, and reuse
+    the type adapters of the module, compiled once per process.
+    Args:
+        file: the path to the file.
+        processes: the number of processes validating the shards, 0 to
+            validate them in the calling process.
+        shard_size: the approximate size of the shards, in bytes.
+    Returns: an iterator over the reports of the shards, in file order,
+        the line numbers of the rejects being those of the file.
+    """
+    ranges = shards(file, shard_size)
+
+    def results():
+        """
+        Yields the results of the shards, in order.
+        """
+        if processes <= 0:
+            for start, end in ranges:
+                yield validate_shard(file, start, end)
+            return
+        metered = metrics.REGISTRY is not None
+        with futures.ProcessPoolExecutor(processes) as pool:
+            pending = collections.deque()
+            for start, end in ranges:
+                pending.append(pool.submit(validate_shard, file, start, end,
+                                           CHUNK_SIZE, metered))
+                # bounds the number of shards in flight
+                if len(pending) >= 2 * processes:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    lines = 0
+    for count, report, registry in results():
+        if registry is not None and metrics.REGISTRY is not None:
+            metrics.REGISTRY.merge(registry)
+        yield Report(report.valid,
+                     [x._replace(line=x.line + lines)
+                      for x in report.rejects])
+        lines += count
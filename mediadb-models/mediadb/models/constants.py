@@ -10,11 +10,193 @@ class StrEnum(str, enum.Enum):
 
 class Language(StrEnum):
     """
-    The possible video languages.
+    The possible video languages, the ISO 639-1 languages by their
+    upper case code (see mediadb.models.languages to map other codes
+    and names to them).
     """
+    AFAR = "AA"
+    ABKHAZIAN = "AB"
+    AVESTAN = "AE"
+    AFRIKAANS = "AF"
+    AKAN = "AK"
+    AMHARIC = "AM"
+    ARAGONESE = "AN"
+    ARABIC = "AR"
+    ASSAMESE = "AS"
+    AVARIC = "AV"
+    AYMARA = "AY"
+    AZERBAIJANI = "AZ"
+    BASHKIR = "BA"
+    BELARUSIAN = "BE"
+    BULGARIAN = "BG"
+    BISLAMA = "BI"
+    BAMBARA = "BM"
+    BENGALI = "BN"
+    TIBETAN = "BO"
+    BRETON = "BR"
+    BOSNIAN = "BS"
+    CATALAN = "CA"
+    CHECHEN = "CE"
+    CHAMORRO = "CH"
+    CORSICAN = "CO"
+    CREE = "CR"
+    CZECH = "CS"
+    CHURCH_SLAVIC = "CU"
+    CHUVASH = "CV"
+    WELSH = "CY"
+    DANISH = "DA"
+    GERMAN = "DE"
+    DIVEHI = "DV"
+    DZONGKHA = "DZ"
+    EWE = "EE"
+    GREEK = "EL"
     ENGLISH = "EN"
+    ESPERANTO = "EO"
+    SPANISH = "ES"
+    ESTONIAN = "ET"
+    BASQUE = "EU"
+    PERSIAN = "FA"
+    FULAH = "FF"
+    FINNISH = "FI"
+    FIJIAN = "FJ"
+    FAROESE = "FO"
     FRENCH = "FR"
-    GERMAN = "DE"
+    WESTERN_FRISIAN = "FY"
+    IRISH = "GA"
+    SCOTTISH_GAELIC = "GD"
+    GALICIAN = "GL"
+    GUARANI = "GN"
+    GUJARATI = "GU"
+    MANX = "GV"
+    HAUSA = "HA"
+    HEBREW = "HE"
+    HINDI = "HI"
+    HIRI_MOTU = "HO"
+    CROATIAN = "HR"
+    HAITIAN = "HT"
+    HUNGARIAN = "HU"
+    ARMENIAN = "HY"
+    HERERO = "HZ"
+    INTERLINGUA = "IA"
+    INDONESIAN = "ID"
+    INTERLINGUE = "IE"
+    IGBO = "IG"
+    SICHUAN_YI = "II"
+    INUPIAQ = "IK"
+    IDO = "IO"
+    ICELANDIC = "IS"
+    ITALIAN = "IT"
+    INUKTITUT = "IU"
+    JAPANESE = "JA"
+    JAVANESE = "JV"
+    GEORGIAN = "KA"
+    KONGO = "KG"
+    KIKUYU = "KI"
+    KUANYAMA = "KJ"
+    KAZAKH = "KK"
+    KALAALLISUT = "KL"
+    KHMER = "KM"
+    KANNADA = "KN"
+    KOREAN = "KO"
+    KANURI = "KR"
+    KASHMIRI = "KS"
+    KURDISH = "KU"
+    KOMI = "KV"
+    CORNISH = "KW"
+    KIRGHIZ = "KY"
+    LATIN = "LA"
+    LUXEMBOURGISH = "LB"
+    GANDA = "LG"
+    LIMBURGISH = "LI"
+    LINGALA = "LN"
+    LAO = "LO"
+    LITHUANIAN = "LT"
+    LUBA_KATANGA = "LU"
+    LATVIAN = "LV"
+    MALAGASY = "MG"
+    MARSHALLESE = "MH"
+    MAORI = "MI"
+    MACEDONIAN = "MK"
+    MALAYALAM = "ML"
+    MONGOLIAN = "MN"
+    MARATHI = "MR"
+    MALAY = "MS"
+    MALTESE = "MT"
+    BURMESE = "MY"
+    NAURU = "NA"
+    NORWEGIAN_BOKMAL = "NB"
+    NORTH_NDEBELE = "ND"
+    NEPALI = "NE"
+    NDONGA = "NG"
+    DUTCH = "NL"
+    NORWEGIAN_NYNORSK = "NN"
+    NORWEGIAN = "NO"
+    SOUTH_NDEBELE = "NR"
+    NAVAJO = "NV"
+    CHICHEWA = "NY"
+    OCCITAN = "OC"
+    OJIBWA = "OJ"
+    OROMO = "OM"
+    ORIYA = "OR"
+    OSSETIAN = "OS"
+    PUNJABI = "PA"
+    PALI = "PI"
+    POLISH = "PL"
+    PASHTO = "PS"
+    PORTUGUESE = "PT"
+    QUECHUA = "QU"
+    ROMANSH = "RM"
+    RUNDI = "RN"
+    ROMANIAN = "RO"
+    RUSSIAN = "RU"
+    KINYARWANDA = "RW"
+    SANSKRIT = "SA"
+    SARDINIAN = "SC"
+    SINDHI = "SD"
+    NORTHERN_SAMI = "SE"
+    SANGO = "SG"
+    SINHALA = "SI"
+    SLOVAK = "SK"
+    SLOVENIAN = "SL"
+    SAMOAN = "SM"
+    SHONA = "SN"
+    SOMALI = "SO"
+    ALBANIAN = "SQ"
+    SERBIAN = "SR"
+    SWATI = "SS"
+    SOUTHERN_SOTHO = "ST"
+    SUNDANESE = "SU"
+    SWEDISH = "SV"
+    SWAHILI = "SW"
+    TAMIL = "TA"
+    TELUGU = "TE"
+    TAJIK = "TG"
+    THAI = "TH"
+    TIGRINYA = "TI"
+    TURKMEN = "TK"
+    TAGALOG = "TL"
+    TSWANA = "TN"
+    TONGA = "TO"
+    TURKISH = "TR"
+    TSONGA = "TS"
+    TATAR = "TT"
+    TWI = "TW"
+    TAHITIAN = "TY"
+    UIGHUR = "UG"
+    UKRAINIAN = "UK"
+    URDU = "UR"
+    UZBEK = "UZ"
+    VENDA = "VE"
+    VIETNAMESE = "VI"
+    VOLAPUK = "VO"
+    WALLOON = "WA"
+    WOLOF = "WO"
+    XHOSA = "XH"
+    YIDDISH = "YI"
+    YORUBA = "YO"
+    ZHUANG = "ZA"
+    CHINESE = "ZH"
+    ZULU = "ZU"
     UNKNOWN = "unknown"
 
 
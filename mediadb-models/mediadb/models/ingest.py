@@ -0,0 +1,229 @@
+import csv
+import json
+import time
+import typing as tp
+import pydantic
+import mediadb.models.constants as const
+import mediadb.models.medias as medias
+import mediadb.models.metrics as metrics
+
+
+"""the supported input formats"""
+FORMATS = ("jsonl", "csv")
+
+"""the names of the models, by type value, as the metrics label them"""
+_MODEL_NAMES = {x.value: y.__name__ for x, y in medias.MEDIA_CLASSES.items()}
+
+
+class Reject(tp.NamedTuple):
+    """
+    A record that could not be turned into a media document.
+    """
+
+    """the line number of the record in the input stream"""
+    line: int
+    """the record, as read from the input stream"""
+    record: tp.Any
+    """the reasons why the record was rejected"""
+    errors: tp.List[str]
+
+    def model_dump_json(self) \
+        -> str:
+        """
+        Serializes the reject in JSON format, mirroring the media
+        documents API so that both can be written the same way.
+        Returns: the JSON string.
+        """
+        return json.dumps({"line": self.line,
+                           "errors": self.errors,
+                           "record": self.record},
+                          default=str)
+
+
+def read_jsonl(stream: tp.Iterable[str]) \
+    -> tp.Iterator[tp.Tuple[int, str]]:
+    """
+    Reads a JSONL stream lazily. Blank lines are skipped.
+    Args:
+        stream: the lines of the stream.
+    Returns: an iterator over (line number, line) pairs.
+    """
+    for line_num, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            yield line_num, line
+
+
+def read_csv(stream: tp.Iterable[str]) \
+    -> tp.Iterator[tp.Tuple[int, tp.Dict[str, str]]]:
+    """
+    Reads a CSV stream lazily. The first row must be a header
+    naming the media fields. Empty cells are dropped such that
+    the model defaults apply.
+    Args:
+        stream: the lines of the stream.
+    Returns: an iterator over (line number, record) pairs.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {key: value
+                                for key, value in row.items()
+                                if key and value not in ("", None)}
+
+
+def validate_record(record: tp.Any) \
+    -> medias.VideoMedia:
+    """
+    Builds the media document described by a record, its type field
+    picking the model, in a single pass of pydantic. The documents
+    validated and rejected are counted, and the validation timed, if
+    the metrics are enabled (see mediadb.models.metrics).
+    Args:
+        record: a dict of fields or a JSON object string.
+    Returns: the media document.
+    Raises:
+        ValueError if the record is not a valid document.
+    """
+    registry = metrics.REGISTRY
+    if registry is None:
+        return _validate_record(record)
+    start = time.perf_counter()
+    try:
+        document = _validate_record(record)
+    except ValueError as e:
+        registry.count(metrics.REJECTED, model=_model_name(e))
+        raise
+    finally:
+        registry.observe(metrics.STAGE_SECONDS,
+                         time.perf_counter() - start,
+                         stage="validate")
+    registry.count(metrics.VALIDATED, model=type(document).__name__)
+    return document
+
+
+def _validate_record(record: tp.Any) \
+    -> medias.VideoMedia:
+    """
+    Builds the media document described by a record (see
+    validate_record), without metrics.
+    Args:
+        record: a dict of fields or a JSON object string.
+    Returns: the media document.
+    Raises:
+        ValueError if the record is not a valid document.
+    """
+    if isinstance(record, (str, bytes)):
+        return medias.AnyMedia.validate_json(record)
+    return medias.AnyMedia.validate_python(record)
+
+
+def _model_name(error: ValueError) \
+    -> str:
+    """
+    Tells the model a record was validated with from its validation
+    error, the type of the record picking it.
+    Args:
+        error: the validation error.
+    Returns: the model name, unknown if the type was missing or invalid.
+    """
+    if isinstance(error, pydantic.ValidationError):
+        location = error.errors(include_url=False)[0]["loc"]
+        if location and location[0] in _MODEL_NAMES:
+            return _MODEL_NAMES[location[0]]
+    return "unknown"
+
+
+def error_messages(error: ValueError) \
+    -> tp.List[str]:
+    """
+    Formats the messages of a validation error, prefixed by the
+    location of the failure, if any, e.g. serie.season for a serie.
+    Args:
+        error: the error.
+    Returns: one message per failure.
+    """
+    if isinstance(error, pydantic.ValidationError):
+        return [f"{'.'.join(str(x) for x in e['loc'])}: {e['msg']}"
+                if e["loc"] else e["msg"]
+                for e in error.errors(include_url=False)]
+    return [str(error)]
+
+
+def validate(records: tp.Iterable[tp.Tuple[int, tp.Any]]) \
+    -> tp.Iterator[tp.Union[medias.VideoMedia, Reject]]:
+    """
+    Validates records lazily, one at a time, such that
+    arbitrary long streams are processed in constant memory.
+    Args:
+        records: (line number, record) pairs as returned by
+            read_jsonl() or read_csv().
+    Returns: an iterator over the media documents, or a Reject
+        for each record that failed validation.
+    """
+    for line_num, record in records:
+        try:
+            yield validate_record(record)
+        except ValueError as e:
+            yield Reject(line_num, record, error_messages(e))
+
+
+def write(documents: tp.Iterable[tp.Any],
+          valid_out: tp.TextIO,
+          reject_out: tp.TextIO) \
+    -> tp.Tuple[int, int]:
+    """
+    Writes media documents and rejects, in JSONL format, to separate
+    streams.
+    Args:
+        documents: the media documents, mixed with rejects, which
+            are recognized by their errors attribute.
+        valid_out: the stream to write the media documents to.
+        reject_out: the stream to write the rejects to.
+    Returns: the number of documents and rejects written.
+    """
+    registry = metrics.REGISTRY
+    n_valid = 0
+    n_reject = 0
+    for document in documents:
+        if registry is not None:
+            start = time.perf_counter()
+        if hasattr(document, "errors"):
+            reject_out.write(document.model_dump_json() + "\n")
+            n_reject += 1
+        else:
+            valid_out.write(document.model_dump_json() + "\n")
+            n_valid += 1
+        if registry is not None:
+            registry.observe(metrics.STAGE_SECONDS,
+                             time.perf_counter() - start,
+                             stage="write")
+    return n_valid, n_reject
+
+
+def ingest(stream: tp.Iterable[str],
+           valid_out: tp.TextIO,
+           reject_out: tp.TextIO,
+           fmt: str = "jsonl") \
+    -> tp.Tuple[int, int]:
+    """
+    Validates all the records of a stream and writes the valid
+    documents and the rejects, in JSONL format, to separate
+    streams. The read, validate and write stages are timed if the
+    metrics are enabled.
+    Args:
+        stream: the input stream.
+        valid_out: the stream to write the valid documents to.
+        reject_out: the stream to write the rejects to.
+        fmt: the input stream format, one of FORMATS.
+    Returns: the number of valid and rejected records.
+    Raises:
+        ValueError if the format is not supported.
+    """
+    if fmt == "jsonl":
+        records = read_jsonl(stream)
+    elif fmt == "csv":
+        records = read_csv(stream)
+    else:
+        raise ValueError(f"format is not supported ({fmt})")
+    records = metrics.timed(records, "read")
+    return write(validate(records), valid_out, reject_out)
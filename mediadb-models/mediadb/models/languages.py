@@ -0,0 +1,206 @@
+import types
+import unicodedata
+import typing as tp
+import mediadb.models.constants as const
+
+
+"""the ISO 639-2 codes of each ISO 639-1 code, the terminology code then
+the bibliographic one if they differ, e.g. fra and fre for fr"""
+ALPHA3 = {
+    "aa": "aar", "ab": "abk", "ae": "ave", "af": "afr", "ak": "aka",
+    "am": "amh", "an": "arg", "ar": "ara", "as": "asm", "av": "ava",
+    "ay": "aym", "az": "aze", "ba": "bak", "be": "bel", "bg": "bul",
+    "bi": "bis", "bm": "bam", "bn": "ben", "bo": "bod tib", "br": "bre",
+    "bs": "bos", "ca": "cat", "ce": "che", "ch": "cha", "co": "cos",
+    "cr": "cre", "cs": "ces cze", "cu": "chu", "cv": "chv", "cy": "cym wel",
+    "da": "dan", "de": "deu ger", "dv": "div", "dz": "dzo", "ee": "ewe",
+    "el": "ell gre", "en": "eng", "eo": "epo", "es": "spa", "et": "est",
+    "eu": "eus baq", "fa": "fas per", "ff": "ful", "fi": "fin", "fj": "fij",
+    "fo": "fao", "fr": "fra fre", "fy": "fry", "ga": "gle", "gd": "gla",
+    "gl": "glg", "gn": "grn", "gu": "guj", "gv": "glv", "ha": "hau",
+    "he": "heb", "hi": "hin", "ho": "hmo", "hr": "hrv", "ht": "hat",
+    "hu": "hun", "hy": "hye arm", "hz": "her", "ia": "ina", "id": "ind",
+    "ie": "ile", "ig": "ibo", "ii": "iii", "ik": "ipk", "io": "ido",
+    "is": "isl ice", "it": "ita", "iu": "iku", "ja": "jpn", "jv": "jav",
+    "ka": "kat geo", "kg": "kon", "ki": "kik", "kj": "kua", "kk": "kaz",
+    "kl": "kal", "km": "khm", "kn": "kan", "ko": "kor", "kr": "kau",
+    "ks": "kas", "ku": "kur", "kv": "kom", "kw": "cor", "ky": "kir",
+    "la": "lat", "lb": "ltz", "lg": "lug", "li": "lim", "ln": "lin",
+    "lo": "lao", "lt": "lit", "lu": "lub", "lv": "lav", "mg": "mlg",
+    "mh": "mah", "mi": "mri mao", "mk": "mkd mac", "ml": "mal", "mn": "mon",
+    "mr": "mar", "ms": "msa may", "mt": "mlt", "my": "mya bur", "na": "nau",
+    "nb": "nob", "nd": "nde", "ne": "nep", "ng": "ndo", "nl": "nld dut",
+    "nn": "nno", "no": "nor", "nr": "nbl", "nv": "nav", "ny": "nya",
+    "oc": "oci", "oj": "oji", "om": "orm", "or": "ori", "os": "oss",
+    "pa": "pan", "pi": "pli", "pl": "pol", "ps": "pus", "pt": "por",
+    "qu": "que", "rm": "roh", "rn": "run", "ro": "ron rum", "ru": "rus",
+    "rw": "kin", "sa": "san", "sc": "srd", "sd": "snd", "se": "sme",
+    "sg": "sag", "si": "sin", "sk": "slk slo", "sl": "slv", "sm": "smo",
+    "sn": "sna", "so": "som", "sq": "sqi alb", "sr": "srp", "ss": "ssw",
+    "st": "sot", "su": "sun", "sv": "swe", "sw": "swa", "ta": "tam",
+    "te": "tel", "tg": "tgk", "th": "tha", "ti": "tir", "tk": "tuk",
+    "tl": "tgl", "tn": "tsn", "to": "ton", "tr": "tur", "ts": "tso",
+    "tt": "tat", "tw": "twi", "ty": "tah", "ug": "uig", "uk": "ukr",
+    "ur": "urd", "uz": "uzb", "ve": "ven", "vi": "vie", "vo": "vol",
+    "wa": "wln", "wo": "wol", "xh": "xho", "yi": "yid", "yo": "yor",
+    "za": "zha", "zh": "zho chi", "zu": "zul"
+}
+
+"""the names of the languages other than their English name (the name
+of their member), i.e. the native names of the most spoken ones and the
+usual alternative names, in lower case"""
+NAMES = {
+    const.Language.ALBANIAN: ("shqip",),
+    const.Language.ARABIC: ("العربية",),
+    const.Language.BENGALI: ("bangla", "বাংলা"),
+    const.Language.BULGARIAN: ("български",),
+    const.Language.BURMESE: ("myanmar",),
+    const.Language.CATALAN: ("català", "valencian"),
+    const.Language.CHINESE: ("中文", "汉语", "漢語", "mandarin"),
+    const.Language.CROATIAN: ("hrvatski",),
+    const.Language.CZECH: ("čeština", "cesky"),
+    const.Language.DANISH: ("dansk",),
+    const.Language.DIVEHI: ("dhivehi", "maldivian"),
+    const.Language.DUTCH: ("nederlands", "flemish", "vlaams"),
+    const.Language.ESTONIAN: ("eesti",),
+    const.Language.FINNISH: ("suomi",),
+    const.Language.FRENCH: ("français", "francais"),
+    const.Language.GERMAN: ("deutsch",),
+    const.Language.GREEK: ("ελληνικά", "modern greek"),
+    const.Language.HEBREW: ("עברית", "ivrit"),
+    const.Language.HINDI: ("हिन्दी",),
+    const.Language.HUNGARIAN: ("magyar",),
+    const.Language.ICELANDIC: ("íslenska",),
+    const.Language.INDONESIAN: ("bahasa indonesia",),
+    const.Language.IRISH: ("gaeilge",),
+    const.Language.ITALIAN: ("italiano",),
+    const.Language.JAPANESE: ("日本語", "nihongo"),
+    const.Language.KIRGHIZ: ("kyrgyz",),
+    const.Language.KOREAN: ("한국어", "조선말"),
+    const.Language.LATVIAN: ("latviešu",),
+    const.Language.LITHUANIAN: ("lietuvių",),
+    const.Language.MALAY: ("bahasa melayu",),
+    const.Language.NORWEGIAN: ("norsk",),
+    const.Language.NORWEGIAN_BOKMAL: ("bokmål", "norsk bokmål"),
+    const.Language.NORWEGIAN_NYNORSK: ("nynorsk", "norsk nynorsk"),
+    const.Language.PERSIAN: ("فارسی", "farsi"),
+    const.Language.POLISH: ("polski",),
+    const.Language.PORTUGUESE: ("português", "brazilian"),
+    const.Language.PUNJABI: ("panjabi",),
+    const.Language.PASHTO: ("pushto",),
+    const.Language.ROMANIAN: ("română", "moldavian", "moldovan"),
+    const.Language.RUSSIAN: ("русский",),
+    const.Language.SCOTTISH_GAELIC: ("gaelic", "gàidhlig"),
+    const.Language.SERBIAN: ("српски", "srpski"),
+    const.Language.SINHALA: ("sinhalese",),
+    const.Language.SLOVAK: ("slovenčina",),
+    const.Language.SLOVENIAN: ("slovene", "slovenščina"),
+    const.Language.SPANISH: ("español", "castellano", "castilian"),
+    const.Language.SWEDISH: ("svenska",),
+    const.Language.TAGALOG: ("filipino",),
+    const.Language.THAI: ("ไทย",),
+    const.Language.TURKISH: ("türkçe",),
+    const.Language.UIGHUR: ("uyghur",),
+    const.Language.UKRAINIAN: ("українська",),
+    const.Language.VIETNAMESE: ("tiếng việt",),
+    const.Language.VOLAPUK: ("volapük",),
+    const.Language.WELSH: ("cymraeg",),
+}
+
+"""the ISO 639-2 codes and the names of no language in particular"""
+UNDETERMINED = ("und", "mis", "mul", "zxx", "unknown", "undetermined")
+
+
+def _simplify(value: str) \
+    -> str:
+    """
+    Simplifies a language code or name as the keys of the lookup table,
+    i.e. in lower case, without accents, and without the subtags of a
+    BCP 47 tag (e.g. en-US or pt_BR).
+    Args:
+        value: the code or name.
+    Returns: the simplified value.
+    """
+    value = value.strip("\x00 \t").lower().replace("_", "-")
+    if "-" in value and not value.startswith("-"):
+        value = value.split("-", 1)[0]
+    if not value.isascii():
+        value = "".join(x for x in unicodedata.normalize("NFKD", value)
+                        if not unicodedata.combining(x))
+    return value
+
+
+def _table() \
+    -> tp.Mapping[str, const.Language]:
+    """
+    Builds the lookup table, once at import.
+    Returns: the languages, by code and name as given, e.g. FR, and
+        simplified, e.g. fre and francais.
+    """
+    table = {}
+    for language in const.Language:
+        if language is const.Language.UNKNOWN:
+            names = UNDETERMINED
+        else:
+            names = (language.value,
+                     *ALPHA3[language.value.lower()].split(),
+                     language.name.replace("_", " "),
+                     *NAMES.get(language, ()))
+        for name in names:
+            table[name] = language
+            table[_simplify(name)] = language
+    return types.MappingProxyType(table)
+
+
+"""the languages, by code and name, as given and simplified"""
+TABLE = _table()
+
+
+def lookup(value: str) \
+    -> tp.Optional[const.Language]:
+    """
+    Maps an ISO 639-1 code (e.g. fr), an ISO 639-2 code (e.g. fre or
+    fra), a BCP 47 tag (e.g. fr-CA) or a language name, in English or
+    native (e.g. French or Français), whatever the case, to a language,
+    with one dict lookup for the exact codes and two for the others.
+    Args:
+        value: the code or name.
+    Returns: the language, UNKNOWN for the codes of no language in
+        particular (e.g. und), None if not known.
+    """
+    language = TABLE.get(value)
+    if language is None:
+        language = TABLE.get(_simplify(value))
+    return language
+
+
+def normalize(value: str) \
+    -> const.Language:
+    """
+    Maps a language code or name to a language (see lookup), e.g. the
+    tags of the tracks of a media file.
+    Args:
+        value: the code or name.
+    Returns: the language, UNKNOWN if not known.
+    """
+    language = TABLE.get(value)
+    if language is None:
+        language = TABLE.get(_simplify(value), const.Language.UNKNOWN)
+    return language
+
+
+def parse(value: tp.Any) \
+    -> const.Language:
+    """
+    Maps a language code or name to a language (see lookup), e.g. the
+    value of a command line option.
+    Args:
+        value: the code or name, or a language.
+    Returns: the language.
+    Raises:
+        ValueError if the language is not known.
+    """
+    language = lookup(value) if isinstance(value, str) else None
+    if language is None:
+        raise ValueError(f"language is not known ({value})")
+    return language
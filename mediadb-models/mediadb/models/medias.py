@@ -1,9 +1,35 @@
-from pydantic import BaseModel, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, \
+    field_validator, model_validator
 import typing as tp
 import typing_extensions as tp_ext
+import gc
 import abc
+import contextlib
+import functools
 import pathlib as path
 import mediadb.models.constants as const
+import mediadb.models.languages as languages
+import mediadb.models.metrics as metrics
+
+
+"""the languages, by value"""
+_LANGUAGES = {x.value: x for x in const.Language}
+
+
+@functools.lru_cache(maxsize=None)
+def _trusted_fields(model: tp.Type[BaseModel]) \
+    -> tp.Tuple[tp.Dict[str, tp.Any], tp.FrozenSet[str]]:
+    """
+    Gives the fields of a model, as needed to build instances from
+    trusted values.
+    Args:
+        model: the model class.
+    Returns: the default value of each field, by name, and the names of
+        the required fields.
+    """
+    return ({name: field.default for name, field in model.model_fields.items()},
+            frozenset(name for name, field in model.model_fields.items()
+                      if field.is_required()))
 
 
 class VideoMedia(BaseModel, abc.ABC):
@@ -21,6 +47,21 @@ class VideoMedia(BaseModel, abc.ABC):
     type: const.VideoType = const.VideoType.UNKNOWN
     """the path to the media file"""
     file: path.Path
+    """the fingerprint of the media file content, the same for all its
+    copies, None if not computed (see mediadb.scan.fingerprint)"""
+    fingerprint: tp.Optional[str] = None
+    """the fields identifying the media, whatever its file (see key)"""
+    KEY_FIELDS: tp.ClassVar[tp.Tuple[str, ...]] = ("type", "title",
+                                                   "language")
+
+    @property
+    def key(self) \
+        -> tp.Tuple[tp.Any, ...]:
+        """
+        Returns: the identity key of the media, i.e. the values of its
+            KEY_FIELDS, the same for all the copies of the media.
+        """
+        return tuple(self.__dict__[x] for x in self.KEY_FIELDS)
 
     @field_validator("title")
     @classmethod
@@ -36,40 +77,104 @@ class VideoMedia(BaseModel, abc.ABC):
         # if value is None:
         #     raise ValueError("value cannot be None")
         if value == "":
+            metrics.count(metrics.VALIDATOR_FAILURES,
+                          model=cls.__name__,
+                          validator="check_notempty")
             raise ValueError("value cannot be empty")
         return value
 
+    @field_validator("language", "subtitles", mode="before")
+    @classmethod
+    def normalize_language(cls, value: tp.Any) \
+        -> tp.Any:
+        """
+        Maps the language codes and names to the languages, e.g. fre or
+        Français to FRENCH (see mediadb.models.languages).
+        Args:
+            value: the value to check.
+        Returns: the language, or the given value if not a string.
+        """
+        if isinstance(value, str):
+            language = languages.lookup(value)
+            if language is None:
+                metrics.count(metrics.VALIDATOR_FAILURES,
+                              model=cls.__name__,
+                              validator="normalize_language")
+                raise ValueError(f"language is not known ({value})")
+            return language
+        return value
+
+    @model_validator(mode="before")
+    @classmethod
+    def set_type(cls, data: tp.Any) \
+        -> tp.Any:
+        """
+        Forces type to the one of the model, for the models of a given
+        type (see the subclasses), whatever the type given.
+        Args:
+            data: the values to validate.
+        Returns: the values, with the type replaced.
+        """
+        video_type = cls.model_fields["type"].default
+        if video_type is not const.VideoType.UNKNOWN and \
+            isinstance(data, dict) and data.get("type") != video_type:
+            data = dict(data, type=video_type)
+        return data
+
+    @classmethod
+    def from_trusted(cls, fields: tp.Mapping[str, tp.Any]) \
+        -> tp_ext.Self:
+        """
+        Builds a document from values that were already validated, e.g.
+        when reloading documents from our own store, without validating
+        them again. Like model_construct, but the values are given as a
+        mapping, as for model_validate, and may be in their serialized
+        form (enumeration values and path strings), the fields that are
+        not part of the model are ignored and the type is forced as when
+        validating.
+        Args:
+            fields: the field values, by name.
+        Returns: the document.
+        Raises:
+            ValueError if a required field is missing.
+        """
+        defaults, required = _trusted_fields(cls)
+        if not fields.keys() >= required:
+            raise ValueError(f"fields are missing "
+                             f"({', '.join(sorted(required - fields.keys()))})")
+        values = {name: fields.get(name, default)
+                  for name, default in defaults.items()}
+        values["language"] = _LANGUAGES[values["language"]]
+        if values["subtitles"] is not None:
+            values["subtitles"] = _LANGUAGES[values["subtitles"]]
+        values["type"] = defaults["type"]
+        values["file"] = path.Path(values["file"])
+        document = cls.__new__(cls)
+        object.__setattr__(document, "__dict__", values)
+        object.__setattr__(document, "__pydantic_fields_set__",
+                           values.keys() & fields.keys() | {"type"})
+        object.__setattr__(document, "__pydantic_extra__", None)
+        object.__setattr__(document, "__pydantic_private__", None)
+        return document
+
     
 class Movie(VideoMedia):
     """
     A class modeling a movie.
     """
-    
-    @model_validator(mode="after")
-    def set_type(self) \
-        -> tp_ext.Self:
-        """
-        Forces type to MOVIE.
-        Returns: the instance itself.
-        """
-        self.type = const.VideoType.MOVIE
-        return self
+
+    """the media type, always MOVIE"""
+    type: tp.Literal[const.VideoType.MOVIE] = const.VideoType.MOVIE
 
 
 class Documentary(VideoMedia):
     """
     A class modeling a documentary.
     """
-    
-    @model_validator(mode="after")
-    def set_type(self) \
-        -> tp_ext.Self:
-        """
-        Forces type to DOCUMENTARY.
-        Returns: the instance itself.
-        """
-        self.type = const.VideoType.DOCUMENTARY
-        return self
+
+    """the media type, always DOCUMENTARY"""
+    type: tp.Literal[const.VideoType.DOCUMENTARY] = \
+        const.VideoType.DOCUMENTARY
 
 
 class Serie(VideoMedia):
@@ -83,16 +188,11 @@ class Serie(VideoMedia):
     episode: int
     """The episode name, optionnal"""
     episode_name: tp.Optional[str] = None
-    
-    @model_validator(mode="after")
-    def set_type(self) \
-        -> tp_ext.Self:
-        """
-        Forces type to SERIE.
-        Returns: the instance itself.
-        """
-        self.type = const.VideoType.SERIE
-        return self
+    """the media type, always SERIE"""
+    type: tp.Literal[const.VideoType.SERIE] = const.VideoType.SERIE
+    """the fields identifying the episode, whatever its file (see key)"""
+    KEY_FIELDS: tp.ClassVar[tp.Tuple[str, ...]] = ("type", "title", "season",
+                                                   "episode", "language")
     
     @field_validator("season", "episode")
     @classmethod
@@ -105,6 +205,9 @@ class Serie(VideoMedia):
         if value > 0:
             return value
         else:
+            metrics.count(metrics.VALIDATOR_FAILURES,
+                          model=cls.__name__,
+                          validator="is_bigger_zero")
             raise ValueError("value must be > 0 ({value})")
     
     @field_validator("episode_name")
@@ -118,7 +221,203 @@ class Serie(VideoMedia):
         Returns: the given value.
         """
         if value == "":
+            metrics.count(metrics.VALIDATOR_FAILURES,
+                          model=cls.__name__,
+                          validator="check_notempty_serie")
             raise ValueError("value cannot be empty")
         return value
 
 
+class FrozenMedia(VideoMedia, abc.ABC):
+    """
+    An abstract base model for the frozen variants of the media models,
+    whose fields cannot be changed once validated, such that they can be
+    shared by threads without copies. Their identity key is computed
+    once, when they are built, and they are hashed and compared by key,
+    such that copies of a media in different files are equal, e.g. to
+    deduplicate documents with a set or to join them with a dict.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    def model_post_init(self, context: tp.Any) \
+        -> None:
+        """
+        Computes the identity key of the media and its hash, once
+        validated. They are kept with the private attributes, which
+        pydantic copies and pickles along with the fields, but not
+        declared as such, not to pay for their initialization.
+        Args:
+            context: the validation context, unused.
+        """
+        key = tuple(self.__dict__[x] for x in self.KEY_FIELDS)
+        object.__setattr__(self, "__pydantic_private__",
+                           {"key": key, "hash": hash(key)})
+
+    @property
+    def key(self) \
+        -> tp.Tuple[tp.Any, ...]:
+        """
+        Returns: the identity key of the media (see VideoMedia.key), as
+            computed when built.
+        """
+        return self.__pydantic_private__["key"]
+
+    def __hash__(self) \
+        -> int:
+        return self.__pydantic_private__["hash"]
+
+    def __eq__(self, other: tp.Any) \
+        -> bool:
+        if isinstance(other, FrozenMedia):
+            return self.__pydantic_private__ == other.__pydantic_private__
+        return NotImplemented
+
+    @classmethod
+    def from_trusted(cls, fields: tp.Mapping[str, tp.Any]) \
+        -> tp_ext.Self:
+        """
+        Builds a document from values that were already validated (see
+        VideoMedia.from_trusted), with its identity key.
+        Args:
+            fields: the field values, by name.
+        Returns: the document.
+        Raises:
+            ValueError if a required field is missing.
+        """
+        document = super().from_trusted(fields)
+        document.model_post_init(None)
+        return document
+
+    def model_copy(self,
+                   *,
+                   update: tp.Optional[tp.Dict[str, tp.Any]] = None,
+                   deep: bool = False) \
+        -> tp_ext.Self:
+        """
+        Copies the document, with its identity key updated along with
+        the fields.
+        Args:
+            update: the values of the fields to change, not validated.
+            deep: whether to copy the field values too.
+        Returns: the copy.
+        """
+        document = super().model_copy(update=update, deep=deep)
+        if update:
+            document.model_post_init(None)
+        return document
+
+
+class FrozenMovie(Movie, FrozenMedia):
+    """
+    A frozen movie, identified by its type, title and language.
+    """
+
+
+class FrozenDocumentary(Documentary, FrozenMedia):
+    """
+    A frozen documentary, identified by its type, title and language.
+    """
+
+
+class FrozenSerie(Serie, FrozenMedia):
+    """
+    A frozen serie episode, identified by its type, title, season,
+    episode and language.
+    """
+
+
+"""the model class to use for each (known) video type"""
+MEDIA_CLASSES: tp.Dict[const.VideoType, tp.Type[VideoMedia]] = {
+    const.VideoType.MOVIE: Movie,
+    const.VideoType.DOCUMENTARY: Documentary,
+    const.VideoType.SERIE: Serie,
+}
+
+"""the frozen model class to use for each (known) video type"""
+FROZEN_CLASSES: tp.Dict[const.VideoType, tp.Type[FrozenMedia]] = {
+    const.VideoType.MOVIE: FrozenMovie,
+    const.VideoType.DOCUMENTARY: FrozenDocumentary,
+    const.VideoType.SERIE: FrozenSerie,
+}
+
+"""a media document of any (known) type, the model being picked by pydantic
+from the type field"""
+Media = tp.Annotated[tp.Union[Movie, Documentary, Serie],
+                    Field(discriminator="type")]
+
+"""validates and serializes media documents of any (known) type, e.g.
+AnyMedia.validate_json(data)"""
+AnyMedia: TypeAdapter[Media] = TypeAdapter(Media)
+
+"""a frozen media document of any (known) type (see Media)"""
+Frozen = tp.Annotated[tp.Union[FrozenMovie, FrozenDocumentary, FrozenSerie],
+                      Field(discriminator="type")]
+
+"""validates and serializes frozen media documents of any (known) type,
+e.g. AnyFrozenMedia.validate_json(data)"""
+AnyFrozenMedia: TypeAdapter[Frozen] = TypeAdapter(Frozen)
+
+
+@contextlib.contextmanager
+def gc_paused() \
+    -> tp.Iterator[None]:
+    """
+    Pauses the garbage collector, e.g. while building many documents.
+    The documents have no reference cycles, whereas the collections
+    triggered by their allocations would take longer and longer as
+    they pile up.
+    Returns: a context manager, restoring the collector on exit.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load_many(records: tp.Iterable[tp.Mapping[str, tp.Any]],
+              frozen: bool = False) \
+    -> tp.List[VideoMedia]:
+    """
+    Builds documents of any type from records that were already
+    validated, without validating them again (see
+    VideoMedia.from_trusted), the garbage collector being paused.
+    Args:
+        records: the field values of each document, by name, including
+            the type.
+        frozen: whether to build frozen documents (see FrozenMedia).
+    Returns: the documents.
+    Raises:
+        ValueError if the type of a record is missing or not known, or
+            a required field is missing.
+    """
+    classes = FROZEN_CLASSES if frozen else MEDIA_CLASSES
+    documents = []
+    with gc_paused():
+        for record in records:
+            try:
+                model = classes.get(const.VideoType(record.get("type")))
+            except ValueError:
+                model = None
+            if model is None:
+                raise ValueError(f"type is not known "
+                                 f"({record.get('type')})")
+            documents.append(model.from_trusted(record))
+    return documents
+
+
+def freeze(document: VideoMedia) \
+    -> FrozenMedia:
+    """
+    Gives the frozen variant of a document, without validating it
+    again.
+    Args:
+        document: the document.
+    Returns: the frozen document, the given one if already frozen.
+    """
+    if isinstance(document, FrozenMedia):
+        return document
+    return FROZEN_CLASSES[document.type].from_trusted(document.__dict__)
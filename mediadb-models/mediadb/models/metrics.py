@@ -0,0 +1,384 @@
+import json
+import time
+import bisect
+import threading
+import contextlib
+import typing as tp
+
+
+"""the number of documents validated, by model"""
+VALIDATED = "mediadb_documents_validated_total"
+
+"""the number of records that failed validation, by model, unknown if
+the model could not be told"""
+REJECTED = "mediadb_documents_rejected_total"
+
+"""the number of failures of the validators, by model and validator"""
+VALIDATOR_FAILURES = "mediadb_validator_failures_total"
+
+"""the time spent in each stage, in seconds, e.g. per record validated"""
+STAGE_SECONDS = "mediadb_stage_seconds"
+
+"""the help of the metrics, as exported"""
+HELP = {
+    VALIDATED: "The number of documents validated.",
+    REJECTED: "The number of records that failed validation.",
+    VALIDATOR_FAILURES: "The number of failures of the validators.",
+    STAGE_SECONDS: "The time spent in each stage, in seconds.",
+}
+
+"""the upper bounds of the buckets of the histograms, in seconds, from
+a cached lookup to a slow file system"""
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+"""the labels of a metric, as sorted (name, value) pairs"""
+Labels = tp.Tuple[tp.Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    A histogram of values, e.g. latencies, counted in buckets.
+    """
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) \
+        -> None:
+        """the number of values per bucket, the last one for the values
+        over the bounds"""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        """the sum of the values"""
+        self.sum = 0.0
+        """the number of values"""
+        self.count = 0
+
+    def observe(self, value: float) \
+        -> None:
+        """
+        Adds a value to the histogram.
+        Args:
+            value: the value.
+        """
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) \
+        -> tp.List[tp.Tuple[float, int]]:
+        """
+        Returns: the (upper bound, number of values up to it) pairs of
+            the buckets, as exported, the last bound being infinite.
+        """
+        total = 0
+        buckets = []
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class Registry:
+    """
+    The counters and histograms of a process. It is shared by the
+    threads of the process, whereas the workers of a process pool record
+    theirs in their own, sent back to be merged (see recording).
+    """
+
+    def __init__(self) \
+        -> None:
+        """the counters, by name and labels"""
+        self.counters: tp.Dict[tp.Tuple[str, Labels], int] = {}
+        """the histograms, by name and labels"""
+        self.histograms: tp.Dict[tp.Tuple[str, Labels], Histogram] = {}
+        """the lock of the metrics"""
+        self.lock = threading.Lock()
+
+    def count(self, name: str, n: int = 1, **labels: str) \
+        -> None:
+        """
+        Increments a counter.
+        Args:
+            name: the counter name.
+            n: the increment.
+            labels: the counter labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name: str, value: float, **labels: str) \
+        -> None:
+        """
+        Adds a value to a histogram.
+        Args:
+            name: the histogram name.
+            value: the value.
+            labels: the histogram labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def merge(self, other: "Registry") \
+        -> None:
+        """
+        Adds the counters and histograms of another registry, e.g. of a
+        worker process.
+        Args:
+            other: the registry.
+        """
+        with self.lock:
+            for key, value in other.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, histogram in other.histograms.items():
+                merged = self.histograms.get(key)
+                if merged is None:
+                    merged = self.histograms[key] = Histogram()
+                merged.counts = [x + y for x, y in zip(merged.counts,
+                                                       histogram.counts)]
+                merged.sum += histogram.sum
+                merged.count += histogram.count
+
+    def __getstate__(self) \
+        -> tp.Dict[str, tp.Any]:
+        """
+        Returns: the state of the registry, as pickled, without its lock.
+        """
+        with self.lock:
+            return {"counters": self.counters,
+                    "histograms": self.histograms}
+
+    def __setstate__(self, state: tp.Dict[str, tp.Any]) \
+        -> None:
+        """
+        Restores the state of the registry, as unpickled.
+        Args:
+            state: the state.
+        """
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def to_prometheus(self) \
+        -> str:
+        """
+        Exports the metrics in the Prometheus text format.
+        Returns: the metrics.
+        """
+        lines = []
+        previous = None
+        for name, labels, value in self._counters():
+            if name != previous:
+                lines += _header(name, "counter")
+                previous = name
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for name, labels, histogram in self._histograms():
+            if name != previous:
+                lines += _header(name, "histogram")
+                previous = name
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket"
+                             f"{_labels(labels + (('le', le),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum!r}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "".join(x + "\n" for x in lines)
+
+    def to_json(self) \
+        -> str:
+        """
+        Exports the metrics in JSON format, as the lists of counters
+        and histograms, the buckets of the histograms being cumulative
+        as in the Prometheus format.
+        Returns: the metrics.
+        """
+        return json.dumps({
+            "counters": [{"name": name, "labels": dict(labels),
+                          "value": value}
+                         for name, labels, value in self._counters()],
+            "histograms": [{"name": name, "labels": dict(labels),
+                            "buckets": [[bound if bound != float("inf")
+                                         else "+Inf", count]
+                                        for bound, count
+                                        in histogram.cumulative()],
+                            "sum": histogram.sum,
+                            "count": histogram.count}
+                           for name, labels, histogram
+                           in self._histograms()]})
+
+    def _counters(self) \
+        -> tp.List[tp.Tuple[str, Labels, int]]:
+        """
+        Returns: the counters, as (name, labels, value), sorted.
+        """
+        with self.lock:
+            return sorted(key + (value,)
+                          for key, value in self.counters.items())
+
+    def _histograms(self) \
+        -> tp.List[tp.Tuple[str, Labels, Histogram]]:
+        """
+        Returns: the histograms, as (name, labels, histogram), sorted by
+            name and labels.
+        """
+        with self.lock:
+            return [key + (self.histograms[key],)
+                    for key in sorted(self.histograms)]
+
+
+def _header(name: str, kind: str) \
+    -> tp.List[str]:
+    """
+    Returns: the HELP and TYPE lines of a metric, in the Prometheus
+        format.
+    """
+    return [f"# HELP {name} {HELP.get(name, name)}",
+            f"# TYPE {name} {kind}"]
+
+
+def _labels(labels: Labels) \
+    -> str:
+    """
+    Returns: the labels of a metric, in the Prometheus format.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, value.replace("\\", "\\\\")
+                                                      .replace('"', '\\"')
+                                                      .replace("\n", "\\n"))
+                          for name, value in labels) + "}"
+
+
+"""the registry the metrics are recorded in, None if they are disabled,
+such that the instrumented code costs a test when disabled"""
+REGISTRY: tp.Optional[Registry] = None
+
+
+def enable() \
+    -> Registry:
+    """
+    Enables the metrics, in a new registry if they are disabled.
+    Returns: the registry.
+    """
+    global REGISTRY
+    if REGISTRY is None:
+        REGISTRY = Registry()
+    return REGISTRY
+
+
+def disable() \
+    -> tp.Optional[Registry]:
+    """
+    Disables the metrics.
+    Returns: the registry they were recorded in, None if they were
+        disabled.
+    """
+    global REGISTRY
+    registry, REGISTRY = REGISTRY, None
+    return registry
+
+
+@contextlib.contextmanager
+def recording() \
+    -> tp.Iterator[Registry]:
+    """
+    Records the metrics of a block of code in a new registry, e.g. in a
+    worker process, to be sent back and merged into the registry of the
+    calling process. The registry in use before is restored after.
+    Returns: a context manager giving the new registry.
+    """
+    global REGISTRY
+    previous, REGISTRY = REGISTRY, Registry()
+    try:
+        yield REGISTRY
+    finally:
+        REGISTRY = previous
+
+
+def count(name: str, n: int = 1, **labels: str) \
+    -> None:
+    """
+    Increments a counter, if the metrics are enabled.
+    Args:
+        name: the counter name.
+        n: the increment.
+        labels: the counter labels.
+    """
+    registry = REGISTRY
+    if registry is not None:
+        registry.count(name, n, **labels)
+
+
+@contextlib.contextmanager
+def _timed(registry: Registry, name: str) \
+    -> tp.Iterator[None]:
+    """
+    Times a block of code into the histogram of a stage.
+    Args:
+        registry: the registry.
+        name: the stage name.
+    Returns: a context manager.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(STAGE_SECONDS, time.perf_counter() - start,
+                         stage=name)
+
+
+def stage(name: str) \
+    -> tp.ContextManager[None]:
+    """
+    Times a block of code, e.g. a batch of documents inserted, into the
+    histogram of a stage, if the metrics are enabled.
+    Args:
+        name: the stage name.
+    Returns: a context manager.
+    """
+    registry = REGISTRY
+    if registry is None:
+        return contextlib.nullcontext()
+    return _timed(registry, name)
+
+
+def timed(iterable: tp.Iterable[tp.Any], name: str) \
+    -> tp.Iterable[tp.Any]:
+    """
+    Times getting each item of an iterable, e.g. reading the records of
+    a stream, into the histogram of a stage, if the metrics are enabled.
+    Args:
+        iterable: the iterable.
+        name: the stage name.
+    Returns: the iterable, wrapped if the metrics are enabled.
+    """
+    registry = REGISTRY
+    if registry is None:
+        return iterable
+    return _timed_items(registry, iter(iterable), name)
+
+
+def _timed_items(registry: Registry,
+                 iterator: tp.Iterator[tp.Any],
+                 name: str) \
+    -> tp.Iterator[tp.Any]:
+    """
+    Times getting each item of an iterator into the histogram of a stage.
+    Args:
+        registry: the registry.
+        iterator: the iterator.
+        name: the stage name.
+    Returns: an iterator over the items.
+    """
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        registry.observe(STAGE_SECONDS, time.perf_counter() - start,
+                         stage=name)
+        yield item
@@ -0,0 +1,472 @@
+import io
+import zlib
+import struct
+import itertools
+import typing as tp
+import pathlib as path
+import mediadb.models.constants as const
+import mediadb.models.medias as medias
+import mediadb.models.metrics as metrics
+import mediadb.models.bulk as bulk
+
+
+"""the first bytes of a snapshot"""
+MAGIC = b"MDBS"
+
+"""the version of the snapshot format"""
+VERSION = 1
+
+"""the supported block compression codecs, by code in the header, zstd
+requiring the zstandard package"""
+COMPRESSIONS = ("none", "zlib", "zstd")
+
+"""the default compression codec, always available"""
+COMPRESSION = "zlib"
+
+"""the default number of documents per block"""
+BATCH_SIZE = 10000
+
+"""the layout of a record, the fields in brackets being written only for
+series or if set according to the flags, the strings being UTF-8 and
+prefixed by their length in bytes, as a varint, the title and file
+being prefixed by the number of leading bytes they share with those of
+the previous record of the block too"""
+LAYOUT = "type:u8 language:u8 subtitles:u8 flags:u8 " \
+         "title:varint+str file:varint+str " \
+         "[season:varint episode:varint] [episode_name:str] [fingerprint:str]"
+
+"""the snapshot header: the magic, the version, the compression code and
+the schema tag"""
+_HEADER = struct.Struct("<4sBBI")
+
+"""the block header: the number of records and the size of the (possibly
+compressed) records, in bytes"""
+_BLOCK = struct.Struct("<II")
+
+"""the code of missing enumeration values"""
+_NULL_CODE = 255
+
+"""the flags of the optional fields of a record"""
+_EPISODE_NAME = 1
+_FINGERPRINT = 2
+
+"""the enumeration values, by code"""
+_TYPES = tuple(const.VideoType)
+_LANGUAGES = tuple(const.Language)
+
+"""the code of each enumeration value"""
+_TYPE_CODES = {x: i for i, x in enumerate(_TYPES)}
+_LANGUAGE_CODES = {x: i for i, x in enumerate(_LANGUAGES)}
+
+"""tags the record layout and the enumeration codes, such that snapshots
+written with other enumerations are not decoded into wrong values"""
+SCHEMA = zlib.crc32("\n".join([LAYOUT,
+                               " ".join(x.value for x in _TYPES),
+                               " ".join(x.value for x in _LANGUAGES)])
+                    .encode())
+
+
+def _compressor(compression: str) \
+    -> tp.Tuple[tp.Callable[[bytes], bytes], tp.Callable[[bytes], bytes]]:
+    """
+    Gives the functions compressing and decompressing the blocks.
+    Args:
+        compression: the compression codec, one of COMPRESSIONS.
+    Returns: the compression and decompression functions.
+    Raises:
+        ValueError if the codec is not supported.
+    """
+    if compression == "none":
+        return bytes, bytes
+    if compression == "zlib":
+        return zlib.compress, _checked(zlib.decompress, zlib.error)
+    if compression == "zstd":
+        try:
+            # zstandard is an optional dependency
+            import zstandard
+        except ImportError:
+            raise ValueError("compression requires zstandard (zstd)")
+        return zstandard.ZstdCompressor().compress, \
+            _checked(zstandard.ZstdDecompressor().decompress,
+                     zstandard.ZstdError)
+    raise ValueError(f"compression is not supported ({compression})")
+
+
+def _checked(decompress: tp.Callable[[bytes], bytes],
+             error: tp.Type[Exception]) \
+    -> tp.Callable[[bytes], bytes]:
+    """
+    Wraps a decompression function such that it raises a ValueError if
+    the data is not valid.
+    Args:
+        decompress: the decompression function.
+        error: the exception it raises if the data is not valid.
+    Returns: the wrapped function.
+    """
+    def wrapper(data: bytes) \
+        -> bytes:
+        try:
+            return decompress(data)
+        except error as e:
+            raise ValueError(f"block is not valid ({e})")
+    return wrapper
+
+
+def _varint(value: int, out: bytearray) \
+    -> None:
+    """
+    Writes a non negative integer as a varint, 7 bits per byte from the
+    lowest ones, the high bit telling whether more bytes follow.
+    Args:
+        value: the integer.
+        out: the buffer to write to.
+    Raises:
+        ValueError if the integer is negative.
+    """
+    if value < 0:
+        raise ValueError(f"value is negative ({value})")
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) \
+    -> tp.Tuple[int, int]:
+    """
+    Reads a varint (see _varint).
+    Args:
+        data: the buffer.
+        pos: the position of the varint in the buffer.
+    Returns: the integer and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _string(value: str, out: bytearray) \
+    -> None:
+    """
+    Writes a string, prefixed by its length.
+    Args:
+        value: the string.
+        out: the buffer to write to.
+    """
+    data = value.encode()
+    _varint(len(data), out)
+    out += data
+
+
+def _shared(value: str, previous: bytes, out: bytearray) \
+    -> bytes:
+    """
+    Writes a string as the number of its leading bytes shared with the
+    previous one, followed by the rest of it, prefixed by its length,
+    such that e.g. the files of the episodes of a season cost their
+    names only.
+    Args:
+        value: the string.
+        previous: the previous string, UTF-8 encoded.
+        out: the buffer to write to.
+    Returns: the string, UTF-8 encoded.
+    """
+    data = value.encode()
+    shared = 0
+    for x, y in zip(data, previous):
+        if x != y:
+            break
+        shared += 1
+    _varint(shared, out)
+    _varint(len(data) - shared, out)
+    out += data[shared:]
+    return data
+
+
+def _read_string(data: bytes, pos: int) \
+    -> tp.Tuple[bytes, int]:
+    """
+    Reads a string (see _string).
+    Args:
+        data: the buffer.
+        pos: the position of the string in the buffer.
+    Returns: the string, UTF-8 encoded, and the position after it.
+    """
+    # the lengths mostly fit in a byte, read inline
+    size = data[pos]
+    if size < 0x80:
+        pos += 1
+    else:
+        size, pos = _read_varint(data, pos)
+    end = pos + size
+    if end > len(data):
+        raise IndexError("string is out of range")
+    return data[pos:end], end
+
+
+def _read_shared(data: bytes, pos: int, previous: bytes) \
+    -> tp.Tuple[bytes, int]:
+    """
+    Reads a string sharing its leading bytes with the previous one (see
+    _shared).
+    Args:
+        data: the buffer.
+        pos: the position of the string in the buffer.
+        previous: the previous string, UTF-8 encoded.
+    Returns: the string, UTF-8 encoded, and the position after it.
+    """
+    shared = data[pos]
+    if shared < 0x80:
+        pos += 1
+    else:
+        shared, pos = _read_varint(data, pos)
+    if shared > len(previous):
+        raise IndexError("shared bytes are out of range")
+    rest, pos = _read_string(data, pos)
+    return previous[:shared] + rest, pos
+
+
+def encode_batch(documents: tp.Iterable[medias.VideoMedia]) \
+    -> bytes:
+    """
+    Encodes media documents of any type into records (see LAYOUT), the
+    title and file of each record sharing their leading bytes with those
+    of the previous one.
+    Args:
+        documents: the media documents.
+    Returns: the records, one after the other.
+    """
+    out = bytearray()
+    serie = const.VideoType.SERIE
+    title = file = b""
+    for document in documents:
+        subtitles = document.subtitles
+        fingerprint = document.fingerprint
+        episode_name = getattr(document, "episode_name", None)
+        out += bytes((_TYPE_CODES[document.type],
+                      _LANGUAGE_CODES[document.language],
+                      _NULL_CODE if subtitles is None
+                      else _LANGUAGE_CODES[subtitles],
+                      (0 if episode_name is None else _EPISODE_NAME) |
+                      (0 if fingerprint is None else _FINGERPRINT)))
+        title = _shared(document.title, title, out)
+        file = _shared(str(document.file), file, out)
+        if document.type is serie:
+            _varint(document.season, out)
+            _varint(document.episode, out)
+        if episode_name is not None:
+            _string(episode_name, out)
+        if fingerprint is not None:
+            _string(fingerprint, out)
+    return bytes(out)
+
+
+def decode_batch(data: bytes, count: int) \
+    -> tp.List[tp.Dict[str, tp.Any]]:
+    """
+    Decodes records (see LAYOUT) into the field values of the media
+    documents.
+    Args:
+        data: the records.
+        count: the number of records.
+    Returns: the field values of each document, by name, as the models
+        hold them, in the order of their fields.
+    Raises:
+        ValueError if the records are not valid.
+    """
+    serie = const.VideoType.SERIE
+    records = []
+    title = file = b""
+    pos = 0
+    try:
+        for _ in range(count):
+            type_code, language, subtitles, flags = data[pos:pos + 4]
+            video_type = _TYPES[type_code]
+            title, pos = _read_shared(data, pos + 4, title)
+            file, pos = _read_shared(data, pos, file)
+            record = {"title": title.decode(),
+                      "language": _LANGUAGES[language],
+                      "subtitles": None if subtitles == _NULL_CODE
+                                   else _LANGUAGES[subtitles],
+                      "type": video_type,
+                      "file": path.Path(file.decode()),
+                      "fingerprint": None}
+            if video_type is serie:
+                record["season"], pos = _read_varint(data, pos)
+                record["episode"], pos = _read_varint(data, pos)
+                record["episode_name"] = None
+            if flags & _EPISODE_NAME:
+                value, pos = _read_string(data, pos)
+                record["episode_name"] = value.decode()
+            if flags & _FINGERPRINT:
+                value, pos = _read_string(data, pos)
+                record["fingerprint"] = value.decode()
+            records.append(record)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"records are not valid ({e})")
+    if pos != len(data):
+        raise ValueError("records are not valid (trailing bytes)")
+    return records
+
+
+def _construct(records: tp.List[tp.Dict[str, tp.Any]]) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Builds documents from the field values decoded from records, without
+    validating them again. Like VideoMedia.from_trusted, but the values
+    being complete and of the model types, they are used as they are.
+    Args:
+        records: the field values of each document, as decoded.
+    Returns: the documents.
+    Raises:
+        ValueError if the type of a record is not known.
+    """
+    documents = []
+    for record in records:
+        model = medias.MEDIA_CLASSES.get(record["type"])
+        if model is None:
+            raise ValueError(f"type is not known ({record['type'].value})")
+        document = model.__new__(model)
+        object.__setattr__(document, "__dict__", record)
+        object.__setattr__(document, "__pydantic_fields_set__", set(record))
+        object.__setattr__(document, "__pydantic_extra__", None)
+        object.__setattr__(document, "__pydantic_private__", None)
+        documents.append(document)
+    return documents
+
+
+def write(documents: tp.Iterable[medias.VideoMedia],
+          stream: tp.BinaryIO,
+          compression: str = COMPRESSION,
+          batch_size: int = BATCH_SIZE) \
+    -> int:
+    """
+    Writes media documents of any type into a snapshot: a header, with
+    the format version, the compression codec and the schema tag,
+    followed by blocks of records, such that arbitrary many documents
+    are written in bounded memory. The records are several times smaller
+    than the documents in JSON format, which repeats the field names and
+    the enumeration values, and the blocks are compressed on their own.
+    Args:
+        documents: the media documents.
+        stream: the binary stream to write to.
+        compression: the block compression codec, one of COMPRESSIONS.
+        batch_size: the number of documents per block.
+    Returns: the number of documents written.
+    Raises:
+        ValueError if the compression codec is not supported.
+    """
+    compress, _ = _compressor(compression)
+    stream.write(_HEADER.pack(MAGIC, VERSION,
+                              COMPRESSIONS.index(compression), SCHEMA))
+    documents = iter(documents)
+    count = 0
+    while True:
+        batch = list(itertools.islice(documents, batch_size))
+        if not batch:
+            return count
+        with metrics.stage("encode_batch"):
+            data = compress(encode_batch(batch))
+        stream.write(_BLOCK.pack(len(batch), len(data)))
+        stream.write(data)
+        count += len(batch)
+
+
+def _read(stream: tp.BinaryIO, size: int) \
+    -> bytes:
+    """
+    Reads exactly a number of bytes from a stream.
+    Args:
+        stream: the binary stream.
+        size: the number of bytes.
+    Returns: the bytes.
+    Raises:
+        ValueError if the stream ends before.
+    """
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("snapshot is truncated")
+    return data
+
+
+def read(stream: tp.BinaryIO,
+         validate: bool = False) \
+    -> tp.Iterator[tp.List[medias.VideoMedia]]:
+    """
+    Reads the media documents of a snapshot lazily, by blocks, such that
+    large snapshots are read in bounded memory.
+    Args:
+        stream: the binary stream to read from.
+        validate: whether to validate the documents, rather than
+            trusting them as written by write().
+    Returns: an iterator over the media documents of each block.
+    Raises:
+        ValueError if the stream is not a snapshot of this version and
+            schema, is truncated or, if validating, a document is not
+            valid.
+    """
+    header = stream.read(_HEADER.size)
+    if len(header) != _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError("stream is not a snapshot")
+    _, version, code, schema = _HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError(f"version is not supported ({version})")
+    if code >= len(COMPRESSIONS):
+        raise ValueError(f"compression is not supported ({code})")
+    if schema != SCHEMA:
+        raise ValueError(f"schema is not supported ({schema:08x})")
+    _, decompress = _compressor(COMPRESSIONS[code])
+    while True:
+        block = stream.read(_BLOCK.size)
+        if not block:
+            return
+        if len(block) != _BLOCK.size:
+            raise ValueError("snapshot is truncated")
+        count, size = _BLOCK.unpack(block)
+        data = _read(stream, size)
+        with metrics.stage("decode_batch"), medias.gc_paused():
+            records = decode_batch(decompress(data), count)
+            if validate:
+                documents = bulk.MEDIA_LIST.validate_python(records)
+            else:
+                documents = _construct(records)
+        yield documents
+
+
+def dump(documents: tp.Iterable[medias.VideoMedia],
+         compression: str = COMPRESSION) \
+    -> bytes:
+    """
+    Serializes media documents of any type into a snapshot (see write).
+    Args:
+        documents: the media documents.
+        compression: the block compression codec, one of COMPRESSIONS.
+    Returns: the snapshot.
+    Raises:
+        ValueError if the compression codec is not supported.
+    """
+    stream = io.BytesIO()
+    write(documents, stream, compression=compression)
+    return stream.getvalue()
+
+
+def load(data: bytes,
+         validate: bool = False) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Deserializes the media documents of a snapshot (see read).
+    Args:
+        data: the snapshot.
+        validate: whether to validate the documents.
+    Returns: the media documents.
+    Raises:
+        ValueError if the data is not a valid snapshot.
+    """
+    return [x for batch in read(io.BytesIO(data), validate=validate)
+            for x in batch]
@@ -0,0 +1,331 @@
+import os
+import json
+import sqlite3
+import hashlib
+import functools
+import typing as tp
+import pathlib as path
+import mediadb.models.medias as medias
+import mediadb.scan.filenames as filenames
+import mediadb.scan.probe as probe
+import mediadb.scan.scanner as scanner
+
+
+"""the default maximum number of files cached"""
+MAX_SIZE = 1000000
+
+"""the statements creating the cache schema"""
+SCHEMA = (
+    # the keys hash the version, the build options and the directory path
+    "CREATE TABLE IF NOT EXISTS directories ("
+    "key BLOB PRIMARY KEY, "
+    "used INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS directories_used ON directories (used)",
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "directory BLOB NOT NULL, "
+    "name TEXT NOT NULL, "
+    "inode INTEGER NOT NULL, "
+    "size INTEGER NOT NULL, "
+    "mtime INTEGER NOT NULL, "
+    "value TEXT NOT NULL, "
+    "rejected INTEGER NOT NULL, "
+    "PRIMARY KEY (directory, name)) WITHOUT ROWID",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def version() \
+    -> str:
+    """
+    Gives the version of the code building documents from files, which
+    changes with the filename parser, the probe or the models, such that
+    the entries of older versions are never used.
+    Returns: the hexadecimal version.
+    """
+    schema = json.dumps(medias.AnyMedia.json_schema(), sort_keys=True)
+    return hashlib.blake2b(f"{filenames.VERSION}:{probe.VERSION}:{schema}"
+                           .encode(),
+                           digest_size=8).hexdigest()
+
+
+def default_file() \
+    -> path.Path:
+    """
+    Gives the default cache file, in the user cache directory.
+    Returns: the file path, under $XDG_CACHE_HOME or ~/.cache.
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or \
+           os.path.join(os.path.expanduser("~"), ".cache")
+    return path.Path(root, "mediadb", "documents.db")
+
+
+class Cache:
+    """
+    A persistent cache of the documents built from media files, stored
+    in a SQLite database. The document of a file is a function of its
+    path, the build options and its content, the latter being told by
+    its inode, size and modification time, such that an entry is used
+    only if the file did not change since. The entries are grouped by
+    directory, as files are listed, such that the entries of a directory
+    are read at once, and keyed on the code version too. The least
+    recently used directories are evicted once there are more than a
+    maximum number of entries, such that a cache shared by several
+    versions of the code does not grow without bounds.
+    """
+
+    def __init__(self,
+                 file: tp.Union[str, path.Path] = ":memory:",
+                 max_size: int = MAX_SIZE):
+        """
+        Opens a cache, creating it if needed.
+        Args:
+            file: the path to the database file, ":memory:" for a cache
+                held in memory.
+            max_size: the maximum number of files cached.
+        """
+        """the maximum number of files cached"""
+        self.max_size = max_size
+        if str(file) != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(file)),
+                        exist_ok=True)
+        """the database connection"""
+        self.connection = sqlite3.connect(str(file))
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        """the last use stamp given"""
+        self._clock = self.connection.execute(
+                        "SELECT COALESCE(MAX(used), 0) FROM directories") \
+                        .fetchone()[0]
+        """the number of files cached, None until needed"""
+        self._size: tp.Optional[int] = None
+
+    def __enter__(self) \
+        -> "Cache":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def __len__(self) \
+        -> int:
+        """
+        Returns: the number of files cached.
+        """
+        if self._size is None:
+            self._size = self.connection.execute(
+                            "SELECT COUNT(*) FROM entries").fetchone()[0]
+        return self._size
+
+    def close(self) \
+        -> None:
+        """
+        Closes the database connection.
+        """
+        self.connection.close()
+
+    @staticmethod
+    def key(directory: str, context: str) \
+        -> bytes:
+        """
+        Computes the key of the entries of a directory.
+        Args:
+            directory: the directory path.
+            context: the build options, e.g. the file store root.
+        Returns: the key.
+        """
+        return hashlib.blake2b(f"{version()}\0{context}\0{directory}"
+                               .encode(),
+                               digest_size=16).digest()
+
+    def get_many(self,
+                 files: tp.Sequence[tp.Tuple[str, os.stat_result]],
+                 context: str = "") \
+        -> tp.List[tp.Union[medias.VideoMedia, scanner.Reject, None]]:
+        """
+        Gets the cached documents of media files.
+        Args:
+            files: the (path, status) pairs of the media files, e.g. the
+                files of a directory.
+            context: the build options the documents were built with.
+        Returns: the document, or Reject, of each file, None if not
+            cached or if the file changed since.
+        """
+        results = [None] * len(files)
+        records = []
+        used = []
+        entries = {}
+        for i, (file, stat) in enumerate(files):
+            directory, name = os.path.split(file)
+            if directory not in entries:
+                key = self.key(directory, context)
+                entries[directory] = {
+                    x[0]: x[1:] for x in self.connection.execute(
+                        "SELECT name, inode, size, mtime, value, rejected "
+                        "FROM entries WHERE directory = ?",
+                        (key,))}
+                if entries[directory]:
+                    used.append(key)
+            entry = entries[directory].get(name)
+            if entry is None or entry[:3] != (stat.st_ino, stat.st_size,
+                                              stat.st_mtime_ns):
+                continue
+            if entry[4]:
+                results[i] = scanner.Reject(file, json.loads(entry[3]))
+            else:
+                records.append((i, json.loads(entry[3])))
+        for (i, _), document in zip(records,
+                                    medias.load_many(x for _, x in records)):
+            results[i] = document
+        if used:
+            self._clock += 1
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE directories SET used = ? WHERE key = ?",
+                    ((self._clock, x) for x in used))
+        return results
+
+    def put_many(self,
+                 entries: tp.Iterable[tp.Tuple[
+                    str, os.stat_result,
+                    tp.Union[medias.VideoMedia, scanner.Reject]]],
+                 context: str = "") \
+        -> None:
+        """
+        Caches the documents of media files, evicting the least recently
+        used directories if there are too many entries.
+        Args:
+            entries: the (path, status, document or Reject) triplets of
+                the media files, e.g. the files of a directory, the
+                status being taken before building the document.
+            context: the build options the documents were built with.
+        """
+        self._clock += 1
+        rows = {}
+        for file, stat, document in entries:
+            directory, name = os.path.split(file)
+            rejected = isinstance(document, scanner.Reject)
+            rows.setdefault(self.key(directory, context), []).append(
+                (name, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                 json.dumps(document.errors) if rejected
+                 else document.model_dump_json(),
+                 rejected))
+        size = len(self)
+        with self.connection:
+            for key, batch in rows.items():
+                size -= self.connection.execute(
+                            "DELETE FROM entries WHERE directory = ? AND "
+                            "name IN (SELECT value FROM json_each(?))",
+                            (key, json.dumps([x[0] for x in batch]))) \
+                            .rowcount
+                self.connection.executemany(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((key,) + x for x in batch))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                    (key, self._clock))
+                size += len(batch)
+            if size > self.max_size:
+                evicted = self.connection.execute(
+                            "SELECT key FROM directories WHERE used < ? "
+                            "ORDER BY used",
+                            (self._clock,)).fetchall()
+                for key, in evicted:
+                    size -= self.connection.execute(
+                                "DELETE FROM entries WHERE directory = ?",
+                                (key,)).rowcount
+                    self.connection.execute(
+                        "DELETE FROM directories WHERE key = ?", (key,))
+                    if size <= self.max_size:
+                        break
+        self._size = size
+
+    def build(self,
+              batches: tp.Iterable[tp.List[tp.Tuple[str, os.stat_result]]],
+              root: tp.Union[str, path.Path, None] = None,
+              processes: int = 0,
+              probed: bool = False) \
+        -> tp.Iterator[tp.Union[medias.VideoMedia, scanner.Reject]]:
+        """
+        Builds the media documents of batches of media files, as
+        scanner.build_batches does, the documents of the files that did
+        not change since they were cached being taken from the cache
+        and the others being built and cached.
+        Args:
+            batches: the batches of (path, status) pairs of the media
+                files, e.g. as walked by scanner.walk(stat=True).
+            root: the root of the file store.
+            processes: the number of processes building the documents,
+                0 to build them in the calling process.
+            probed: whether to read the languages from the file tracks.
+        Returns: an iterator over the media documents, or a Reject for
+            each file from which no document could be built, in no
+            particular order.
+        """
+        context = json.dumps([None if root is None
+                              else os.path.abspath(root), probed])
+        stats = {}
+        hits = []
+
+        def missing():
+            """
+            Yields the batches of files that are not cached, empty ones
+            included such that the cached documents are yielded as the
+            batches are read.
+            """
+            for files in batches:
+                batch = []
+                for (file, stat), document in zip(files,
+                                                  self.get_many(files,
+                                                                context)):
+                    if document is None:
+                        stats[file] = stat
+                        batch.append(file)
+                    else:
+                        hits.append(document)
+                yield batch
+
+        for files, documents in scanner.build_batched(missing(),
+                                                      root,
+                                                      processes,
+                                                      probed):
+            yield from hits
+            hits.clear()
+            if files:
+                self.put_many(((file, stats.pop(file), document)
+                               for file, document in zip(files, documents)),
+                              context)
+            yield from documents
+        yield from hits
+
+    def scan(self,
+             root: tp.Union[str, path.Path],
+             threads: tp.Optional[int] = None,
+             processes: int = 0,
+             probed: bool = False) \
+        -> tp.Iterator[tp.Union[medias.VideoMedia, scanner.Reject]]:
+        """
+        Scans a file store, as scanner.scan does, only the documents of
+        the files that are not cached being built. The files are walked
+        from the absolute path of the root, such that the scans of the
+        store share the cache whatever the path given, as the watches
+        and the rescans do.
+        Args:
+            root: the root of the file store.
+            threads: the number of threads listing directories.
+            processes: the number of processes building the documents,
+                0 to build them in the calling process.
+            probed: whether to read the languages the paths do not give
+                from the file tracks.
+        Returns: an iterator over the media documents, or a Reject for
+            each file from which no document could be built, in no
+            particular order.
+        """
+        root = os.path.abspath(root)
+        return self.build(scanner.walk(root, threads, stat=True),
+                          root,
+                          processes,
+                          probed)
@@ -0,0 +1,203 @@
+import re
+import typing as tp
+import pathlib as path
+import mediadb.models.constants as const
+
+
+"""the parser version, to change when the fields parsed from a given path
+change, such that the documents cached are built again"""
+VERSION = 1
+
+"""the extensions of the files considered as video medias"""
+VIDEO_EXTENSIONS = frozenset({".avi", ".flv", ".m2ts", ".m4v", ".mkv",
+                              ".mov", ".mp4", ".mpeg", ".mpg", ".ogm",
+                              ".ogv", ".ts", ".webm", ".wmv"})
+
+"""the directory names identifying documentaries"""
+DOCUMENTARY_DIRS = frozenset({"doc", "docs", "documentaire", "documentaires",
+                              "documentaries", "documentary"})
+
+"""the directory names identifying series"""
+SERIE_DIRS = frozenset({"serie", "series", "shows", "tv", "tv shows",
+                        "tvshows"})
+
+"""the filename tokens giving the audio language"""
+LANGUAGE_TOKENS = {
+    "de": const.Language.GERMAN,
+    "deu": const.Language.GERMAN,
+    "ger": const.Language.GERMAN,
+    "german": const.Language.GERMAN,
+    "en": const.Language.ENGLISH,
+    "eng": const.Language.ENGLISH,
+    "english": const.Language.ENGLISH,
+    "fr": const.Language.FRENCH,
+    "fra": const.Language.FRENCH,
+    "fre": const.Language.FRENCH,
+    "french": const.Language.FRENCH,
+    "truefrench": const.Language.FRENCH,
+    "vf": const.Language.FRENCH,
+    "vff": const.Language.FRENCH,
+}
+
+"""the filename tokens giving the subtitle language"""
+SUBTITLE_TOKENS = {
+    "vostde": const.Language.GERMAN,
+    "vosten": const.Language.ENGLISH,
+    "vostfr": const.Language.FRENCH,
+    "stfr": const.Language.FRENCH,
+}
+
+"""the filename tokens announcing a subtitle language in the next token"""
+SUBTITLE_PREFIXES = frozenset({"st", "sub", "subs", "subbed"})
+
+"""matches S01E03 or 1x03 style episode numbers"""
+_EPISODE = re.compile(r"(?<![a-z0-9])(?:s(?P<s1>\d{1,3})[ ._-]?e(?P<e1>\d{1,4})"
+                      r"|(?P<s2>\d{1,2})x(?P<e2>\d{1,3}))(?![0-9])",
+                      re.IGNORECASE)
+"""matches an episode number given alone, e.g. E03 or Episode 3"""
+_EPISODE_ONLY = re.compile(r"(?<![a-z0-9])(?:e|ep|episode)[ ._-]?(?P<e>\d{1,4})"
+                           r"(?![0-9])",
+                           re.IGNORECASE)
+"""matches a season directory name"""
+_SEASON_DIR = re.compile(r"^(?:season|saison|staffel|s)[ ._-]*(?P<s>\d{1,3})$",
+                         re.IGNORECASE)
+"""matches a release year, e.g. (1979) or .1979."""
+_YEAR = re.compile(r"(?<![a-z0-9])[(\[]?(?:19|20)\d{2}[)\]]?(?![a-z0-9])",
+                   re.IGNORECASE)
+"""matches release tags, which end titles"""
+_TAG = re.compile(r"(?<![a-z0-9])(?:\d{3,4}p|[xh]\.?26[45]|hevc|avc|divx|xvid"
+                  r"|blu-?ray|bdrip|brrip|dvdrip|hdtv|web(?:-?dl|rip)?|remux"
+                  r"|hdr|10bit|aac|ac3|dts|multi|proper|repack|internal"
+                  r"|vostfr|vosten|vostde|truefrench|vff?)(?![a-z0-9])",
+                  re.IGNORECASE)
+"""splits filenames into tokens"""
+_SEPARATORS = re.compile(r"[\s._\-\[\]()]+")
+
+
+def is_video(name: str) \
+    -> bool:
+    """
+    Checks whether a file is a video media, based on its extension.
+    Args:
+        name: the file name.
+    Returns: whether the file is a video media.
+    """
+    return path.PurePath(name).suffix.lower() in VIDEO_EXTENSIONS
+
+
+def _clean(value: str) \
+    -> str:
+    """
+    Turns a part of filename into a human readable string.
+    Args:
+        value: the filename part.
+    Returns: the string with separators replaced by spaces.
+    """
+    return " ".join(x for x in _SEPARATORS.split(value) if x)
+
+
+def _languages(tokens: tp.List[str]) \
+    -> tp.Dict[str, const.Language]:
+    """
+    Looks for audio and subtitle languages in filename tokens.
+    Args:
+        tokens: the lower case tokens following the title.
+    Returns: a dict with the language and subtitles fields found.
+    """
+    fields = {}
+    for i, token in enumerate(tokens):
+        if token in SUBTITLE_TOKENS:
+            fields.setdefault("subtitles", SUBTITLE_TOKENS[token])
+        elif token in SUBTITLE_PREFIXES and i + 1 < len(tokens) \
+            and tokens[i + 1] in LANGUAGE_TOKENS:
+            fields.setdefault("subtitles", LANGUAGE_TOKENS[tokens[i + 1]])
+        elif token in LANGUAGE_TOKENS and \
+            (i == 0 or tokens[i - 1] not in SUBTITLE_PREFIXES):
+            fields.setdefault("language", LANGUAGE_TOKENS[token])
+    return fields
+
+
+def parse(file: tp.Union[str, path.PurePath],
+          root: tp.Union[str, path.PurePath, None] = None) \
+    -> tp.Dict[str, tp.Any]:
+    """
+    Infers the fields of a media document from the path of a media
+    file. Files with an episode number (S01E03, 1x03, or E03 inside a
+    "Season N" directory) are series, files located under a
+    documentary directory are documentaries and any other file is
+    a movie. Titles end at the episode number, at the release year or
+    at the first release tag and fall back on the directory name.
+    Languages are only looked for after the title.
+    Args:
+        file: the path to the media file.
+        root: the root of the file store, only the directories below it
+            are considered to infer the media type.
+    Returns: the document fields, which are not validated.
+    """
+    file = path.PurePath(file)
+    parents = file.parent.relative_to(root).parts if root is not None \
+              else file.parent.parts
+    dirs = [x.lower() for x in parents]
+    stem = file.stem
+    fields: tp.Dict[str, tp.Any] = {"file": str(file)}
+
+    # season directory, e.g. <title>/Season 1/<file>
+    season_dir = _SEASON_DIR.match(parents[-1]) if parents else None
+
+    # episode numbers
+    match = _EPISODE.search(stem)
+    if match is not None:
+        fields["season"] = int(match.group("s1") or match.group("s2"))
+        fields["episode"] = int(match.group("e1") or match.group("e2"))
+    elif season_dir is not None:
+        match = _EPISODE_ONLY.search(stem)
+        if match is not None:
+            fields["season"] = int(season_dir.group("s"))
+            fields["episode"] = int(match.group("e"))
+
+    # media type
+    if match is not None:
+        fields["type"] = const.VideoType.SERIE
+    elif any(x in DOCUMENTARY_DIRS for x in dirs):
+        fields["type"] = const.VideoType.DOCUMENTARY
+    elif season_dir is not None or any(x in SERIE_DIRS for x in dirs):
+        # a serie without episode number, left to validation to reject
+        fields["type"] = const.VideoType.SERIE
+    else:
+        fields["type"] = const.VideoType.MOVIE
+
+    # the title ends at the first marker, a leading year being part
+    # of the title (e.g. 2001 A Space Odyssey)
+    ends = [m.start() for m in (match,
+                                _YEAR.search(stem, 1),
+                                _TAG.search(stem)) if m is not None]
+    end = min(ends) if ends else len(stem)
+    title = _clean(stem[:end])
+    if fields["type"] == const.VideoType.SERIE:
+        # episode name, between the episode number and the tags
+        if match is not None:
+            words = []
+            for word in _SEPARATORS.split(stem[match.end():]):
+                if _TAG.fullmatch(word) or _YEAR.fullmatch(word):
+                    break
+                if word:
+                    words.append(word)
+            # trailing language tokens are not part of the name
+            while words and (words[-1].lower() in LANGUAGE_TOKENS or
+                             words[-1].lower() in SUBTITLE_TOKENS or
+                             words[-1].lower() in SUBTITLE_PREFIXES):
+                words.pop()
+            if words:
+                fields["episode_name"] = " ".join(words)
+        if title == "":
+            # the title is given by the serie directory
+            show_dirs = parents[:-1] if season_dir is not None else parents
+            title = _clean(show_dirs[-1]) if show_dirs else ""
+    elif (title == "" or _YEAR.fullmatch(title)) and parents:
+        title = _clean(parents[-1])
+    fields["title"] = title
+
+    # languages
+    tokens = [x.lower() for x in _SEPARATORS.split(stem[end:]) if x]
+    fields.update(_languages(tokens))
+    return fields
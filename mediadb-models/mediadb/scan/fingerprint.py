@@ -0,0 +1,118 @@
+import os
+import mmap
+import hashlib
+import itertools
+import typing as tp
+import pathlib as path
+import concurrent.futures as futures
+
+
+"""the number of bytes hashed at the head, middle and tail of a file"""
+SAMPLE_SIZE = 1 << 16
+
+"""the number of bytes read at once when hashing a whole file"""
+CHUNK_SIZE = 1 << 20
+
+"""the number of files fingerprinted per task of a process pool"""
+BATCH_SIZE = 64
+
+
+def fingerprint(file: tp.Union[str, path.Path],
+                full: bool = False) \
+    -> str:
+    """
+    Computes a fingerprint of the content of a file, the same for the
+    copies of a file whatever their path. By default, only the file
+    size and three samples of SAMPLE_SIZE bytes, at the head, middle and
+    tail of the file, are hashed, which is enough to tell media files
+    apart without reading multi-GB files. The samples are read through
+    a memory map, such that only their pages are read from disk.
+    Args:
+        file: the path to the file.
+        full: whether to hash the whole file content instead.
+    Returns: the fingerprint, "<sample|full>:<size>:<hash>", sampled and
+        full fingerprints of the same file being different.
+    Raises:
+        OSError if the file cannot be read.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file, "rb") as stream:
+        size = os.fstat(stream.fileno()).st_size
+        if full:
+            buffer = bytearray(CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n = stream.readinto(buffer)
+                if not n:
+                    break
+                digest.update(view[:n])
+        elif size <= 3 * SAMPLE_SIZE:
+            digest.update(stream.read())
+        else:
+            with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) \
+                as data:
+                if hasattr(data, "madvise"):
+                    # no read ahead beyond the samples
+                    data.madvise(mmap.MADV_RANDOM)
+                for offset in (0, (size - SAMPLE_SIZE) // 2,
+                               size - SAMPLE_SIZE):
+                    digest.update(data[offset:offset + SAMPLE_SIZE])
+    return f"{'full' if full else 'sample'}:{size}:{digest.hexdigest()}"
+
+
+def fingerprint_files(files: tp.List[str],
+                      full: bool = False) \
+    -> tp.List[tp.Tuple[str, tp.Optional[str]]]:
+    """
+    Computes the fingerprints of files.
+    Args:
+        files: the paths to the files.
+        full: whether to hash the whole file contents.
+    Returns: the (file, fingerprint) pairs, the fingerprint being None if
+        the file cannot be read.
+    """
+    fingerprints = []
+    for file in files:
+        try:
+            fingerprints.append((file, fingerprint(file, full)))
+        except OSError:
+            fingerprints.append((file, None))
+    return fingerprints
+
+
+def fingerprint_many(files: tp.Iterable[tp.Union[str, path.Path]],
+                     processes: int = 0,
+                     full: bool = False) \
+    -> tp.Iterator[tp.Tuple[str, tp.Optional[str]]]:
+    """
+    Computes the fingerprints of files, either in the calling process or
+    in a process pool, by batches of BATCH_SIZE files, such that many
+    files are read at once to keep the disks busy.
+    Args:
+        files: the paths to the files.
+        processes: the number of processes computing the fingerprints,
+            0 to compute them in the calling process.
+        full: whether to hash the whole file contents.
+    Returns: an iterator over the (file, fingerprint) pairs, the
+        fingerprint being None if the file cannot be read, in no
+        particular order.
+    """
+    files = (str(x) for x in files)
+    batches = iter(lambda: list(itertools.islice(files, BATCH_SIZE)), [])
+    if processes <= 0:
+        for batch in batches:
+            yield from fingerprint_files(batch, full)
+        return
+    with futures.ProcessPoolExecutor(processes) as pool:
+        pending = set()
+        for batch in batches:
+            pending.add(pool.submit(fingerprint_files, batch, full))
+            # bounds the number of batches in flight
+            if len(pending) >= 2 * processes:
+                done, pending = futures.wait(
+                                    pending,
+                                    return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in futures.as_completed(pending):
+            yield from future.result()
@@ -0,0 +1,191 @@
+import os
+import gzip
+import json
+import hashlib
+import typing as tp
+import pathlib as path
+import mediadb.models.medias as medias
+import mediadb.scan.scanner as scanner
+import mediadb.scan.cache as cache
+
+
+"""the manifest file format version"""
+VERSION = 1
+
+"""the change actions"""
+CREATED = "created"
+CHANGED = "changed"
+DELETED = "deleted"
+
+
+class Entry(tp.NamedTuple):
+    """
+    The state of a media file at the time it was last scanned.
+    """
+
+    """the file inode number"""
+    inode: int
+    """the file size in bytes"""
+    size: int
+    """the file modification time in ns"""
+    mtime: int
+    """the hash of the file document"""
+    digest: str
+
+
+class Change(tp.NamedTuple):
+    """
+    A media document that was created, changed or deleted since the last
+    scan.
+    """
+
+    """the change action, one of CREATED, CHANGED or DELETED"""
+    action: str
+    """the path to the media file"""
+    file: str
+    """the new media document, None if deleted"""
+    document: tp.Optional[medias.VideoMedia] = None
+
+    def model_dump_json(self) \
+        -> str:
+        """
+        Serializes the change in JSON format.
+        Returns: the JSON string.
+        """
+        document = "null" if self.document is None \
+                   else self.document.model_dump_json()
+        return f'{{"action": {json.dumps(self.action)}, ' \
+               f'"file": {json.dumps(self.file)}, ' \
+               f'"document": {document}}}'
+
+
+def digest(document: medias.VideoMedia) \
+    -> str:
+    """
+    Computes a short hash of a media document.
+    Args:
+        document: the media document.
+    Returns: the hexadecimal hash.
+    """
+    return hashlib.blake2b(document.model_dump_json().encode(),
+                           digest_size=8).hexdigest()
+
+
+def load(file: tp.Union[str, path.Path]) \
+    -> tp.Dict[str, Entry]:
+    """
+    Loads a manifest file.
+    Args:
+        file: the path to the manifest file.
+    Returns: the entries, per file path relative to the store root,
+        empty if the manifest file does not exist.
+    Raises:
+        ValueError if the file is not a manifest of a supported version.
+    """
+    try:
+        with gzip.open(file, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get("version") != VERSION:
+        raise ValueError(f"manifest version is not supported "
+                         f"({data.get('version')})")
+    return {key: Entry(*value) for key, value in data["entries"].items()}
+
+
+def save(file: tp.Union[str, path.Path],
+         entries: tp.Dict[str, Entry]) \
+    -> None:
+    """
+    Saves a manifest file, atomically replacing any previous version.
+    Args:
+        file: the path to the manifest file.
+        entries: the entries, per file path relative to the store root.
+    """
+    tmp = f"{file}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump({"version": VERSION, "entries": entries},
+                  f,
+                  separators=(",", ":"))
+    os.replace(tmp, file)
+
+
+def rescan(root: tp.Union[str, path.Path],
+           entries: tp.Dict[str, Entry],
+           threads: tp.Optional[int] = None,
+           processes: int = 0,
+           probed: bool = False,
+           cached: tp.Optional[cache.Cache] = None) \
+    -> tp.Iterator[tp.Union[Change, scanner.Reject]]:
+    """
+    Scans a file store incrementally. Only the files whose inode, size
+    or modification time differ from their manifest entry are parsed
+    and validated, such that the cost beyond listing the directories
+    is proportional to the number of changes. The entries are updated
+    in place as the changes are yielded, and files that are rejected
+    are left out of the manifest to be reported again next time, their
+    document being deleted if they were valid before.
+    Args:
+        root: the root of the file store.
+        entries: the manifest entries of the last scan, per file path
+            relative to the root.
+        threads: the number of threads listing directories.
+        processes: the number of processes building the documents, 0
+            to build them in the calling process.
+        probed: whether to read the languages the paths do not give
+            from the file tracks.
+        cached: a cache of the documents, to only build those of the
+            changed files that are not cached.
+    Returns: an iterator over the changes and the rejects.
+    """
+    root = os.path.abspath(root)
+    prefix = os.path.join(root, "")
+    seen = set()
+    stats = {}
+
+    def changed_batches():
+        """
+        Yields the batches of files that changed since the last scan.
+        """
+        for files in scanner.walk(root, threads, stat=True):
+            batch = []
+            for file, stat in files:
+                key = file[len(prefix):]
+                seen.add(key)
+                entry = entries.get(key)
+                if entry is None or entry.inode != stat.st_ino or \
+                    entry.size != stat.st_size or \
+                    entry.mtime != stat.st_mtime_ns:
+                    stats[key] = stat
+                    batch.append((file, stat))
+            if batch:
+                yield batch
+
+    if cached is None:
+        documents = scanner.build_batches(([file for file, _ in x]
+                                           for x in changed_batches()),
+                                          root, processes, probed)
+    else:
+        documents = cached.build(changed_batches(), root, processes, probed)
+    for document in documents:
+        if isinstance(document, scanner.Reject):
+            # a file that is rejected is no longer a document
+            if entries.pop(document.file[len(prefix):], None) is not None:
+                yield Change(DELETED, document.file)
+            yield document
+            continue
+        file = str(document.file)
+        key = file[len(prefix):]
+        stat = stats.pop(key)
+        new = Entry(stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                    digest(document))
+        old = entries.get(key)
+        entries[key] = new
+        if old is None:
+            yield Change(CREATED, file, document)
+        elif old.digest != new.digest:
+            yield Change(CHANGED, file, document)
+
+    for key in [x for x in entries if x not in seen]:
+        del entries[key]
+        yield Change(DELETED, prefix + key)
@@ -0,0 +1,423 @@
+import os
+import mmap
+import struct
+import collections
+import typing as tp
+import pathlib as path
+import mediadb.models.constants as const
+import mediadb.models.languages as languages
+
+
+"""the EBML identifiers of the Matroska elements read"""
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_SEEK_HEAD = 0x114D9B74
+_SEEK = 0x4DBB
+_SEEK_ID = 0x53AB
+_SEEK_POSITION = 0x53AC
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_FLAG_DEFAULT = 0x88
+_LANGUAGE = 0x22B59C
+_LANGUAGE_BCP47 = 0x22B59D
+_CLUSTER = 0x1F43B675
+
+"""the Matroska track types read"""
+_MKV_AUDIO = 2
+_MKV_SUBTITLES = 17
+
+"""the ISO BMFF handler types of the audio and subtitle tracks"""
+_MP4_AUDIO = frozenset({b"soun"})
+_MP4_SUBTITLES = frozenset({b"sbtl", b"subt", b"text", b"clcp"})
+
+"""the ISO BMFF top level box types an MP4 file may start with"""
+_MP4_FIRST = frozenset({b"ftyp", b"moov", b"mdat", b"free", b"skip",
+                        b"wide", b"pdin", b"styp"})
+
+"""the probe version, to change when the tracks read from a given file
+change, such that the documents cached are built again"""
+VERSION = 2
+
+"""the default maximum number of files whose tracks are cached"""
+CACHE_SIZE = 100000
+
+
+class Tracks(tp.NamedTuple):
+    """
+    The languages of the audio and subtitle tracks of a media file.
+    """
+
+    """the language of each audio track, the default ones first"""
+    audio: tp.Tuple[const.Language, ...] = ()
+    """the language of each subtitle track, the default ones first"""
+    subtitles: tp.Tuple[const.Language, ...] = ()
+
+    def fields(self) \
+        -> tp.Dict[str, const.Language]:
+        """
+        Gives the document fields the tracks tell.
+        Returns: a dict with the language and subtitles fields of the
+            first audio and subtitle tracks of known language, if any.
+        """
+        fields = {}
+        for name, languages in (("language", self.audio),
+                                ("subtitles", self.subtitles)):
+            for language in languages:
+                if language is not const.Language.UNKNOWN:
+                    fields[name] = language
+                    break
+        return fields
+
+
+def language(code: str) \
+    -> const.Language:
+    """
+    Maps a track language code to a language.
+    Args:
+        code: the ISO 639 (e.g. "fre") or BCP 47 (e.g. "fr-CA") code.
+    Returns: the language, UNKNOWN if not supported.
+    """
+    return languages.normalize(code)
+
+
+def _vint(data: tp.Any, pos: int, marker: bool) \
+    -> tp.Tuple[int, int]:
+    """
+    Reads an EBML variable length integer.
+    Args:
+        data: the file content.
+        pos: the integer offset.
+        marker: whether to keep the length marker, as in identifiers.
+    Returns: the integer, -1 for a size of unknown value, and the offset
+        following it.
+    Raises:
+        ValueError if there is no valid integer at the offset.
+    """
+    if pos >= len(data) or not data[pos]:
+        raise ValueError(f"invalid EBML integer at {pos}")
+    length = 9 - data[pos].bit_length()
+    if pos + length > len(data):
+        raise ValueError(f"truncated EBML integer at {pos}")
+    value = int.from_bytes(data[pos:pos + length], "big")
+    if not marker:
+        value &= (1 << 7 * length) - 1
+        if value == (1 << 7 * length) - 1:
+            value = -1
+    return value, pos + length
+
+
+def _elements(data: tp.Any, start: int, end: int) \
+    -> tp.Iterator[tp.Tuple[int, int, int]]:
+    """
+    Iterates over the EBML elements of a range of a file, skipping their
+    content.
+    Args:
+        data: the file content.
+        start: the offset of the first element.
+        end: the offset following the last element.
+    Returns: an iterator over the (identifier, content start, content
+        end) triplets, the content of the elements of unknown size
+        extending to the end.
+    Raises:
+        ValueError if an element header is not valid.
+    """
+    pos = start
+    while pos < end:
+        identifier, pos = _vint(data, pos, True)
+        size, pos = _vint(data, pos, False)
+        stop = end if size < 0 else min(pos + size, end)
+        yield identifier, pos, stop
+        pos = stop
+
+
+def _uint(data: tp.Any, start: int, end: int) \
+    -> int:
+    return int.from_bytes(data[start:end], "big")
+
+
+def _string(data: tp.Any, start: int, end: int) \
+    -> str:
+    return bytes(data[start:end]).decode("ascii", "replace")
+
+
+def _mkv_tracks(data: tp.Any, start: int, end: int) \
+    -> Tracks:
+    """
+    Reads the languages of the tracks of a Matroska Tracks element.
+    Args:
+        data: the file content.
+        start: the element content start.
+        end: the element content end.
+    Returns: the tracks.
+    """
+    tracks = {_MKV_AUDIO: [], _MKV_SUBTITLES: []}
+    for identifier, entry_start, entry_end in _elements(data, start, end):
+        if identifier != _TRACK_ENTRY:
+            continue
+        kind = None
+        code = "eng"  # the Matroska default
+        bcp47 = None
+        default = 1
+        for child, child_start, child_end in _elements(data, entry_start,
+                                                       entry_end):
+            if child == _TRACK_TYPE:
+                kind = _uint(data, child_start, child_end)
+            elif child == _LANGUAGE:
+                code = _string(data, child_start, child_end)
+            elif child == _LANGUAGE_BCP47:
+                bcp47 = _string(data, child_start, child_end)
+            elif child == _FLAG_DEFAULT:
+                default = _uint(data, child_start, child_end)
+        if kind in tracks:
+            tracks[kind].append((not default, language(bcp47 or code)))
+    # the default tracks first, in file order otherwise
+    return Tracks(*(tuple(x for _, x in sorted(tracks[kind],
+                                               key=lambda x: x[0]))
+                    for kind in (_MKV_AUDIO, _MKV_SUBTITLES)))
+
+
+def _mkv(data: tp.Any) \
+    -> Tracks:
+    """
+    Reads the languages of the tracks of a Matroska (MKV, WebM) file.
+    Only the elements preceding the Tracks element are read, the
+    clusters holding the frames being skipped by following the seek
+    head, if any.
+    Args:
+        data: the file content.
+    Returns: the tracks.
+    Raises:
+        ValueError if the file is not valid.
+    """
+    elements = _elements(data, 0, len(data))
+    for identifier, start, end in elements:
+        if identifier == _SEGMENT:
+            break
+    else:
+        raise ValueError("no Matroska segment")
+    tracks_pos = None
+    pos = start
+    while pos < end:
+        identifier, content_start, content_end = \
+            next(_elements(data, pos, end))
+        if identifier == _TRACKS:
+            return _mkv_tracks(data, content_start, content_end)
+        if identifier == _SEEK_HEAD:
+            for seek, seek_start, seek_end in _elements(data, content_start,
+                                                        content_end):
+                if seek != _SEEK:
+                    continue
+                fields = {x: (y, z) for x, y, z in _elements(data, seek_start,
+                                                             seek_end)}
+                if _SEEK_ID in fields and _SEEK_POSITION in fields and \
+                    _uint(data, *fields[_SEEK_ID]) == _TRACKS:
+                    tracks_pos = start + _uint(data,
+                                               *fields[_SEEK_POSITION])
+        elif identifier == _CLUSTER:
+            if tracks_pos is None or tracks_pos <= pos:
+                break
+            pos, tracks_pos = tracks_pos, None
+            continue
+        pos = content_end
+    return Tracks()
+
+
+def _boxes(data: tp.Any, start: int, end: int) \
+    -> tp.Iterator[tp.Tuple[bytes, int, int]]:
+    """
+    Iterates over the ISO BMFF boxes of a range of a file, skipping
+    their content.
+    Args:
+        data: the file content.
+        start: the offset of the first box.
+        end: the offset following the last box.
+    Returns: an iterator over the (type, content start, content end)
+        triplets.
+    Raises:
+        ValueError if a box header is not valid.
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise ValueError(f"truncated box at {pos}")
+            size, = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise ValueError(f"invalid box size at {pos}")
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _child(data: tp.Any, start: int, end: int, kind: bytes) \
+    -> tp.Optional[tp.Tuple[int, int]]:
+    """
+    Finds a child box.
+    Args:
+        data: the file content.
+        start: the parent box content start.
+        end: the parent box content end.
+        kind: the child box type.
+    Returns: the child box (content start, content end), None if none.
+    """
+    for child, child_start, child_end in _boxes(data, start, end):
+        if child == kind:
+            return child_start, child_end
+    return None
+
+
+def _mp4_language(data: tp.Any, mdia: tp.Tuple[int, int]) \
+    -> const.Language:
+    """
+    Reads the language of the media of an ISO BMFF track.
+    Args:
+        data: the file content.
+        mdia: the mdia box (content start, content end).
+    Returns: the language, from the elng box if any, else the mdhd box.
+    """
+    elng = _child(data, *mdia, b"elng")
+    if elng is not None:
+        # full box header, then a null terminated BCP 47 tag
+        return language(_string(data, elng[0] + 4, elng[1]))
+    mdhd = _child(data, *mdia, b"mdhd")
+    if mdhd is None or mdhd[0] >= mdhd[1]:
+        return const.Language.UNKNOWN
+    # version 1 has 64 bits times and duration
+    pos = mdhd[0] + (32 if data[mdhd[0]] == 1 else 20)
+    if pos + 2 > mdhd[1]:
+        return const.Language.UNKNOWN
+    packed, = struct.unpack_from(">H", data, pos)
+    # three 5 bits letters, offset from 0x60
+    code = "".join(chr((packed >> x & 0x1F) + 0x60) for x in (10, 5, 0))
+    return language(code)
+
+
+def _mp4(data: tp.Any) \
+    -> Tracks:
+    """
+    Reads the languages of the tracks of an ISO BMFF (MP4, MOV) file.
+    Only the moov box is read, wherever it is, the mdat box holding the
+    frames being skipped.
+    Args:
+        data: the file content.
+    Returns: the tracks.
+    Raises:
+        ValueError if the file is not valid.
+    """
+    moov = _child(data, 0, len(data), b"moov")
+    if moov is None:
+        raise ValueError("no ISO BMFF movie box")
+    tracks = {False: [], True: []}
+    for kind, start, end in _boxes(data, *moov):
+        if kind != b"trak":
+            continue
+        mdia = _child(data, start, end, b"mdia")
+        hdlr = None if mdia is None else _child(data, *mdia, b"hdlr")
+        if hdlr is None:
+            continue
+        # full box header, then a predefined field
+        handler = bytes(data[hdlr[0] + 8:hdlr[0] + 12])
+        if handler in _MP4_AUDIO or handler in _MP4_SUBTITLES:
+            tracks[handler in _MP4_SUBTITLES].append(
+                _mp4_language(data, mdia))
+    return Tracks(tuple(tracks[False]), tuple(tracks[True]))
+
+
+def probe(file: tp.Union[str, path.Path]) \
+    -> Tracks:
+    """
+    Reads the languages of the audio and subtitle tracks of a Matroska
+    or ISO BMFF media file from its headers. The file is memory mapped
+    and only the headers are parsed, the frames being skipped, such
+    that only a few pages of the file are read from disk.
+    Args:
+        file: the path to the media file.
+    Returns: the tracks.
+    Raises:
+        OSError if the file cannot be read.
+        ValueError if the file is neither a Matroska nor an ISO BMFF
+            file, or is not valid.
+    """
+    with open(file, "rb") as stream:
+        if not os.fstat(stream.fileno()).st_size:
+            raise ValueError(f"file is empty ({file})")
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                if data[:4] == _EBML.to_bytes(4, "big"):
+                    return _mkv(data)
+                if data[4:8] in _MP4_FIRST:
+                    return _mp4(data)
+            except (struct.error, StopIteration, IndexError) as e:
+                raise ValueError(f"file is not valid ({file})") from e
+    raise ValueError(f"file format is not supported ({file})")
+
+
+class Cache:
+    """
+    A cache of the tracks of media files, keyed on their inode,
+    modification time and size rather than their path, such that a
+    file is probed again only when changed, renamed files being found.
+    The least recently used files are evicted first.
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        """
+        Args:
+            max_size: the maximum number of files cached.
+        """
+        """the maximum number of files cached"""
+        self.max_size = max_size
+        """the tracks of the files, None if they cannot be probed, by
+        (inode, mtime, size)"""
+        self._tracks: tp.OrderedDict[tp.Tuple[int, int, int],
+                                     tp.Optional[Tracks]] = \
+            collections.OrderedDict()
+
+    def __len__(self) \
+        -> int:
+        """
+        Returns: the number of files cached.
+        """
+        return len(self._tracks)
+
+    def probe(self,
+              file: tp.Union[str, path.Path],
+              stat: tp.Optional[os.stat_result] = None) \
+        -> tp.Optional[Tracks]:
+        """
+        Gives the tracks of a media file, probing it if not cached.
+        Args:
+            file: the path to the media file.
+            stat: the file status, if already known.
+        Returns: the tracks, None if the file format is not supported
+            or the file cannot be read.
+        """
+        try:
+            if stat is None:
+                stat = os.stat(file)
+        except OSError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key in self._tracks:
+            self._tracks.move_to_end(key)
+            return self._tracks[key]
+        try:
+            tracks = probe(file)
+        except ValueError:
+            tracks = None
+        except OSError:
+            # may be readable later on
+            return None
+        self._tracks[key] = tracks
+        if len(self._tracks) > self.max_size:
+            self._tracks.popitem(last=False)
+        return tracks
+
+
+"""the cache of the calling process"""
+CACHE = Cache()
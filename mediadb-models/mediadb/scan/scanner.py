@@ -0,0 +1,223 @@
+import os
+import json
+import typing as tp
+import pathlib as path
+import concurrent.futures as futures
+import mediadb.models.ingest as ingest
+import mediadb.models.medias as medias
+import mediadb.models.metrics as metrics
+import mediadb.scan.filenames as filenames
+import mediadb.scan.probe as probe
+
+
+class Reject(tp.NamedTuple):
+    """
+    A media file from which no valid document could be built.
+    """
+
+    """the path to the media file"""
+    file: str
+    """the reasons why the file was rejected"""
+    errors: tp.List[str]
+
+    def model_dump_json(self) \
+        -> str:
+        """
+        Serializes the reject in JSON format.
+        Returns: the JSON string.
+        """
+        return json.dumps({"file": self.file, "errors": self.errors})
+
+
+def list_dir(directory: str,
+             stat: bool = False) \
+    -> tp.Tuple[tp.List[str], tp.List[tp.Any]]:
+    """
+    Lists the content of a directory using a single os.scandir() call.
+    Hidden entries and symbolic links to directories are skipped and
+    unreadable directories are considered empty.
+    Args:
+        directory: the directory path.
+        stat: whether to stat the video files.
+    Returns: the sub-directory paths and the video file paths, or
+        (path, os.stat_result) pairs if stat is True.
+    """
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif filenames.is_video(entry.name) and entry.is_file():
+                    if stat:
+                        files.append((entry.path, entry.stat()))
+                    else:
+                        files.append(entry.path)
+    except OSError:
+        pass
+    return subdirs, files
+
+
+def walk(root: tp.Union[str, path.Path],
+         threads: tp.Optional[int] = None,
+         stat: bool = False) \
+    -> tp.Iterator[tp.List[tp.Any]]:
+    """
+    Walks a directory tree, listing the directories in parallel in a
+    thread pool, which hides the latency of (network) file systems.
+    Args:
+        root: the root directory.
+        threads: the number of threads, the executor default if None.
+        stat: whether to stat the video files, in the thread pool too.
+    Returns: an iterator over the video files of each directory, as
+        returned by list_dir(), in no particular order.
+    """
+    with futures.ThreadPoolExecutor(threads) as pool:
+        pending = {pool.submit(list_dir, str(root), stat)}
+        while pending:
+            done, pending = futures.wait(pending,
+                                         return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                subdirs, files = future.result()
+                pending.update(pool.submit(list_dir, x, stat)
+                               for x in subdirs)
+                if files:
+                    yield files
+
+
+def build_document(file: tp.Union[str, path.Path],
+                   root: tp.Union[str, path.Path, None] = None,
+                   probed: bool = False) \
+    -> medias.VideoMedia:
+    """
+    Builds the media document of a media file from its path.
+    Args:
+        file: the path to the media file.
+        root: the root of the file store.
+        probed: whether to read the languages the path does not give
+            from the file tracks (see mediadb.scan.probe).
+    Returns: the media document.
+    Raises:
+        ValueError if no valid document can be inferred from the path.
+    """
+    with metrics.stage("parse"):
+        fields = filenames.parse(file, root)
+    if probed:
+        with metrics.stage("probe"):
+            tracks = probe.CACHE.probe(file)
+        if tracks is not None:
+            fields = dict(tracks.fields(), **fields)
+    return ingest.validate_record(fields)
+
+
+def build_documents(files: tp.Iterable[tp.Union[str, path.Path]],
+                    root: tp.Union[str, path.Path, None] = None,
+                    probed: bool = False) \
+    -> tp.List[tp.Union[medias.VideoMedia, Reject]]:
+    """
+    Builds the media documents of a batch of media files.
+    Args:
+        files: the paths to the media files.
+        root: the root of the file store.
+        probed: whether to read the languages from the file tracks.
+    Returns: a media document, or a Reject, for each file.
+    """
+    documents = []
+    for file in files:
+        try:
+            documents.append(build_document(file, root, probed))
+        except ValueError as e:
+            documents.append(Reject(str(file), ingest.error_messages(e)))
+    return documents
+
+
+def build_batched(batches: tp.Iterable[tp.List[str]],
+                  root: tp.Union[str, path.Path, None] = None,
+                  processes: int = 0,
+                  probed: bool = False) \
+    -> tp.Iterator[tp.Tuple[tp.List[str],
+                            tp.List[tp.Union[medias.VideoMedia, Reject]]]]:
+    """
+    Builds the media documents of batches of media files, either in
+    the calling process or in a process pool, one task per batch.
+    Args:
+        batches: the batches of paths to the media files.
+        root: the root of the file store.
+        processes: the number of processes building the documents, 0
+            to build them in the calling process.
+        probed: whether to read the languages from the file tracks.
+    Returns: an iterator over the batches of paths with their media
+        documents, or a Reject for each file from which no document
+        could be built, in file order, the batches being in no
+        particular order. Empty batches are yielded as is.
+    """
+    root = None if root is None else str(root)
+    if processes <= 0:
+        for files in batches:
+            yield files, build_documents(files, root, probed)
+        return
+    with futures.ProcessPoolExecutor(processes) as pool:
+        pending = {}
+        for files in batches:
+            if not files:
+                yield files, []
+                continue
+            future = pool.submit(build_documents, files, root, probed)
+            pending[future] = files
+            # bounds the number of batches in flight
+            if len(pending) >= 2 * processes:
+                done, _ = futures.wait(pending,
+                                       return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        for future in futures.as_completed(pending):
+            yield pending[future], future.result()
+
+
+def build_batches(batches: tp.Iterable[tp.List[str]],
+                  root: tp.Union[str, path.Path, None] = None,
+                  processes: int = 0,
+                  probed: bool = False) \
+    -> tp.Iterator[tp.Union[medias.VideoMedia, Reject]]:
+    """
+    Builds the media documents of batches of media files, either in
+    the calling process or in a process pool, one task per batch.
+    Args:
+        batches: the batches of paths to the media files.
+        root: the root of the file store.
+        processes: the number of processes building the documents, 0
+            to build them in the calling process.
+        probed: whether to read the languages from the file tracks.
+    Returns: an iterator over the media documents, or a Reject for
+        each file from which no document could be built, in no
+        particular order.
+    """
+    for _, documents in build_batched(batches, root, processes, probed):
+        yield from documents
+
+
+def scan(root: tp.Union[str, path.Path],
+         threads: tp.Optional[int] = None,
+         processes: int = 0,
+         probed: bool = False) \
+    -> tp.Iterator[tp.Union[medias.VideoMedia, Reject]]:
+    """
+    Scans a file store and builds the media documents of all the video
+    files it contains. Directories are listed in a thread pool and
+    the documents are built either in the calling thread, while the
+    listing goes on, or in a process pool, one batch per directory.
+    Args:
+        root: the root of the file store.
+        threads: the number of threads listing directories.
+        processes: the number of processes building the documents, 0
+            to build them in the calling process.
+        probed: whether to read the languages the paths do not give
+            from the file tracks, which reads the file headers.
+    Returns: an iterator over the media documents, or a Reject for
+        each file from which no document could be built, in no
+        particular order.
+    """
+    return build_batches(walk(root, threads), root, processes, probed)
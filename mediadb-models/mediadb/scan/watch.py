@@ -0,0 +1,613 @@
+import os
+import json
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import typing as tp
+import pathlib as path
+import mediadb.scan.scanner as scanner
+import mediadb.scan.cache as cache
+import mediadb.scan.manifest as manifest
+import mediadb.store.catalogue as catalogue
+
+
+"""the time without events after which changes are synced, in seconds"""
+DELAY = 2.0
+
+"""the maximum time changes wait to be synced under a continuous flow
+of events, e.g. a whole serie being copied, in seconds"""
+MAX_DELAY = 30.0
+
+"""the time between two polls of the directories, in seconds"""
+INTERVAL = 5.0
+
+"""the inotify flags and events, see inotify(7)"""
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+
+"""the events watched, those changing the entries of a directory, the
+files being written included such that files copied are built once
+complete"""
+MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+       IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+"""the header of the inotify events: wd, mask, cookie, name length"""
+EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Watches directories with inotify, through the C library, all the
+    directories sharing a single file descriptor such that watching
+    tens of thousands of them costs a kernel watch each rather than a
+    file descriptor, and no CPU while nothing changes.
+    """
+
+    def __init__(self):
+        """
+        Raises:
+            OSError if inotify is not available.
+        """
+        name = ctypes.util.find_library("c")
+        """the C library"""
+        self.libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        """the inotify file descriptor"""
+        self.fd = fd
+        """the watched directories, by watch descriptor and by path"""
+        self.paths: tp.Dict[int, str] = {}
+        self.descriptors: tp.Dict[str, int] = {}
+        """whether events were lost since the last wait"""
+        self.overflowed = False
+
+    @property
+    def directories(self) \
+        -> tp.Iterable[str]:
+        """
+        Returns: the watched directories.
+        """
+        return self.descriptors.keys()
+
+    def add(self, directory: str) \
+        -> None:
+        """
+        Watches a directory.
+        Args:
+            directory: the directory path.
+        Raises:
+            OSError if the directory cannot be watched, with ENOSPC if
+                there are too many watches (see
+                /proc/sys/fs/inotify/max_user_watches).
+        """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                         MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), directory)
+        # the watch of a directory moved elsewhere in the tree
+        old = self.paths.get(wd)
+        if old is not None and old != directory:
+            del self.descriptors[old]
+        self.paths[wd] = directory
+        self.descriptors[directory] = wd
+
+    def remove(self, directory: str) \
+        -> None:
+        """
+        Stops watching a directory.
+        Args:
+            directory: the directory path.
+        """
+        wd = self.descriptors.pop(directory, None)
+        if wd is not None and self.paths.get(wd) == directory:
+            del self.paths[wd]
+            # fails if the directory was deleted, which removed the watch
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout: tp.Optional[float] = None) \
+        -> tp.Set[str]:
+        """
+        Waits for events.
+        Args:
+            timeout: the maximum time to wait, in seconds, None to wait
+                until an event.
+        Returns: the directories whose entries changed, empty if none
+            before the timeout.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        dirty = set()
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return dirty
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, size = EVENT.unpack_from(data, offset)
+                offset += EVENT.size + size
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                elif wd in self.paths:
+                    dirty.add(self.paths[wd])
+                    if mask & IN_IGNORED:
+                        self.descriptors.pop(self.paths.pop(wd), None)
+
+    def close(self) \
+        -> None:
+        """
+        Closes the inotify file descriptor, removing all the watches.
+        """
+        os.close(self.fd)
+
+
+class Poller:
+    """
+    Watches directories by polling their modification time, which
+    changes when their entries do, as a fallback where inotify is not
+    available, e.g. on network file systems. Polling costs a stat per
+    directory and interval.
+    """
+
+    def __init__(self, interval: float = INTERVAL):
+        """
+        Args:
+            interval: the time between two polls, in seconds.
+        """
+        """the time between two polls, in seconds"""
+        self.interval = interval
+        """the modification time of the watched directories, in ns"""
+        self.mtimes: tp.Dict[str, int] = {}
+        """whether events were lost since the last wait, never"""
+        self.overflowed = False
+
+    @property
+    def directories(self) \
+        -> tp.Iterable[str]:
+        """
+        Returns: the watched directories.
+        """
+        return self.mtimes.keys()
+
+    def add(self, directory: str) \
+        -> None:
+        """
+        Watches a directory.
+        Args:
+            directory: the directory path.
+        Raises:
+            OSError if the directory cannot be read.
+        """
+        self.mtimes[directory] = os.stat(directory).st_mtime_ns
+
+    def remove(self, directory: str) \
+        -> None:
+        """
+        Stops watching a directory.
+        Args:
+            directory: the directory path.
+        """
+        self.mtimes.pop(directory, None)
+
+    def wait(self, timeout: tp.Optional[float] = None) \
+        -> tp.Set[str]:
+        """
+        Waits for a poll.
+        Args:
+            timeout: the time to wait before polling, in seconds, the
+                interval if None.
+        Returns: the directories whose entries changed.
+        """
+        time.sleep(self.interval if timeout is None else timeout)
+        dirty = set()
+        for directory, mtime in list(self.mtimes.items()):
+            try:
+                self.mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self.mtimes[directory]
+            if self.mtimes.get(directory) != mtime:
+                dirty.add(directory)
+        return dirty
+
+    def close(self) \
+        -> None:
+        pass
+
+
+class Watcher:
+    """
+    Watches a file store and keeps the documents of its media files up
+    to date, as manifest entries. The directories touched by events are
+    listed again once the events stop for a while, such that bursts of
+    events, e.g. a season being copied, are synced at once, and only
+    the files that changed since are built, as manifest.rescan does.
+    """
+
+    def __init__(self,
+                 root: tp.Union[str, path.Path],
+                 entries: tp.Optional[tp.Dict[str, manifest.Entry]] = None,
+                 polled: bool = False,
+                 probed: bool = False,
+                 delay: float = DELAY,
+                 max_delay: float = MAX_DELAY,
+                 interval: float = INTERVAL,
+                 cached: tp.Optional[cache.Cache] = None):
+        """
+        Args:
+            root: the root of the file store.
+            entries: the manifest entries of the last scan, per file
+                path relative to the root, updated in place.
+            polled: whether to poll the directories rather than use
+                inotify, which is used if available otherwise.
+            probed: whether to read the languages the paths do not give
+                from the file tracks.
+            delay: the time without events after which changes are
+                synced, in seconds.
+            max_delay: the maximum time changes wait to be synced, in
+                seconds.
+            interval: the time between two polls, in seconds.
+            cached: a cache of the documents, to only build those of the
+                changed files that are not cached, as manifest.rescan
+                does.
+        """
+        """the root of the file store, with a trailing separator"""
+        self.root = os.path.abspath(root)
+        self.prefix = os.path.join(self.root, "")
+        """the manifest entries, per file path relative to the root"""
+        self.entries = {} if entries is None else entries
+        """whether to read the languages from the file tracks"""
+        self.probed = probed
+        """the debouncing delays, in seconds"""
+        self.delay = delay
+        self.max_delay = max_delay
+        """the time between two polls, in seconds"""
+        self.interval = interval
+        """the cache of the documents, None if not cached"""
+        self.cached = cached
+        """the directory watcher, an Inotify or a Poller"""
+        self.watcher: tp.Union[Inotify, Poller] = Poller(interval)
+        if not polled:
+            try:
+                self.watcher = Inotify()
+            except (OSError, AttributeError):
+                pass
+        """the names of the files with an entry, per directory"""
+        self.names: tp.Dict[str, tp.Set[str]] = {}
+        for key in self.entries:
+            directory, name = os.path.split(self.prefix + key)
+            self.names.setdefault(directory, set()).add(name)
+
+    def __enter__(self) \
+        -> "Watcher":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def close(self) \
+        -> None:
+        """
+        Stops watching the directories.
+        """
+        self.watcher.close()
+
+    @property
+    def files(self) \
+        -> tp.Set[str]:
+        """
+        Returns: the paths to the media files with a document.
+        """
+        return {self.prefix + x for x in self.entries}
+
+    def _watch(self, directory: str) \
+        -> None:
+        """
+        Watches a directory, falling back to polling if there are too
+        many inotify watches.
+        Args:
+            directory: the directory path.
+        """
+        try:
+            self.watcher.add(directory)
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                # e.g. deleted since listed, synced with its parent
+                return
+            poller = Poller(self.interval)
+            for x in list(self.watcher.directories) + [directory]:
+                try:
+                    poller.add(x)
+                except OSError:
+                    # deleted since listed, synced with its parent
+                    pass
+            self.watcher.close()
+            self.watcher = poller
+            # the events not read yet are lost
+            self.watcher.overflowed = True
+
+    def _forget(self, directory: str) \
+        -> tp.List[manifest.Change]:
+        """
+        Forgets a directory that was deleted or moved out of the store,
+        and those under it.
+        Args:
+            directory: the directory path.
+        Returns: the deletions of the documents of the files under it.
+        """
+        prefix = os.path.join(directory, "")
+        changes = []
+        for x in [x for x in self.names
+                  if x == directory or x.startswith(prefix)]:
+            for name in sorted(self.names.pop(x)):
+                file = os.path.join(x, name)
+                del self.entries[file[len(self.prefix):]]
+                changes.append(manifest.Change(manifest.DELETED, file))
+        for x in [x for x in self.watcher.directories
+                  if x == directory or x.startswith(prefix)]:
+            self.watcher.remove(x)
+        return changes
+
+    def sync(self,
+             directories: tp.Iterable[str],
+             recursive: bool = False) \
+        -> tp.List[tp.Union[manifest.Change, scanner.Reject]]:
+        """
+        Lists directories again and updates the entries of their files,
+        the new directories under them being watched and listed too.
+        Args:
+            directories: the directories whose entries changed.
+            recursive: whether to list all the directories under them,
+                rather than the new ones only.
+        Returns: the changes and the rejects.
+        """
+        changes = []
+        stack = []
+        for directory in directories:
+            if os.path.isdir(directory) and \
+                    (directory + os.sep).startswith(self.prefix):
+                stack.append(directory)
+            else:
+                changes += self._forget(directory)
+        visited = set()
+        stats = {}
+        while stack:
+            directory = stack.pop()
+            if directory in visited:
+                continue
+            visited.add(directory)
+            # watched before listed, such that no change is missed
+            self._watch(directory)
+            subdirs, files = scanner.list_dir(directory, stat=True)
+            watched = self.watcher.directories
+            stack += [x for x in subdirs if recursive or x not in watched]
+            names = set()
+            for file, stat in files:
+                names.add(os.path.basename(file))
+                entry = self.entries.get(file[len(self.prefix):])
+                if entry is None or entry[:3] != (stat.st_ino,
+                                                  stat.st_size,
+                                                  stat.st_mtime_ns):
+                    stats[file] = stat
+            known = self.names.get(directory, set())
+            for name in sorted(known - names):
+                file = os.path.join(directory, name)
+                known.discard(name)
+                del self.entries[file[len(self.prefix):]]
+                changes.append(manifest.Change(manifest.DELETED, file))
+        if self.cached is None:
+            documents = scanner.build_documents(stats, self.root,
+                                                self.probed)
+        else:
+            documents = self.cached.build([list(stats.items())],
+                                          self.root,
+                                          probed=self.probed)
+        for document in documents:
+            file = document.file if isinstance(document, scanner.Reject) \
+                   else str(document.file)
+            key = file[len(self.prefix):]
+            directory, name = os.path.split(file)
+            if isinstance(document, scanner.Reject):
+                if self.entries.pop(key, None) is not None:
+                    self.names[directory].discard(name)
+                    changes.append(manifest.Change(manifest.DELETED, file))
+                changes.append(document)
+                continue
+            stat = stats[file]
+            new = manifest.Entry(stat.st_ino, stat.st_size,
+                                 stat.st_mtime_ns, manifest.digest(document))
+            old = self.entries.get(key)
+            self.entries[key] = new
+            self.names.setdefault(directory, set()).add(name)
+            if old is None:
+                changes.append(manifest.Change(manifest.CREATED, file,
+                                               document))
+            elif old.digest != new.digest:
+                changes.append(manifest.Change(manifest.CHANGED, file,
+                                               document))
+        if recursive:
+            # the directories not found anymore
+            for directory in [x for x in list(self.names) +
+                              list(self.watcher.directories)
+                              if x not in visited]:
+                changes += self._forget(directory)
+        return changes
+
+    def batches(self) \
+        -> tp.Iterator[tp.List[tp.Union[manifest.Change,
+                                        scanner.Reject]]]:
+        """
+        Watches the file store, forever.
+        Returns: an iterator over the batches of changes and rejects,
+            the first one being those since the last scan, i.e. the
+            entries, and the next ones being synced once the events
+            stop for the delay, or after the maximum delay.
+        """
+        yield self.sync([self.root], recursive=True)
+        while True:
+            dirty = self.watcher.wait()
+            if not dirty and not self.watcher.overflowed:
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                timeout = min(self.delay, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                events = self.watcher.wait(timeout)
+                if not events:
+                    break
+                dirty |= events
+            if self.watcher.overflowed:
+                self.watcher.overflowed = False
+                yield self.sync([self.root], recursive=True)
+            else:
+                yield self.sync(dirty)
+
+
+class JSONLOutput:
+    """
+    A JSONL file of media documents, kept in sync with changes by
+    rewriting it, atomically, the documents being kept serialized.
+    """
+
+    def __init__(self, file: tp.Union[str, path.Path]):
+        """
+        Args:
+            file: the path to the JSONL file, read if it exists.
+        """
+        """the path to the JSONL file"""
+        self.file = file
+        """the serialized documents, per file"""
+        self.lines: tp.Dict[str, str] = {}
+        try:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self.lines[json.loads(line)["file"]] = line.rstrip()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) \
+        -> "JSONLOutput":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def close(self) \
+        -> None:
+        pass
+
+    def write(self) \
+        -> None:
+        """
+        Writes the documents, atomically replacing the file.
+        """
+        tmp = f"{self.file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for line in self.lines.values():
+                f.write(line + "\n")
+        os.replace(tmp, self.file)
+
+    def apply(self, changes: tp.Iterable[manifest.Change]) \
+        -> None:
+        """
+        Applies changes to the documents.
+        Args:
+            changes: the changes.
+        """
+        for change in changes:
+            if change.document is None:
+                self.lines.pop(change.file, None)
+            else:
+                self.lines[change.file] = change.document.model_dump_json()
+        self.write()
+
+    def retain(self,
+               root: tp.Union[str, path.Path],
+               files: tp.Set[str]) \
+        -> None:
+        """
+        Removes the documents of the files under a directory but those
+        of some files, e.g. those found by a scan.
+        Args:
+            root: the directory path.
+            files: the paths to the files to keep.
+        """
+        prefix = os.path.join(os.path.abspath(root), "")
+        self.lines = {key: value for key, value in self.lines.items()
+                      if key in files or not key.startswith(prefix)}
+        self.write()
+
+
+class CatalogueOutput:
+    """
+    A catalogue of media documents, kept in sync with changes.
+    """
+
+    def __init__(self, file: tp.Union[str, path.Path]):
+        """
+        Args:
+            file: the path to the catalogue, created if needed.
+        """
+        """the catalogue"""
+        self.catalogue = catalogue.Catalogue(file)
+
+    def __enter__(self) \
+        -> "CatalogueOutput":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def close(self) \
+        -> None:
+        self.catalogue.close()
+
+    def apply(self, changes: tp.Iterable[manifest.Change]) \
+        -> None:
+        """
+        Applies changes to the documents.
+        Args:
+            changes: the changes.
+        """
+        changes = list(changes)
+        self.catalogue.add_many(x.document for x in changes
+                                if x.document is not None)
+        self.catalogue.remove_many(x.file for x in changes
+                                   if x.document is None)
+
+    def retain(self,
+               root: tp.Union[str, path.Path],
+               files: tp.Set[str]) \
+        -> None:
+        """
+        Removes the documents of the files under a directory but those
+        of some files, e.g. those found by a scan.
+        Args:
+            root: the directory path.
+            files: the paths to the files to keep.
+        """
+        self.catalogue.remove_many([str(x.file)
+                                    for x in self.catalogue.under(
+                                                os.path.abspath(root))
+                                    if str(x.file) not in files])
@@ -0,0 +1,471 @@
+import json
+import http
+import signal
+import asyncio
+import urllib.parse
+import concurrent.futures as futures
+import typing as tp
+import pathlib as path
+import mediadb.models.ingest as ingest
+import mediadb.models.medias as medias
+import mediadb.store.catalogue as catalogue
+import mediadb.store.query as query
+
+
+"""the number of documents of a page, by default and at most"""
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+"""the number of documents read at once for the streamed responses"""
+CHUNK_SIZE = 200
+
+"""the maximum size of a request body, in bytes"""
+MAX_BODY = 1 << 20
+
+"""the maximum number of headers of a request"""
+MAX_HEADERS = 100
+
+"""the query parameters, other than the document fields"""
+PARAMETERS = ("min_season", "max_season", "limit", "cursor", "format")
+
+
+class HTTPError(Exception):
+    """
+    Raised to answer a request with an error status.
+    """
+
+    def __init__(self, status: int, *messages: str):
+        """
+        Args:
+            status: the HTTP status.
+            messages: the error messages.
+        """
+        super().__init__(*messages)
+        """the HTTP status"""
+        self.status = status
+        """the error messages"""
+        self.messages = list(messages)
+
+
+class Request(tp.NamedTuple):
+    """
+    An HTTP request.
+    """
+
+    """the method, in upper case"""
+    method: str
+    """the path"""
+    path: str
+    """the query parameters, the last value of each one"""
+    params: tp.Dict[str, str]
+    """the headers, by lower case name"""
+    headers: tp.Dict[str, str]
+    """the body"""
+    body: bytes
+
+
+def parse_query(params: tp.Dict[str, str]) \
+    -> tp.Tuple[query.Query, tp.Optional[int], tp.Optional[int]]:
+    """
+    Parses the query parameters of a document search: the values the
+    document fields must be equal to, the min_season and max_season
+    bounds, the limit and the cursor of the previous page.
+    Args:
+        params: the query parameters.
+    Returns: the query, without limit, the limit and the cursor, None if
+        not given.
+    Raises:
+        HTTPError if a parameter is not valid.
+    """
+    unknown = set(params) - set(query.FIELDS) - set(PARAMETERS)
+    if unknown:
+        raise HTTPError(400, f"unknown parameters: "
+                             f"{', '.join(sorted(unknown))}")
+    try:
+        q = query.Query(**{key: value for key, value in params.items()
+                           if key in query.FIELDS})
+        if "min_season" in params:
+            q = q.filter(query.SEASON >= params["min_season"])
+        if "max_season" in params:
+            q = q.filter(query.SEASON <= params["max_season"])
+        limit = int(params["limit"]) if "limit" in params else None
+        cursor = int(params["cursor"]) if "cursor" in params else None
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    if limit is not None and limit < 0:
+        raise HTTPError(400, "limit cannot be negative")
+    return q, limit, cursor
+
+
+class Server:
+    """
+    An HTTP API over a media catalogue, served by an asyncio event loop:
+        - POST /validate validates a media document, its type field
+          picking the model, and answers it.
+        - POST /medias validates a media document and adds it to the
+          catalogue, replacing any document of the same file.
+        - GET /medias finds the documents matching the query parameters,
+          one page of at most limit documents at a time in JSON format
+          with the cursor of the next page, or all of them in JSONL
+          format, streamed, if format=jsonl.
+    The pages are keyed rather than offset (see Catalogue.page), such
+    that they cost the same wherever they are. The catalogue is read and
+    written by two worker threads, each owning a connection, such that
+    queries do not wait for writes, e.g. their checkpoints, while the
+    documents are validated by the event loop.
+    """
+
+    def __init__(self, file: tp.Union[str, path.Path]):
+        """
+        Args:
+            file: the path to the catalogue, created if needed.
+        """
+        """the path to the catalogue"""
+        self.file = file
+        """the threads reading and writing the catalogue"""
+        self.reading = futures.ThreadPoolExecutor(max_workers=1)
+        self.writing = futures.ThreadPoolExecutor(max_workers=1)
+        """the catalogue connections of the threads, once started"""
+        self.reader: tp.Optional[catalogue.Catalogue] = None
+        self.writer: tp.Optional[catalogue.Catalogue] = None
+        """the listening server, once started"""
+        self.server: tp.Optional[asyncio.AbstractServer] = None
+        """the tasks serving the open connections, by connection"""
+        self.connections: tp.Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    @staticmethod
+    async def _run(worker: futures.Executor,
+                   function: tp.Callable[..., tp.Any],
+                   *args) \
+        -> tp.Any:
+        """
+        Runs a function in a worker thread.
+        Args:
+            worker: the thread.
+            function: the function.
+            args: the function arguments.
+        Returns: the function result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+                        worker, function, *args)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) \
+        -> int:
+        """
+        Opens the catalogue and starts listening.
+        Args:
+            host: the address to listen on.
+            port: the port to listen on, 0 for any free port.
+        Returns: the port listened on.
+        """
+        # the writer first, which creates the catalogue if needed
+        self.writer = await self._run(self.writing, catalogue.Catalogue,
+                                      self.file)
+        self.reader = await self._run(self.reading, catalogue.Catalogue,
+                                      self.file)
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) \
+        -> None:
+        """
+        Stops listening, closes the connections and the catalogue.
+        """
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+        await asyncio.gather(*self.connections.values())
+        await self.server.wait_closed()
+        for worker, c in ((self.reading, self.reader),
+                          (self.writing, self.writer)):
+            await self._run(worker, c.close)
+            worker.shutdown()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000) \
+        -> None:
+        """
+        Serves requests until interrupted by SIGINT or SIGTERM.
+        Args:
+            host: the address to listen on.
+            port: the port to listen on.
+        """
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set_result, None)
+        await self.start(host, port)
+        try:
+            await stopped
+        finally:
+            await self.close()
+
+    def run(self, host: str = "127.0.0.1", port: int = 8000) \
+        -> None:
+        """
+        Runs serve() in an event loop.
+        """
+        asyncio.run(self.serve(host, port))
+
+    @staticmethod
+    async def read(reader: asyncio.StreamReader) \
+        -> tp.Optional[Request]:
+        """
+        Reads a request.
+        Args:
+            reader: the connection input.
+        Returns: the request, None if the connection is closed.
+        Raises:
+            HTTPError if the request is not valid.
+        """
+        try:
+            line = await reader.readline()
+            if not line:
+                return None
+            try:
+                method, target, _ = line.decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(400, "invalid request line")
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if len(headers) == MAX_HEADERS:
+                    raise HTTPError(431, "too many headers")
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            # a line longer than the stream limit
+            raise HTTPError(431, "line too long")
+        if "transfer-encoding" in headers:
+            raise HTTPError(411, "bodies must have a Content-Length")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "invalid Content-Length")
+        if not 0 <= length <= MAX_BODY:
+            raise HTTPError(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urllib.parse.urlsplit(target)
+        return Request(method.upper(),
+                       url.path,
+                       dict(urllib.parse.parse_qsl(url.query)),
+                       headers,
+                       body)
+
+    @staticmethod
+    def write(writer: asyncio.StreamWriter,
+              status: int,
+              body: bytes,
+              content_type: str = "application/json") \
+        -> None:
+        """
+        Writes a response.
+        Args:
+            writer: the connection output.
+            status: the HTTP status.
+            body: the response body.
+            content_type: the body type.
+        """
+        writer.write(f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"
+                     f"\r\nContent-Type: {content_type}"
+                     f"\r\nContent-Length: {len(body)}\r\n\r\n".encode() +
+                     body)
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Serves the requests of a connection until it is closed.
+        Args:
+            reader: the connection input.
+            writer: the connection output.
+        """
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    request = await self.read(reader)
+                    if request is None:
+                        break
+                    await self.respond(request, writer)
+                except HTTPError as e:
+                    self.write(writer, e.status,
+                               json.dumps({"errors": e.messages}).encode())
+                    request = None
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception as e:
+                    # e.g. the catalogue locked by another process
+                    self.write(writer, 500,
+                               json.dumps({"errors": [str(e) or
+                                                      type(e).__name__]})
+                               .encode())
+                    request = None
+                await writer.drain()
+                if request is None or request.headers.get(
+                        "connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.pop(writer)
+            writer.close()
+
+    async def respond(self,
+                      request: Request,
+                      writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Answers a request.
+        Args:
+            request: the request.
+            writer: the connection output.
+        Raises:
+            HTTPError if the request cannot be answered.
+        """
+        routes = {("POST", "/validate"): self.validate,
+                  ("POST", "/medias"): self.create,
+                  ("GET", "/medias"): self.find}
+        if (request.method, request.path) in routes:
+            await routes[request.method, request.path](request, writer)
+        elif request.path in ("/validate", "/medias"):
+            raise HTTPError(405, f"{request.method} is not allowed")
+        else:
+            raise HTTPError(404, f"{request.path} not found")
+
+    @staticmethod
+    def _document(request: Request) \
+        -> medias.VideoMedia:
+        """
+        Validates the media document of a request body.
+        Args:
+            request: the request.
+        Returns: the media document.
+        Raises:
+            HTTPError if the document is not valid.
+        """
+        try:
+            return ingest.validate_record(request.body)
+        except ValueError as e:
+            raise HTTPError(422, *ingest.error_messages(e))
+
+    async def validate(self,
+                       request: Request,
+                       writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Answers the media document of a request body, validated.
+        """
+        self.write(writer, 200,
+                   self._document(request).model_dump_json().encode())
+
+    async def create(self,
+                     request: Request,
+                     writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Adds the media document of a request body to the catalogue.
+        """
+        document = self._document(request)
+        await self._run(self.writing, self.writer.add, document)
+        self.write(writer, 201, document.model_dump_json().encode())
+
+    def _page(self,
+              q: query.Query,
+              cursor: tp.Optional[int],
+              separator: bytes) \
+        -> tp.Tuple[bytes, int, tp.Optional[int]]:
+        """
+        Gets a page of documents, serialized, run by the worker thread
+        such that large pages do not hold the event loop.
+        Args:
+            q: the query, its limit being the page size.
+            cursor: the key of the previous page.
+            separator: the bytes between the documents.
+        Returns: the documents in JSON format joined by the separator,
+            their number and the key of the page.
+        """
+        documents, cursor = self.reader.page(q, cursor)
+        return separator.join(x.model_dump_json().encode()
+                              for x in documents), len(documents), cursor
+
+    async def find(self,
+                   request: Request,
+                   writer: asyncio.StreamWriter) \
+        -> None:
+        """
+        Answers the documents matching the query parameters of a request.
+        """
+        q, limit, cursor = parse_query(request.params)
+        fmt = request.params.get("format", "json")
+        if fmt == "jsonl":
+            return await self._stream(writer, q, limit, cursor)
+        if fmt != "json":
+            raise HTTPError(400, f"unknown format: {fmt}")
+        limit = PAGE_SIZE if limit is None else limit
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HTTPError(400, f"limit must be between 1 and "
+                                 f"{MAX_PAGE_SIZE}")
+        data, _, cursor = await self._run(self.reading,
+                                          self._page,
+                                          q.limit(limit),
+                                          cursor,
+                                          b",")
+        self.write(writer, 200,
+                   b'{"documents":[' + data +
+                   b'],"cursor":' +
+                   (b"null" if cursor is None else b'"%d"' % cursor) + b"}")
+
+    async def _stream(self,
+                      writer: asyncio.StreamWriter,
+                      q: query.Query,
+                      limit: tp.Optional[int],
+                      cursor: tp.Optional[int]) \
+        -> None:
+        """
+        Streams the documents matching a query, in JSONL format, chunk by
+        chunk such that large results are neither held in memory nor
+        hold the other requests.
+        Args:
+            writer: the connection output.
+            q: the query.
+            limit: the maximum number of documents, None for all.
+            cursor: the key of the page before the first document.
+        Raises:
+            ConnectionAbortedError if a chunk cannot be read once the
+            status is sent, the connection being closed such that the
+            client sees the response is incomplete.
+        """
+        status = (b"HTTP/1.1 200 OK\r\n"
+                  b"Content-Type: application/jsonl\r\n"
+                  b"Transfer-Encoding: chunked\r\n\r\n")
+        started = False
+        while limit is None or limit > 0:
+            size = CHUNK_SIZE if limit is None else min(CHUNK_SIZE, limit)
+            try:
+                data, count, cursor = await self._run(self.reading,
+                                                      self._page,
+                                                      q.limit(size),
+                                                      cursor,
+                                                      b"\n")
+            except Exception as e:
+                if not started:
+                    raise
+                raise ConnectionAbortedError(str(e)) from e
+            if not started:
+                # the status once the first chunk is read, such that its
+                # errors are answered as such
+                writer.write(status)
+                started = True
+            if count:
+                writer.write(b"%x\r\n%s\n\r\n" % (len(data) + 1, data))
+                await writer.drain()
+            if limit is not None:
+                limit -= count
+            if cursor is None:
+                break
+        if not started:
+            writer.write(status)
+        writer.write(b"0\r\n\r\n")
@@ -0,0 +1,471 @@
+import os
+import json
+import sqlite3
+import itertools
+import typing as tp
+import pathlib as path
+import mediadb.models.constants as const
+import mediadb.models.medias as medias
+import mediadb.models.metrics as metrics
+import mediadb.store.query as query
+import mediadb.store.search as search
+
+
+"""the document fields stored as columns, in column order"""
+COLUMNS = ("type", "title", "language", "subtitles", "file", "season",
+           "episode", "episode_name", "fingerprint")
+
+"""the statements creating the catalogue schema"""
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS medias ("
+    "id INTEGER PRIMARY KEY, "
+    "type TEXT NOT NULL, "
+    "title TEXT NOT NULL, "
+    "language TEXT NOT NULL, "
+    "subtitles TEXT, "
+    "file TEXT NOT NULL UNIQUE, "
+    "season INTEGER, "
+    "episode INTEGER, "
+    "episode_name TEXT, "
+    "fingerprint TEXT)",
+    "CREATE INDEX IF NOT EXISTS medias_title ON medias (title)",
+    "CREATE INDEX IF NOT EXISTS medias_type ON medias (type)",
+    "CREATE INDEX IF NOT EXISTS medias_language ON medias (language)",
+    "CREATE INDEX IF NOT EXISTS medias_subtitles ON medias (subtitles)",
+    "CREATE INDEX IF NOT EXISTS medias_episode "
+    "ON medias (title, season, episode)",
+    "CREATE INDEX IF NOT EXISTS medias_fingerprint ON medias (fingerprint)",
+    # full-text index of the titles and episode names, kept in sync with
+    # the medias table by the catalogue methods
+    "CREATE VIRTUAL TABLE IF NOT EXISTS medias_search USING fts5("
+    "title, episode_name, content='medias', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS medias_search_vocabulary "
+    "USING fts5vocab(medias_search, 'row')",
+)
+
+"""the maximum number of documents of a change applied word by word to
+the search vocabulary, larger changes being synchronized in bulk"""
+SMALL_CHANGE = 100
+
+"""the maximum number of documents containing a word for it to be used
+to complete the documents matching a search with those matching any word"""
+COMMON_WORD = 1000
+
+"""inserts or replaces a document, files being unique"""
+_UPSERT = f"INSERT INTO medias ({', '.join(COLUMNS)}) " \
+          f"VALUES ({', '.join('?' for _ in COLUMNS)}) " \
+          f"ON CONFLICT (file) DO UPDATE SET " \
+          f"{', '.join(f'{x} = excluded.{x}' for x in COLUMNS if x != 'file')}"
+
+"""removes the documents of the files of a JSON array from the
+full-text index, before they are replaced or deleted"""
+_UNINDEX = "INSERT INTO medias_search " \
+           "(medias_search, rowid, title, episode_name) " \
+           "SELECT 'delete', id, title, episode_name FROM medias " \
+           "WHERE file IN (SELECT value FROM json_each(?))"
+
+"""adds the documents of the files of a JSON array to the full-text index"""
+_INDEX = "INSERT INTO medias_search (rowid, title, episode_name) " \
+         "SELECT id, title, episode_name FROM medias " \
+         "WHERE file IN (SELECT value FROM json_each(?))"
+
+"""selects documents"""
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM medias"
+
+"""the row identifiers, keying the pages of documents"""
+_ID = query.Field("id", int)
+
+"""selects documents with their row identifier"""
+_SELECT_ID = f"SELECT {', '.join(COLUMNS)}, id FROM medias"
+
+"""selects the documents matching a full-text query, best first"""
+_SEARCH = f"SELECT {', '.join(f'medias.{x}' for x in COLUMNS)} " \
+          f"FROM medias_search JOIN medias ON medias.id = medias_search.rowid " \
+          f"WHERE medias_search MATCH ? " \
+          f"ORDER BY bm25(medias_search, 10.0, 1.0) LIMIT ?"
+
+"""counts the documents containing the words of a JSON array"""
+_FREQUENCY = "SELECT COALESCE(SUM(doc), 0) FROM medias_search_vocabulary " \
+             "WHERE term IN (SELECT value FROM json_each(?))"
+
+
+def to_row(document: medias.VideoMedia) \
+    -> tp.Tuple[tp.Any, ...]:
+    """
+    Converts a media document into a catalogue row.
+    Args:
+        document: the media document.
+    Returns: the column values, in COLUMNS order.
+    """
+    subtitles = document.subtitles
+    return (document.type.value,
+            document.title,
+            document.language.value,
+            None if subtitles is None else subtitles.value,
+            str(document.file),
+            getattr(document, "season", None),
+            getattr(document, "episode", None),
+            getattr(document, "episode_name", None),
+            document.fingerprint)
+
+
+def to_document(row: tp.Sequence[tp.Any]) \
+    -> medias.VideoMedia:
+    """
+    Converts a catalogue row into a media document. The rows are
+    validated when written, such that they are not validated again.
+    Args:
+        row: the column values, in COLUMNS order.
+    Returns: the media document.
+    """
+    model = medias.MEDIA_CLASSES[const.VideoType(row[0])]
+    return model.from_trusted(dict(zip(COLUMNS, row)))
+
+
+class Catalogue:
+    """
+    A media catalogue stored in a SQLite database, in WAL mode such
+    that readers do not block the writer. All the document fields are
+    stored in columns, indexed for lookups by file, title, type,
+    languages and (title, season, episode).
+    """
+
+    def __init__(self,
+                 file: tp.Union[str, path.Path] = ":memory:",
+                 batch_size: int = 10000):
+        """
+        Opens a catalogue, creating it if needed.
+        Args:
+            file: the path to the database file, ":memory:" for a
+                catalogue held in memory.
+            batch_size: the number of documents written per transaction
+                in bulk operations.
+        """
+        """the number of documents written per transaction"""
+        self.batch_size = batch_size
+        """the database connection"""
+        self.connection = sqlite3.connect(str(file))
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            indexed = self.connection.execute(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE name = 'medias_search'").fetchone()
+            self.connection.execute(SCHEMA[0])
+            columns = {x[1] for x in self.connection.execute(
+                                        "PRAGMA table_info(medias)")}
+            if "fingerprint" not in columns:
+                # catalogue created before the fingerprints
+                self.connection.execute("ALTER TABLE medias "
+                                        "ADD COLUMN fingerprint TEXT")
+            for statement in SCHEMA[1:]:
+                self.connection.execute(statement)
+            """the words of the full-text index"""
+            self.vocabulary = search.Vocabulary(
+                                self.connection,
+                                "SELECT term FROM medias_search_vocabulary")
+            if indexed is None:
+                # full-text index of a catalogue created without
+                self.connection.execute("INSERT INTO medias_search "
+                                        "(medias_search) VALUES ('rebuild')")
+                self.vocabulary.touch()
+
+    def __enter__(self) \
+        -> "Catalogue":
+        return self
+
+    def __exit__(self, *args) \
+        -> None:
+        self.close()
+
+    def __len__(self) \
+        -> int:
+        """
+        Returns: the number of documents in the catalogue.
+        """
+        return self.connection.execute(
+                    "SELECT COUNT(*) FROM medias").fetchone()[0]
+
+    def close(self) \
+        -> None:
+        """
+        Closes the database connection, after refreshing the statistics
+        the query planner uses to pick indexes.
+        """
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+
+    def add(self, document: medias.VideoMedia) \
+        -> None:
+        """
+        Adds a document to the catalogue, replacing any document of the
+        same file.
+        Args:
+            document: the media document.
+        """
+        self.add_many((document,))
+
+    def add_many(self, documents: tp.Iterable[medias.VideoMedia]) \
+        -> int:
+        """
+        Adds documents to the catalogue, replacing any document of the
+        same file. The documents are inserted in batches, one transaction
+        per batch, such that arbitrary long iterables are consumed in
+        constant memory.
+        Args:
+            documents: the media documents.
+        Returns: the number of documents added.
+        """
+        n = 0
+        rows = map(to_row, documents)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return n
+            files = json.dumps([row[4] for row in batch])
+            with metrics.stage("insert"), self.connection:
+                self.connection.execute(_UNINDEX, (files,))
+                self.connection.executemany(_UPSERT, batch)
+                self.connection.execute(_INDEX, (files,))
+                if len(batch) <= SMALL_CHANGE and self.vocabulary.is_synced():
+                    self.vocabulary.add(word for row in batch
+                                        for text in (row[1], row[7]) if text
+                                        for word in search.tokens(text))
+                else:
+                    self.vocabulary.touch()
+            n += len(batch)
+
+    def remove(self, file: tp.Union[str, path.Path]) \
+        -> bool:
+        """
+        Removes the document of a file from the catalogue.
+        Args:
+            file: the path to the media file.
+        Returns: whether a document was removed.
+        """
+        return self.remove_many((file,)) > 0
+
+    def remove_many(self, files: tp.Iterable[tp.Union[str, path.Path]]) \
+        -> int:
+        """
+        Removes the documents of files from the catalogue, in batches.
+        Args:
+            files: the paths to the media files.
+        Returns: the number of documents removed.
+        """
+        n = 0
+        keys = (str(x) for x in files)
+        while True:
+            batch = list(itertools.islice(keys, self.batch_size))
+            if not batch:
+                return n
+            files = json.dumps(batch)
+            with self.connection:
+                self.connection.execute(_UNINDEX, (files,))
+                cursor = self.connection.execute(
+                            "DELETE FROM medias "
+                            "WHERE file IN (SELECT value FROM json_each(?))",
+                            (files,))
+                # the words of small removals are kept in the vocabulary,
+                # which is harmless as they only widen searches
+                if cursor.rowcount > SMALL_CHANGE:
+                    self.vocabulary.touch()
+            n += cursor.rowcount
+
+    def set_fingerprints(self,
+                         fingerprints: tp.Iterable[
+                            tp.Tuple[tp.Union[str, path.Path], str]]) \
+        -> int:
+        """
+        Records the fingerprints of media files, in batches, the other
+        fields of their documents being left as they are.
+        Args:
+            fingerprints: the (file, fingerprint) pairs.
+        Returns: the number of documents updated, the files that are not
+            in the catalogue being ignored.
+        """
+        n = 0
+        rows = ((fingerprint, str(file)) for file, fingerprint in fingerprints)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return n
+            with self.connection:
+                cursor = self.connection.executemany(
+                            "UPDATE medias SET fingerprint = ? WHERE file = ?",
+                            batch)
+            n += cursor.rowcount
+
+    def duplicates(self) \
+        -> tp.Iterator[tp.List[medias.VideoMedia]]:
+        """
+        Gets the documents of the media files having the same content,
+        as told by their fingerprints.
+        Returns: an iterator over the groups of documents sharing a
+            fingerprint, each of at least two documents in file order.
+        """
+        cursor = self.connection.execute(
+                    f"{_SELECT} WHERE fingerprint IN ("
+                    f"SELECT fingerprint FROM medias "
+                    f"WHERE fingerprint IS NOT NULL "
+                    f"GROUP BY fingerprint HAVING COUNT(*) > 1) "
+                    f"ORDER BY fingerprint, file")
+        index = COLUMNS.index("fingerprint")
+        return ([to_document(x) for x in group]
+                for _, group in itertools.groupby(cursor,
+                                                  key=lambda x: x[index]))
+
+    def get(self, file: tp.Union[str, path.Path]) \
+        -> tp.Optional[medias.VideoMedia]:
+        """
+        Gets the document of a file.
+        Args:
+            file: the path to the media file.
+        Returns: the media document, None if not in the catalogue.
+        """
+        row = self.connection.execute(f"{_SELECT} WHERE file = ?",
+                                      (str(file),)).fetchone()
+        return None if row is None else to_document(row)
+
+    def episodes(self,
+                 title: str,
+                 first_season: tp.Optional[int] = None,
+                 last_season: tp.Optional[int] = None) \
+        -> tp.Iterator[medias.Serie]:
+        """
+        Gets the episodes of a serie, in season and episode order.
+        Args:
+            title: the serie title.
+            first_season: the first season to get, from the first one if
+                None.
+            last_season: the last season to get, up to the last one if
+                None.
+        Returns: an iterator over the episodes.
+        """
+        where = "title = ? AND season BETWEEN ? AND ?"
+        params = (title,
+                  1 if first_season is None else first_season,
+                  # the largest SQLite integer
+                  (1 << 63) - 1 if last_season is None else last_season)
+        cursor = self.connection.execute(
+                    f"{_SELECT} WHERE {where} ORDER BY season, episode",
+                    params)
+        return map(to_document, cursor)
+
+    def under(self, directory: tp.Union[str, path.Path]) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Gets the documents of the files under a directory, which is a
+        range of the file index rather than a scan.
+        Args:
+            directory: the directory path.
+        Returns: an iterator over the documents, in file order.
+        """
+        prefix = os.path.join(str(directory), "")
+        # the paths starting with the prefix sort before the prefix with
+        # its trailing / replaced by the next character
+        cursor = self.connection.execute(
+                    f"{_SELECT} WHERE file >= ? AND file < ? ORDER BY file",
+                    (prefix, prefix[:-1] + "0"))
+        return map(to_document, cursor)
+
+    def find(self, q: query.Query) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Finds the documents matching a query. The filtering is done by
+        SQLite, which uses the catalogue indexes.
+        Args:
+            q: the query.
+        Returns: an iterator over the documents, fetched lazily.
+        """
+        return metrics.timed(map(to_document,
+                                 self.connection.execute(*q.to_sql(_SELECT))),
+                             "fetch")
+
+    def page(self, q: query.Query, after: tp.Optional[int] = None) \
+        -> tp.Tuple[tp.List[medias.VideoMedia], tp.Optional[int]]:
+        """
+        Gets a page of the documents matching a query, in insertion
+        order. The pages are keyed on the row identifiers, which are
+        indexed, rather than offset, such that getting a page costs the
+        same wherever it is and that pages do not shift when documents
+        are added or removed.
+        Args:
+            q: the query, without order, its limit being the page size.
+            after: the key of the previous page, None for the first
+                page.
+        Returns: the documents and the key of the page, to get the next
+            one, None if there are no more documents.
+        Raises:
+            ValueError if the query is sorted.
+        """
+        if q.order:
+            raise ValueError("sorted queries cannot be paged")
+        if after is not None:
+            q = q.filter(_ID > after)
+        rows = self.connection.execute(
+                    *q.order_by(_ID).to_sql(_SELECT_ID)).fetchall()
+        key = rows[-1][-1] if rows and len(rows) == q.max_count else None
+        return [to_document(x) for x in rows], key
+
+    def count(self, q: query.Query) \
+        -> int:
+        """
+        Counts the documents matching a query.
+        Args:
+            q: the query.
+        Returns: the number of documents.
+        """
+        sql, params = q.limit(None).to_sql("SELECT COUNT(*) FROM medias")
+        return self.connection.execute(sql, params).fetchone()[0]
+
+    def search(self, text: str, limit: int = 10) \
+        -> tp.List[tp.Tuple[float, medias.VideoMedia]]:
+        """
+        Searches documents by title and episode name, tolerating typos.
+        Each word of the text is matched to the indexed words within a
+        few edits of it. The documents matching all the words are
+        looked up in the full-text index, completed by those matching
+        any of the words that are not common if there are not enough,
+        and the best candidates are ranked by how close their title or
+        episode name is to the text.
+        Args:
+            text: the text to search.
+            limit: the maximum number of documents.
+        Returns: the (score, document) pairs, best first, the scores
+            being between 0 and 1.
+        """
+        alternatives = [[word for word, _ in self.vocabulary.lookup(x)]
+                        for x in search.tokens(text)]
+        alternatives = [x for x in alternatives if x]
+        if not alternatives:
+            return []
+        rows = self.connection.execute(
+                    _SEARCH, (search.expression(alternatives, "AND"),
+                              5 * limit)).fetchall()
+        if len(rows) < limit and len(alternatives) > 1:
+            # matching any common word would scan most of the index
+            rare = [x for x in alternatives if self.connection.execute(
+                        _FREQUENCY, (json.dumps(x),)).fetchone()[0] <=
+                        COMMON_WORD]
+            if rare:
+                rows += [x for x in self.connection.execute(
+                                        _SEARCH,
+                                        (search.expression(rare, "OR"),
+                                         5 * limit))
+                         if x not in rows]
+        normalized = search.normalize(text)
+        scores = [(max(search.similarity(normalized, row[1]),
+                       search.similarity(normalized, row[7])), i)
+                  for i, row in enumerate(rows)]
+        scores.sort(key=lambda x: (-x[0], x[1]))
+        return [(score, to_document(rows[i])) for score, i in scores[:limit]]
+
+    def __iter__(self) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Returns: an iterator over all the documents, in insertion order.
+        """
+        return map(to_document,
+                   self.connection.execute(f"{_SELECT} ORDER BY id"))
@@ -0,0 +1,229 @@
+import itertools
+import typing as tp
+import pathlib as path
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as parquet
+import mediadb.models.constants as const
+import mediadb.models.medias as medias
+import mediadb.models.bulk as bulk
+
+
+"""the supported file formats"""
+FORMATS = ("parquet", "arrow")
+
+"""the default number of documents per record batch"""
+BATCH_SIZE = 100000
+
+"""the compression codec of the files"""
+COMPRESSION = "zstd"
+
+"""the type of the columns holding an enumeration, dictionary encoded,
+the dictionary being all the enumeration values such that the codes are
+the same in all batches and files"""
+ENUM_TYPE = pa.dictionary(pa.int16(), pa.string())
+
+
+"""the table schema, one column per document field, the integers being
+64 bits as in the catalogue, the models bounding them below only"""
+SCHEMA = pa.schema([("type", ENUM_TYPE, False),
+                    ("title", pa.string(), False),
+                    ("language", ENUM_TYPE, False),
+                    ("subtitles", ENUM_TYPE),
+                    ("file", pa.string(), False),
+                    ("season", pa.int64()),
+                    ("episode", pa.int64()),
+                    ("episode_name", pa.string()),
+                    ("fingerprint", pa.string())])
+
+"""the dictionary of each enumeration"""
+_DICTIONARIES = {enum: pa.array([x.value for x in enum], pa.string())
+                 for enum in (const.VideoType, const.Language)}
+
+"""the code of each enumeration value, in its dictionary"""
+_CODES = {enum: {x: i for i, x in enumerate(enum)}
+          for enum in (const.VideoType, const.Language)}
+
+
+def _encode(values: tp.List[tp.Optional[const.StrEnum]],
+            enum: tp.Type[const.StrEnum]) \
+    -> pa.DictionaryArray:
+    """
+    Dictionary encodes enumeration values.
+    Args:
+        values: the values, None for missing values.
+        enum: the enumeration.
+    Returns: the array.
+    """
+    codes = _CODES[enum]
+    return pa.DictionaryArray.from_arrays(
+                pa.array([None if x is None else codes[x] for x in values],
+                         pa.int16()),
+                _DICTIONARIES[enum])
+
+
+def _decode(column: tp.Union[pa.ChunkedArray, pa.Array]) \
+    -> tp.List[tp.Any]:
+    """
+    Converts a column into Python values, the dictionary encoded columns
+    being decoded once per dictionary value rather than per row.
+    Args:
+        column: the column.
+    Returns: the values, None for missing values.
+    """
+    if not pa.types.is_dictionary(column.type):
+        return column.to_pylist()
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    dictionary = column.dictionary.to_pylist()
+    return [None if x is None else dictionary[x]
+            for x in column.indices.to_pylist()]
+
+
+def to_batch(documents: tp.Sequence[medias.VideoMedia]) \
+    -> pa.RecordBatch:
+    """
+    Converts media documents of any type into a columnar record batch.
+    Args:
+        documents: the media documents.
+    Returns: the record batch, with the SCHEMA columns, the serie
+        fields being null for the other types.
+    """
+    return pa.RecordBatch.from_arrays(
+        [_encode([x.type for x in documents], const.VideoType),
+         pa.array([x.title for x in documents], pa.string()),
+         _encode([x.language for x in documents], const.Language),
+         _encode([x.subtitles for x in documents], const.Language),
+         pa.array([str(x.file) for x in documents], pa.string()),
+         pa.array([getattr(x, "season", None) for x in documents],
+                  pa.int64()),
+         pa.array([getattr(x, "episode", None) for x in documents],
+                  pa.int64()),
+         pa.array([getattr(x, "episode_name", None) for x in documents],
+                  pa.string()),
+         pa.array([x.fingerprint for x in documents], pa.string())],
+        schema=SCHEMA)
+
+
+def to_table(documents: tp.Iterable[medias.VideoMedia],
+             batch_size: int = BATCH_SIZE) \
+    -> pa.Table:
+    """
+    Converts media documents of any type into a columnar table, e.g.
+    to load them into a dataframe with to_pandas().
+    Args:
+        documents: the media documents.
+        batch_size: the number of documents per record batch.
+    Returns: the table.
+    """
+    return pa.Table.from_batches(_batches(documents, batch_size),
+                                 schema=SCHEMA)
+
+
+def from_table(table: tp.Union[pa.Table, pa.RecordBatch],
+               validate: bool = False) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Converts a columnar table back into media documents.
+    Args:
+        table: the table, with the SCHEMA columns, the optional ones
+            possibly missing, e.g. in files written by older versions.
+        validate: whether to validate the documents, rather than
+            trusting them as written by write().
+    Returns: the media documents.
+    Raises:
+        ValueError if validating and a document is not valid.
+    """
+    names = [x for x in SCHEMA.names if x in table.column_names]
+    columns = [_decode(table.column(x)) for x in names]
+    with medias.gc_paused():
+        records = [dict(zip(names, x)) for x in zip(*columns)]
+    if validate:
+        return bulk.MEDIA_LIST.validate_python(
+                    [{key: value for key, value in x.items()
+                      if value is not None} for x in records])
+    return medias.load_many(records)
+
+
+def _batches(documents: tp.Iterable[medias.VideoMedia],
+             batch_size: int) \
+    -> tp.Iterator[pa.RecordBatch]:
+    """
+    Converts media documents into record batches lazily.
+    Args:
+        documents: the media documents.
+        batch_size: the number of documents per record batch.
+    Returns: an iterator over the record batches.
+    """
+    documents = iter(documents)
+    while True:
+        chunk = list(itertools.islice(documents, batch_size))
+        if not chunk:
+            return
+        yield to_batch(chunk)
+
+
+def write(documents: tp.Iterable[medias.VideoMedia],
+          file: tp.Union[str, path.Path],
+          fmt: str = "parquet",
+          batch_size: int = BATCH_SIZE) \
+    -> int:
+    """
+    Writes media documents of any type into a columnar file, by record
+    batches, such that arbitrary many documents are written in bounded
+    memory.
+    Args:
+        documents: the media documents.
+        file: the file to write.
+        fmt: the file format, one of FORMATS, Parquet or Arrow IPC.
+        batch_size: the number of documents per record batch.
+    Returns: the number of documents written.
+    Raises:
+        ValueError if the format is not supported.
+    """
+    if fmt == "parquet":
+        writer = parquet.ParquetWriter(file, SCHEMA, compression=COMPRESSION)
+    elif fmt == "arrow":
+        writer = ipc.new_file(file, SCHEMA,
+                              options=ipc.IpcWriteOptions(
+                                        compression=COMPRESSION))
+    else:
+        raise ValueError(f"format is not supported ({fmt})")
+    count = 0
+    with writer:
+        for batch in _batches(documents, batch_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def read_table(file: tp.Union[str, path.Path]) \
+    -> pa.Table:
+    """
+    Reads a columnar file, its format being recognized from its content.
+    Args:
+        file: the Parquet or Arrow IPC file.
+    Returns: the table.
+    """
+    with open(file, "rb") as stream:
+        magic = stream.read(6)
+    if magic == b"ARROW1":
+        with ipc.open_file(file) as reader:
+            return reader.read_all()
+    return parquet.read_table(file)
+
+
+def read(file: tp.Union[str, path.Path],
+         validate: bool = False) \
+    -> tp.List[medias.VideoMedia]:
+    """
+    Reads media documents from a columnar file.
+    Args:
+        file: the Parquet or Arrow IPC file.
+        validate: whether to validate the documents, rather than
+            trusting them as written by write().
+    Returns: the media documents.
+    Raises:
+        ValueError if validating and a document is not valid.
+    """
+    return from_table(read_table(file), validate=validate)
@@ -0,0 +1,120 @@
+import os
+import sys
+import array
+import typing as tp
+
+
+"""the identifier of the empty directory, the root of all directories"""
+ROOT = 0
+
+
+def split(directory: str) \
+    -> tp.List[str]:
+    """
+    Splits a directory path into its components, the leading / of an
+    absolute path being a component.
+    Args:
+        directory: the directory path, e.g. as given by os.path.split.
+    Returns: the components, none for the empty path.
+    """
+    components = [x for x in directory.split("/") if x]
+    if directory.startswith("/"):
+        components.insert(0, "/")
+    return components
+
+
+class Directories:
+    """
+    A trie of directories, each directory being stored once as the
+    identifier of its parent and its name, the names being interned,
+    such that the many files sharing a directory prefix, e.g. the
+    episodes of a serie under /media/series/<title>/Season <n>/, store
+    their path as a directory identifier and a file name. The files
+    under a directory are then those of the directories of its subtree.
+    """
+
+    def __init__(self):
+        """the identifier of the parent of each directory"""
+        self.parents = array.array("I", [ROOT])
+        """the name of each directory"""
+        self.names: tp.List[str] = [""]
+        """the identifier of the children of each directory having some,
+        by name"""
+        self.children: tp.Dict[int, tp.Dict[str, int]] = {}
+        """the path of the directories built so far, by identifier"""
+        self._paths: tp.Dict[int, str] = {ROOT: ""}
+
+    def __len__(self) \
+        -> int:
+        """
+        Returns: the number of directories, including the empty one.
+        """
+        return len(self.names)
+
+    def __getitem__(self, identifier: int) \
+        -> str:
+        """
+        Gives the path of a directory.
+        Args:
+            identifier: the directory identifier.
+        Returns: the path.
+        """
+        directory = self._paths.get(identifier)
+        if directory is None:
+            directory = os.path.join(self[self.parents[identifier]],
+                                     self.names[identifier])
+            self._paths[identifier] = directory
+        return directory
+
+    def add(self, directory: str) \
+        -> int:
+        """
+        Adds a directory and its parents, if not already known.
+        Args:
+            directory: the directory path.
+        Returns: the directory identifier.
+        """
+        identifier = ROOT
+        for name in map(sys.intern, split(directory)):
+            children = self.children.get(identifier)
+            if children is None:
+                children = self.children[identifier] = {}
+            child = children.get(name)
+            if child is None:
+                child = children[name] = len(self.names)
+                self.parents.append(identifier)
+                self.names.append(name)
+            identifier = child
+        return identifier
+
+    def get(self, directory: str) \
+        -> tp.Optional[int]:
+        """
+        Gives the identifier of a directory.
+        Args:
+            directory: the directory path.
+        Returns: the directory identifier, None if not known.
+        """
+        identifier = ROOT
+        for name in split(directory):
+            identifier = self.children.get(identifier, {}).get(name)
+            if identifier is None:
+                return None
+        return identifier
+
+    def subtree(self, identifier: int) \
+        -> tp.Set[int]:
+        """
+        Gives the directories under a directory.
+        Args:
+            identifier: the directory identifier.
+        Returns: the identifiers of the directory and all its
+            descendants.
+        """
+        subtree = {identifier}
+        pending = [identifier]
+        while pending:
+            children = self.children.get(pending.pop(), {}).values()
+            subtree.update(children)
+            pending.extend(children)
+        return subtree
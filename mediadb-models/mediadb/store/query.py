@@ -0,0 +1,253 @@
+import typing as tp
+import mediadb.models.constants as const
+import mediadb.models.languages as languages
+
+
+"""the comparison operators, with their SQL counterpart"""
+OPERATORS = {"==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">",
+             ">=": ">=", "in": "IN"}
+
+
+class Condition(tp.NamedTuple):
+    """
+    A condition on a document field.
+    """
+
+    """the field name"""
+    field: str
+    """the comparison operator, one of OPERATORS"""
+    operator: str
+    """the value to compare to, a tuple for the in operator"""
+    value: tp.Any
+
+    def to_sql(self) \
+        -> tp.Tuple[str, tp.List[tp.Any]]:
+        """
+        Compiles the condition into SQL.
+        Returns: the SQL expression and its parameters.
+        """
+        if self.operator == "in":
+            marks = ", ".join("?" for _ in self.value)
+            return f"{self.field} IN ({marks})", list(self.value)
+        if self.value is None:
+            operator = "IS" if self.operator == "==" else "IS NOT"
+            return f"{self.field} {operator} NULL", []
+        return f"{self.field} {OPERATORS[self.operator]} ?", [self.value]
+
+
+class Field:
+    """
+    A queryable document field. Comparing a field to a value gives a
+    Condition, the value being converted to the field type first such
+    that invalid values are rejected before querying.
+    """
+
+    def __init__(self,
+                 name: str,
+                 kind: tp.Callable[[tp.Any], tp.Any],
+                 optional: bool = False):
+        """
+        Args:
+            name: the field name.
+            kind: converts values to the field type.
+            optional: whether the field accepts None.
+        """
+        """the field name"""
+        self.name = name
+        """converts values to the field type"""
+        self.kind = kind
+        """whether the field accepts None"""
+        self.optional = optional
+
+    def convert(self, value: tp.Any) \
+        -> tp.Any:
+        """
+        Converts a value to its SQL representation.
+        Args:
+            value: the value.
+        Returns: the converted value, enumerations being given by value.
+        Raises:
+            ValueError if the value is not valid for the field.
+        """
+        if value is None:
+            if not self.optional:
+                raise ValueError(f"{self.name} cannot be None")
+            return None
+        value = self.kind(value)
+        return value.value if isinstance(value, const.StrEnum) else value
+
+    def condition(self, operator: str, value: tp.Any) \
+        -> Condition:
+        """
+        Builds a condition on the field.
+        Args:
+            operator: the comparison operator, one of OPERATORS.
+            value: the value to compare to, an iterable of values for the
+                in operator.
+        Returns: the condition.
+        Raises:
+            ValueError if the operator or the value is not valid.
+        """
+        if operator not in OPERATORS:
+            raise ValueError(f"operator is not supported ({operator})")
+        if operator == "in":
+            return Condition(self.name, operator,
+                             tuple(self.convert(x) for x in value))
+        value = self.convert(value)
+        if value is None and operator not in ("==", "!="):
+            raise ValueError(f"{self.name} cannot be compared to None")
+        return Condition(self.name, operator, value)
+
+    def __eq__(self, value: tp.Any) -> Condition:
+        return self.condition("==", value)
+
+    def __ne__(self, value: tp.Any) -> Condition:
+        return self.condition("!=", value)
+
+    def __lt__(self, value: tp.Any) -> Condition:
+        return self.condition("<", value)
+
+    def __le__(self, value: tp.Any) -> Condition:
+        return self.condition("<=", value)
+
+    def __gt__(self, value: tp.Any) -> Condition:
+        return self.condition(">", value)
+
+    def __ge__(self, value: tp.Any) -> Condition:
+        return self.condition(">=", value)
+
+    def in_(self, values: tp.Iterable[tp.Any]) \
+        -> Condition:
+        """
+        Builds a condition matching any of the given values.
+        Args:
+            values: the values.
+        Returns: the condition.
+        """
+        return self.condition("in", values)
+
+
+"""the queryable fields"""
+TITLE = Field("title", str)
+LANGUAGE = Field("language", languages.parse)
+SUBTITLES = Field("subtitles", languages.parse, optional=True)
+TYPE = Field("type", const.VideoType)
+SEASON = Field("season", int, optional=True)
+EPISODE = Field("episode", int, optional=True)
+FIELDS = {x.name: x for x in (TITLE, LANGUAGE, SUBTITLES, TYPE, SEASON,
+                              EPISODE)}
+
+
+class Query:
+    """
+    A query over media documents, the conjunction of conditions on
+    their fields. Queries are immutable, each method returning a new
+    query. Queries are compiled into SQL such that the filtering is done
+    by the catalogue, using its indexes.
+
+    Example:
+        Query(type=VideoType.SERIE,
+              title="Generation Kill",
+              language=Language.FRENCH).filter(SEASON >= 3)
+    """
+
+    def __init__(self, **equals: tp.Any):
+        """
+        Args:
+            equals: the values the fields must be equal to, per field
+                name.
+        Raises:
+            ValueError if a field or value is not valid.
+        """
+        """the conditions"""
+        self.conditions: tp.Tuple[Condition, ...] = ()
+        """the fields to sort on"""
+        self.order: tp.Tuple[str, ...] = ()
+        """the maximum number of documents"""
+        self.max_count: tp.Optional[int] = None
+        self.conditions = self._equals(equals)
+
+    @staticmethod
+    def _equals(equals: tp.Dict[str, tp.Any]) \
+        -> tp.Tuple[Condition, ...]:
+        """
+        Builds equality conditions.
+        Args:
+            equals: the values, per field name.
+        Returns: the conditions.
+        Raises:
+            ValueError if a field or value is not valid.
+        """
+        unknown = set(equals) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"fields cannot be queried "
+                             f"({', '.join(sorted(unknown))})")
+        return tuple(FIELDS[key] == value for key, value in equals.items())
+
+    def _copy(self, **attributes: tp.Any) \
+        -> "Query":
+        """
+        Returns: a copy of the query, with some attributes replaced.
+        """
+        query = Query()
+        query.__dict__.update(self.__dict__, **attributes)
+        return query
+
+    def filter(self, *conditions: Condition, **equals: tp.Any) \
+        -> "Query":
+        """
+        Adds conditions to the query.
+        Args:
+            conditions: conditions built from the fields, e.g. SEASON >= 3.
+            equals: the values the fields must be equal to, per field
+                name.
+        Returns: the new query.
+        Raises:
+            ValueError if a field or value is not valid.
+        """
+        return self._copy(conditions=self.conditions + conditions +
+                                     self._equals(equals))
+
+    def order_by(self, *fields: Field) \
+        -> "Query":
+        """
+        Sorts the documents.
+        Args:
+            fields: the fields to sort on, in order.
+        Returns: the new query.
+        """
+        return self._copy(order=self.order + tuple(x.name for x in fields))
+
+    def limit(self, count: tp.Optional[int]) \
+        -> "Query":
+        """
+        Limits the number of documents.
+        Args:
+            count: the maximum number of documents, None for no limit.
+        Returns: the new query.
+        """
+        return self._copy(max_count=count)
+
+    def to_sql(self, select: str) \
+        -> tp.Tuple[str, tp.List[tp.Any]]:
+        """
+        Compiles the query into SQL.
+        Args:
+            select: the SELECT ... FROM ... part of the statement.
+        Returns: the statement and its parameters.
+        """
+        clauses = []
+        params = []
+        for condition in self.conditions:
+            clause, values = condition.to_sql()
+            clauses.append(clause)
+            params.extend(values)
+        sql = select
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        if self.order:
+            sql += f" ORDER BY {', '.join(self.order)}"
+        if self.max_count is not None:
+            sql += " LIMIT ?"
+            params.append(self.max_count)
+        return sql, params
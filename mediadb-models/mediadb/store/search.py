@@ -0,0 +1,256 @@
+import re
+import sqlite3
+import difflib
+import unicodedata
+import typing as tp
+
+
+"""the maximum edit distance of a typo, per word length"""
+MAX_DISTANCES = ((8, 2), (4, 1), (0, 0))
+
+"""matches the characters separating words"""
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) \
+    -> str:
+    """
+    Normalizes a text the way the catalogue full-text index does, by
+    removing diacritics and case and replacing punctuation by spaces.
+    Args:
+        text: the text.
+    Returns: the normalized text.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(x for x in text if not unicodedata.combining(x))
+    return " ".join(x for x in _SEPARATORS.split(text.casefold()) if x)
+
+
+def tokens(text: str) \
+    -> tp.List[str]:
+    """
+    Splits a text into normalized words.
+    Args:
+        text: the text.
+    Returns: the words.
+    """
+    return normalize(text).split()
+
+
+def max_distance(word: str) \
+    -> int:
+    """
+    Gives the number of typos tolerated in a word, which depends on its
+    length such that short words are not matched to unrelated ones.
+    Args:
+        word: the word.
+    Returns: the maximum edit distance.
+    """
+    for length, distance in MAX_DISTANCES:
+        if len(word) >= length:
+            return distance
+    return 0
+
+
+def deletes(word: str, distance: int) \
+    -> tp.Set[str]:
+    """
+    Gives all the strings obtained by deleting up to a given number of
+    characters from a word.
+    Args:
+        word: the word.
+        distance: the maximum number of deletions.
+    Returns: the strings, including the word itself.
+    """
+    results = {word}
+    edges = {word}
+    for _ in range(distance):
+        edges = {x[:i] + x[i + 1:] for x in edges for i in range(len(x))}
+        results |= edges
+    return results
+
+
+def edit_distance(a: str, b: str) \
+    -> int:
+    """
+    Computes the optimal string alignment distance between two words,
+    i.e. the number of insertions, deletions, substitutions and
+    transpositions of adjacent characters turning one into the other.
+    Args:
+        a: the first word.
+        b: the second word.
+    Returns: the distance.
+    """
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1,
+                             current[j - 1] + 1,
+                             previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and \
+                a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class Vocabulary:
+    """
+    The words of the catalogue full-text index, with a typo tolerant
+    lookup. Each word is stored under all the strings obtained by
+    deleting some of its characters (symmetric delete spelling
+    correction), such that the words close to a misspelled one are
+    found with a few index lookups rather than by comparing it to the
+    whole vocabulary. The vocabulary is persisted in the catalogue
+    database. Small changes are applied as documents are added while
+    bulk changes are only recorded, the vocabulary being synchronized
+    with the full-text index, for the words that changed only, at the
+    next lookup.
+    """
+
+    """the statements creating the vocabulary schema"""
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS search_words ("
+        "word TEXT PRIMARY KEY) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS search_deletes ("
+        "key TEXT, word TEXT, PRIMARY KEY (key, word)) WITHOUT ROWID",
+        # the number of bulk changes recorded and synchronized
+        "CREATE TABLE IF NOT EXISTS search_state ("
+        "changes INTEGER NOT NULL, synced INTEGER NOT NULL)",
+        "INSERT INTO search_state SELECT 0, 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM search_state)",
+    )
+
+    def __init__(self,
+                 connection: sqlite3.Connection,
+                 index_words: str):
+        """
+        Creates the vocabulary tables if needed. The statements are not
+        committed, such that this is part of the caller transaction.
+        Args:
+            connection: the catalogue database connection.
+            index_words: a query selecting the words of the full-text
+                index.
+        """
+        """the catalogue database connection"""
+        self.connection = connection
+        """a query selecting the words of the full-text index"""
+        self.index_words = index_words
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    def is_synced(self) \
+        -> bool:
+        """
+        Returns: whether the vocabulary matches the full-text index.
+        """
+        changes, synced = self.connection.execute(
+                            "SELECT changes, synced FROM search_state"
+                            ).fetchone()
+        return changes == synced
+
+    def touch(self) \
+        -> None:
+        """
+        Records that the full-text index changed in bulk.
+        """
+        self.connection.execute("UPDATE search_state "
+                                "SET changes = changes + 1")
+
+    def add(self, words: tp.Iterable[str]) \
+        -> None:
+        """
+        Adds words, the words already known being ignored.
+        Args:
+            words: the words.
+        """
+        for word in set(words):
+            cursor = self.connection.execute(
+                        "INSERT OR IGNORE INTO search_words VALUES (?)",
+                        (word,))
+            if cursor.rowcount > 0:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO search_deletes VALUES (?, ?)",
+                    ((key, word) for key in deletes(word,
+                                                    max_distance(word))))
+
+    def remove(self, words: tp.Iterable[str]) \
+        -> None:
+        """
+        Removes words.
+        Args:
+            words: the words.
+        """
+        for word in set(words):
+            self.connection.execute("DELETE FROM search_words WHERE word = ?",
+                                    (word,))
+            self.connection.executemany(
+                "DELETE FROM search_deletes WHERE key = ? AND word = ?",
+                ((key, word) for key in deletes(word, max_distance(word))))
+
+    def sync(self) \
+        -> None:
+        """
+        Synchronizes the vocabulary with the full-text index, if bulk
+        changes were recorded, in its own transaction.
+        """
+        if self.is_synced():
+            return
+        with self.connection:
+            known = {x for (x,) in self.connection.execute(
+                        "SELECT word FROM search_words")}
+            words = {x for (x,) in self.connection.execute(self.index_words)}
+            self.remove(known - words)
+            self.add(words - known)
+            self.connection.execute("UPDATE search_state SET synced = changes")
+
+    def lookup(self, word: str) \
+        -> tp.List[tp.Tuple[str, int]]:
+        """
+        Finds the words close to a given one, synchronizing the
+        vocabulary first if needed.
+        Args:
+            word: the (normalized) word, possibly misspelled.
+        Returns: the (word, edit distance) pairs, closest first.
+        """
+        self.sync()
+        distance = max_distance(word)
+        keys = list(deletes(word, distance))
+        candidates = self.connection.execute(
+                        f"SELECT DISTINCT word FROM search_deletes "
+                        f"WHERE key IN ({', '.join('?' for _ in keys)})",
+                        keys)
+        matches = [(x, edit_distance(word, x)) for (x,) in candidates]
+        return sorted([x for x in matches
+                       if x[1] <= max(distance, max_distance(x[0]))],
+                      key=lambda x: (x[1], x[0]))
+
+
+def expression(alternatives: tp.List[tp.List[str]], operator: str) \
+    -> str:
+    """
+    Builds an FTS5 full-text query.
+    Args:
+        alternatives: the words that may match each query word.
+        operator: how to combine the query words, AND or OR.
+    Returns: the query expression, words being quoted.
+    """
+    groups = [" OR ".join(f'"{x}"' for x in words) for words in alternatives]
+    return f" {operator} ".join(f"({x})" for x in groups)
+
+
+def similarity(query: str, text: tp.Optional[str]) \
+    -> float:
+    """
+    Scores how close a text is to a query.
+    Args:
+        query: the normalized query.
+        text: the text.
+    Returns: the score, between 0 and 1.
+    """
+    if not text:
+        return 0.
+    return difflib.SequenceMatcher(None, query, normalize(text)).ratio()
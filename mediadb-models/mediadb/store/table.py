@@ -0,0 +1,381 @@
+import os
+import array
+import operator
+import itertools
+import typing as tp
+import mediadb.models.constants as const
+import mediadb.models.medias as medias
+import mediadb.store.paths as paths
+import mediadb.store.query as query
+
+
+"""the code of missing enumeration values"""
+NULL_CODE = 255
+
+"""the Python counterpart of each comparison operator"""
+_OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt,
+              "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+class _Strings:
+    """
+    A column of strings packed into a single UTF-8 buffer, with the end
+    offset of each string, such that a string costs its length and an
+    offset rather than a Python object.
+    """
+
+    def __init__(self):
+        """the UTF-8 encoded strings, one after the other"""
+        self.data = bytearray()
+        """the end offset of each string in data, after a leading 0"""
+        self.offsets = array.array("I", [0])
+
+    def __len__(self) \
+        -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) \
+        -> str:
+        return self.data[self.offsets[index]:
+                         self.offsets[index + 1]].decode()
+
+    def append(self, value: str) \
+        -> None:
+        self.data += value.encode()
+        self.offsets.append(len(self.data))
+
+
+class _Interned:
+    """
+    A column of values stored once each, the rows holding the index of
+    their value. The index of the distinct values is only needed to add
+    rows, such that it can be released once they are added.
+    """
+
+    def __init__(self, typecode: str = "I"):
+        """
+        Args:
+            typecode: the array type code of the indexes.
+        """
+        """the index of the value of each row"""
+        self.codes = bytearray() if typecode == "B" else \
+                     array.array(typecode)
+        """the distinct values"""
+        self.values: tp.List[tp.Any] = []
+        """the index of each distinct value, None if released"""
+        self.index: tp.Optional[tp.Dict[tp.Any, int]] = {}
+
+    def __getitem__(self, row: int) \
+        -> tp.Any:
+        return self.values[self.codes[row]]
+
+    def append(self, value: tp.Any) \
+        -> None:
+        if self.index is None:
+            self.index = {x: i for i, x in enumerate(self.values)}
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def compact(self) \
+        -> None:
+        """
+        Releases the index of the distinct values, which is rebuilt at
+        the next row added.
+        """
+        self.index = None
+
+
+class _Enumeration(_Interned):
+    """
+    A column of enumeration values, stored as one byte codes, the code
+    of a value being its position in the enumeration and NULL_CODE for
+    None.
+    """
+
+    def __init__(self, enum: tp.Type[const.StrEnum]):
+        """
+        Args:
+            enum: the enumeration.
+        """
+        super().__init__("B")
+        self.values = [x.value for x in enum]
+        self.index = {x: i for i, x in enumerate(enum)}
+        self.values += [None] * (NULL_CODE - len(self.values)) + [None]
+        self.index[None] = NULL_CODE
+
+    def compact(self) \
+        -> None:
+        # the index of the enumeration values is small and fixed
+        pass
+
+
+class _Directories:
+    """
+    A column of directories, stored in a trie, the rows holding the
+    identifier of their directory.
+    """
+
+    def __init__(self):
+        """the identifier of the directory of each row"""
+        self.codes = array.array("I")
+        """the directories"""
+        self.trie = paths.Directories()
+        """the last directory added and its identifier, as the files of a
+        directory are usually added one after the other"""
+        self._last: tp.Tuple[tp.Optional[str], int] = (None, paths.ROOT)
+
+    def __getitem__(self, row: int) \
+        -> str:
+        return self.trie[self.codes[row]]
+
+    def append(self, directory: str) \
+        -> None:
+        last, identifier = self._last
+        if directory != last:
+            identifier = self.trie.add(directory)
+            self._last = (directory, identifier)
+        self.codes.append(identifier)
+
+
+class _Numbers:
+    """
+    A column of positive numbers, 0 standing for None, stored on 32 bits
+    until a number needs 64, as in the catalogue.
+    """
+
+    def __init__(self):
+        """the numbers"""
+        self.codes = array.array("I")
+
+    def __getitem__(self, row: int) \
+        -> tp.Optional[int]:
+        return self.codes[row] or None
+
+    def append(self, value: tp.Optional[int]) \
+        -> None:
+        try:
+            self.codes.append(value or 0)
+        except OverflowError:
+            if self.codes.typecode == "Q":
+                raise
+            self.codes = array.array("Q", self.codes)
+            self.codes.append(value)
+
+
+def _matches(value: tp.Any, condition: query.Condition) \
+    -> bool:
+    """
+    Evaluates a condition on a value, None comparing as SQL NULL does.
+    Args:
+        value: the value, enumerations being given by value.
+        condition: the condition.
+    Returns: whether the value satisfies the condition.
+    """
+    if condition.operator == "in":
+        return value is not None and value in condition.value
+    if condition.value is None:
+        return (value is None) == (condition.operator == "==")
+    if value is None:
+        return False
+    return _OPERATORS[condition.operator](value, condition.value)
+
+
+class MediaTable:
+    """
+    An in-memory collection of media documents of any type, stored by
+    columns in typed arrays rather than as one model instance per
+    document: enumerations as one byte codes, season and episode
+    numbers as integer arrays, titles interned, file directories in a
+    trie and file names, episode names and fingerprints packed into UTF-8
+    buffers. Documents are built on access only. Queries are evaluated
+    once per distinct value of a column and applied to all the rows at
+    once as byte masks, e.g.
+
+        table.find(Query(type=VideoType.SERIE).filter(SEASON >= 3))
+    """
+
+    def __init__(self, documents: tp.Iterable[medias.VideoMedia] = ()):
+        """
+        Args:
+            documents: the initial media documents.
+        """
+        self._type = _Enumeration(const.VideoType)
+        self._title = _Interned()
+        self._language = _Enumeration(const.Language)
+        self._subtitles = _Enumeration(const.Language)
+        self._directory = _Directories()
+        self._name = _Strings()
+        self._season = _Numbers()
+        self._episode = _Numbers()
+        self._episode_name = _Strings()
+        self._fingerprint = _Strings()
+        """the queryable columns, by field name"""
+        self._columns = {"type": self._type,
+                         "title": self._title,
+                         "language": self._language,
+                         "subtitles": self._subtitles,
+                         "season": self._season,
+                         "episode": self._episode}
+        self.extend(documents)
+
+    def __len__(self) \
+        -> int:
+        """
+        Returns: the number of documents.
+        """
+        return len(self._name)
+
+    def __getitem__(self, index: int) \
+        -> medias.VideoMedia:
+        """
+        Builds a document.
+        Args:
+            index: the document index, negative from the end.
+        Returns: the media document.
+        Raises:
+            IndexError if there is no such document.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"document index out of range ({index})")
+        model = medias.MEDIA_CLASSES[const.VideoType(self._type[index])]
+        return model.from_trusted(
+                {"title": self._title[index],
+                 "language": self._language[index],
+                 "subtitles": self._subtitles[index],
+                 "file": os.path.join(self._directory[index],
+                                      self._name[index]),
+                 "season": self._season[index],
+                 "episode": self._episode[index],
+                 "episode_name": self._episode_name[index] or None,
+                 "fingerprint": self._fingerprint[index] or None})
+
+    def __iter__(self) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Returns: an iterator over the documents, in insertion order.
+        """
+        return map(self.__getitem__, range(len(self)))
+
+    def append(self, document: medias.VideoMedia) \
+        -> None:
+        """
+        Adds a document.
+        Args:
+            document: the media document.
+        """
+        directory, name = os.path.split(str(document.file))
+        self._type.append(document.type)
+        self._title.append(document.title)
+        self._language.append(document.language)
+        self._subtitles.append(document.subtitles)
+        self._directory.append(directory)
+        self._name.append(name)
+        self._season.append(getattr(document, "season", None))
+        self._episode.append(getattr(document, "episode", None))
+        # episode names and fingerprints cannot be empty, which stands for
+        # None
+        self._episode_name.append(getattr(document, "episode_name", None)
+                                  or "")
+        self._fingerprint.append(document.fingerprint or "")
+
+    def extend(self, documents: tp.Iterable[medias.VideoMedia]) \
+        -> None:
+        """
+        Adds documents, the memory only needed to add documents being
+        released afterwards. Adding many documents at once is thus
+        cheaper than adding them one by one.
+        Args:
+            documents: the media documents.
+        """
+        for document in documents:
+            self.append(document)
+        self._title.compact()
+
+    def _mask(self, condition: query.Condition) \
+        -> bytes:
+        """
+        Evaluates a condition on all the rows, once per distinct value.
+        Args:
+            condition: the condition.
+        Returns: one byte per row, 1 if the row satisfies the condition.
+        """
+        column = self._columns[condition.field]
+        if isinstance(column, _Numbers):
+            keep = {x for x in set(column.codes)
+                    if _matches(x or None, condition)}
+        else:
+            keep = {x for x in set(column.codes)
+                    if _matches(column.values[x], condition)}
+        if isinstance(column.codes, bytearray):
+            return column.codes.translate(bytes(x in keep
+                                                for x in range(256)))
+        return bytes(map(keep.__contains__, column.codes))
+
+    def indices(self, q: query.Query) \
+        -> tp.List[int]:
+        """
+        Finds the documents matching a query.
+        Args:
+            q: the query.
+        Returns: the indices of the documents, in the query order, if
+            any, else in insertion order.
+        """
+        rows = range(len(self))
+        if q.conditions:
+            mask = -1
+            for condition in q.conditions:
+                mask &= int.from_bytes(self._mask(condition), "little")
+            rows = itertools.compress(rows,
+                                      mask.to_bytes(len(self), "little"))
+        rows = list(rows)
+        if q.order:
+            columns = [self._columns[x] for x in q.order]
+            # None first, as SQLite sorts NULL
+            rows.sort(key=lambda i: tuple((x[i] is not None, x[i])
+                                          for x in columns))
+        if q.max_count is not None:
+            del rows[q.max_count:]
+        return rows
+
+    def find(self, q: query.Query) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Finds the documents matching a query.
+        Args:
+            q: the query.
+        Returns: an iterator over the documents, built lazily.
+        """
+        return map(self.__getitem__, self.indices(q))
+
+    def count(self, q: query.Query) \
+        -> int:
+        """
+        Counts the documents matching a query.
+        Args:
+            q: the query.
+        Returns: the number of documents.
+        """
+        return len(self.indices(q.limit(None)))
+
+    def under(self, directory: tp.Union[str, os.PathLike]) \
+        -> tp.Iterator[medias.VideoMedia]:
+        """
+        Finds the documents of the files under a directory, looking up
+        the directory subtree rather than comparing the paths.
+        Args:
+            directory: the directory path.
+        Returns: an iterator over the documents, in insertion order.
+        """
+        identifier = self._directory.trie.get(os.fspath(directory))
+        if identifier is None:
+            return iter(())
+        subtree = self._directory.trie.subtree(identifier)
+        rows = itertools.compress(range(len(self)),
+                                  map(subtree.__contains__,
+                                      self._directory.codes))
+        return map(self.__getitem__, rows)
@@ -0,0 +1,172 @@
+import io
+import pytest
+import mediadb.models.bulk as bulk
+import mediadb.models.ingest as ingest
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def documents():
+    """
+    Returns: a list of media documents of all types.
+    """
+    return [medias.Movie(title="Alien",
+                         language=const.Language.ENGLISH,
+                         subtitles=const.Language.FRENCH,
+                         file="/movies/alien.mkv"),
+            medias.Documentary(title="Bowling for Columbine",
+                               file="/docs/bowling.mkv"),
+            medias.Serie(title="Generation Kill",
+                         season=1,
+                         episode=3,
+                         episode_name="Screwby",
+                         file="/series/gk.s01e03.mkv")]
+
+
+class TestJson:
+    """
+    A test suite for mediadb.models.bulk.load_json and dump_json
+    """
+
+    def test_round_trip(self, documents):
+        """
+        Tests serializing and validating documents of mixed types.
+        Expected to give back the same documents.
+        """
+        data = bulk.dump_json(documents)
+        assert(data == b"[" + b",".join(x.model_dump_json().encode()
+                                        for x in documents) + b"]")
+        assert(bulk.load_json(data) == documents)
+        assert(bulk.load_json(data.decode()) == documents)
+        assert(bulk.load_json(b"[]") == [])
+
+    def test_invalid(self):
+        """
+        Tests validating arrays with an invalid document or that are not
+        arrays.
+        Expected to raise ValueError.
+        """
+        for data in (b'[{"title": "", "type": "movie", "file": "/a.mkv"}]',
+                     b'[{"title": "Alien", "file": "/a.mkv"}]',
+                     b'{"title": "Alien", "type": "movie", "file": "/a.mkv"}',
+                     b'[{"title": "Alien"'):
+            with pytest.raises(ValueError):
+                bulk.load_json(data)
+
+
+class TestJsonl:
+    """
+    A test suite for mediadb.models.bulk.load_jsonl and dump_jsonl
+    """
+
+    def test_round_trip(self, documents):
+        """
+        Tests writing and reading documents of mixed types by chunks.
+        Expected to give back the same documents, in chunks of the given
+        size.
+        """
+        stream = io.BytesIO()
+        assert(bulk.dump_jsonl(documents, stream, chunk_size=2) == 3)
+        assert(stream.getvalue() ==
+               b"".join(x.model_dump_json().encode() + b"\n"
+                        for x in documents))
+        stream.seek(0)
+        chunks = list(bulk.load_jsonl(stream, chunk_size=2))
+        assert([len(x) for x in chunks] == [2, 1])
+        assert(chunks[0] + chunks[1] == documents)
+        assert(list(bulk.load_jsonl(io.BytesIO())) == [])
+
+    def test_text(self, documents):
+        """
+        Tests reading text lines, with blank lines.
+        Expected to skip the blank lines.
+        """
+        lines = [x.model_dump_json() + "\n" for x in documents]
+        lines.insert(1, "\n")
+        assert(list(bulk.load_jsonl(lines)) == [documents])
+
+    def test_invalid(self):
+        """
+        Tests reading invalid lines.
+        Expected to raise ValueError naming the line.
+        """
+        valid = '{"title": "Alien", "type": "movie", "file": "/a.mkv"}'
+        for invalid in ('{"title": "", "type": "movie", "file": "/a.mkv"}',
+                        '["movie"]',
+                        '{"title": "Alien"'):
+            with pytest.raises(ValueError, match="line 3"):
+                list(bulk.load_jsonl([valid, "", invalid, valid]))
+
+    def test_several_values(self):
+        """
+        Tests reading lines holding several documents or part of one,
+        followed by an invalid line.
+        Expected to raise ValueError naming the first of them.
+        """
+        valid = '{"title": "Alien", "type": "movie", "file": "/a.mkv"}'
+        invalid = '{"title": "", "type": "movie", "file": "/a.mkv"}'
+        with pytest.raises(ValueError, match="line 2"):
+            list(bulk.load_jsonl([valid, f"{valid},{valid}", invalid]))
+        with pytest.raises(ValueError, match="line 2"):
+            list(bulk.load_jsonl([valid, valid[:-1], '"a": 1}', valid]))
+
+
+class TestValidateFile:
+    """
+    A test suite for mediadb.models.bulk.validate_file
+    """
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_validate(self, documents, tmp_path, processes):
+        """
+        Tests validating a file of documents, some of them invalid, in
+        small shards.
+        Expected to give the same rejects as ingest.validate, with their
+        line numbers in the file.
+        """
+        lines = [x.model_dump_json() for x in documents] * 20
+        lines[5] = '{"title": "", "type": "movie", "file": "/a.mkv"}'
+        lines[17] = ""
+        lines[30] = '{"title": "Alien"'
+        lines[31] = '["movie"]'
+        lines[59] = '{"title": "Alien", "type": "serie", "file": "/a.mkv"}'
+        file = tmp_path / "dump.jsonl"
+        file.write_text("\n".join(lines))
+        reports = list(bulk.validate_file(file, processes, shard_size=200))
+        assert(len(reports) > 10)
+        rejects = [x for report in reports for x in report.rejects]
+        expected = [x for x in ingest.validate(ingest.read_jsonl(lines))
+                    if isinstance(x, ingest.Reject)]
+        assert(rejects == expected)
+        assert([x.line for x in rejects] == [6, 31, 32, 60])
+        assert(sum(x.valid for x in reports) == 55)
+
+    def test_several_values(self, documents, tmp_path):
+        """
+        Tests validating a file with a line holding several documents,
+        followed by an invalid line, in a single chunk.
+        Expected to reject both lines, with their line numbers.
+        """
+        lines = [x.model_dump_json() for x in documents]
+        lines[1] = f"{lines[0]},{lines[1]}"
+        lines[2] = '{"title": "", "type": "movie", "file": "/a.mkv"}'
+        lines.append(documents[0].model_dump_json())
+        file = tmp_path / "dump.jsonl"
+        file.write_text("\n".join(lines) + "\n")
+        reports = list(bulk.validate_file(file))
+        assert([x.line for x in reports[0].rejects] == [2, 3])
+        assert(reports[0].valid == 2)
+
+    def test_shards(self, tmp_path):
+        """
+        Tests splitting a file into shards.
+        Expected to split it at line ends, into shards of at least the
+        given size.
+        """
+        file = tmp_path / "dump.jsonl"
+        file.write_bytes(b"a" * 10 + b"\n" + b"b" * 5 + b"\n" + b"c" * 3)
+        assert(bulk.shards(file, 4) == [(0, 11), (11, 17), (17, 20)])
+        assert(bulk.shards(file, 100) == [(0, 20)])
+        file.write_bytes(b"")
+        assert(bulk.shards(file) == [])
@@ -8,7 +8,7 @@ class TestLanguage:
     """
     
     def test_values(self):
-        assert(len(const.Language) == 4)
+        assert(len(const.Language) == 184)
         assert(const.Language.ENGLISH == "EN")
         assert(const.Language.FRENCH == "FR")
         assert(const.Language.GERMAN == "DE")
@@ -0,0 +1,140 @@
+import pytest
+import io
+import json
+import mediadb.models.ingest as ingest
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+class TestValidateRecord:
+    """
+    A test suite for mediadb.models.ingest.validate_record
+    """
+
+    def test_dispatch(self):
+        """
+        Tests that each record is validated by the model matching its type.
+        Expected to work.
+        """
+        movie = ingest.validate_record({"title": "Alien",
+                                        "type": "movie",
+                                        "file": "/dir/alien.mkv"})
+        doc = ingest.validate_record({"title": "Bowling for Columbine",
+                                      "type": "documentary",
+                                      "file": "/dir/bowling.mkv"})
+        serie = ingest.validate_record('{"title": "Generation Kill", '
+                                       '"type": "serie", "season": 1, '
+                                       '"episode": 3, "file": "/dir/gk.mkv"}')
+        assert(isinstance(movie, medias.Movie))
+        assert(isinstance(doc, medias.Documentary))
+        assert(isinstance(serie, medias.Serie))
+        assert(serie.season == 1)
+        assert(serie.episode == 3)
+
+    def test_no_type(self):
+        """
+        Tests a record without type.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            ingest.validate_record({"title": "Alien", "file": "/dir/alien.mkv"})
+
+    def test_unknown_type(self):
+        """
+        Tests records with unknown or invalid types.
+        Expected to raise ValueError.
+        """
+        for t in ("unknown", "opera"):
+            with pytest.raises(ValueError):
+                ingest.validate_record({"title": "Alien",
+                                        "type": t,
+                                        "file": "/dir/alien.mkv"})
+
+    def test_invalid(self):
+        """
+        Tests records that are not valid documents.
+        Expected to raise ValueError.
+        """
+        for record in ('{"title": "Alien", "type": "movie"',
+                       '["movie"]',
+                       {"title": "", "type": "movie", "file": "/dir/a.mkv"},
+                       {"title": "Generation Kill", "type": "serie",
+                        "season": 0, "episode": 3, "file": "/dir/gk.mkv"}):
+            with pytest.raises(ValueError):
+                ingest.validate_record(record)
+
+
+class TestIngest:
+    """
+    A test suite for mediadb.models.ingest.ingest
+    """
+
+    def test_jsonl(self):
+        """
+        Tests that valid documents and rejects are written to separate
+        streams, with the line numbers of the rejects.
+        Expected to work.
+        """
+        stream = io.StringIO(
+            '{"title": "Alien", "type": "movie", "language": "EN", '
+            '"file": "/dir/alien.mkv"}\n'
+            '\n'
+            '{"title": "", "type": "movie", "file": "/dir/empty.mkv"}\n'
+            '{"title": "Generation Kill", "type": "serie", "season": 1, '
+            '"episode": 3, "file": "/dir/gk.mkv"}\n'
+            'not json\n')
+        valid_out = io.StringIO()
+        reject_out = io.StringIO()
+        n_valid, n_reject = ingest.ingest(stream, valid_out, reject_out)
+        assert(n_valid == 2)
+        assert(n_reject == 2)
+        valid = [json.loads(x) for x in valid_out.getvalue().splitlines()]
+        rejects = [json.loads(x) for x in reject_out.getvalue().splitlines()]
+        assert(valid[0]["title"] == "Alien")
+        assert(valid[0]["language"] == const.Language.ENGLISH)
+        assert(valid[1]["type"] == const.VideoType.SERIE)
+        assert([x["line"] for x in rejects] == [3, 5])
+        assert(rejects[1]["record"] == "not json")
+        assert(all(len(x["errors"]) > 0 for x in rejects))
+
+    def test_csv(self):
+        """
+        Tests CSV input, where empty cells fall back to the model defaults.
+        Expected to work.
+        """
+        stream = io.StringIO(
+            "type,title,language,subtitles,season,episode,file\n"
+            "movie,Alien,EN,,,,/dir/alien.mkv\n"
+            "serie,Generation Kill,,FR,1,3,/dir/gk.mkv\n"
+            "serie,Generation Kill,,FR,-1,3,/dir/gk.mkv\n")
+        valid_out = io.StringIO()
+        reject_out = io.StringIO()
+        n_valid, n_reject = ingest.ingest(stream, valid_out, reject_out,
+                                          fmt="csv")
+        assert(n_valid == 2)
+        assert(n_reject == 1)
+        valid = [json.loads(x) for x in valid_out.getvalue().splitlines()]
+        assert(valid[0]["subtitles"] is None)
+        assert(valid[1]["language"] == const.Language.UNKNOWN)
+        assert(valid[1]["season"] == 1)
+        assert(json.loads(reject_out.getvalue())["line"] == 4)
+
+    def test_lazy(self):
+        """
+        Tests that records are validated one at a time as they are pulled.
+        Expected to work.
+        """
+        def lines():
+            yield '{"title": "Alien", "type": "movie", "file": "/a.mkv"}'
+            raise RuntimeError("stream should not be consumed further")
+        documents = ingest.validate(ingest.read_jsonl(lines()))
+        assert(next(documents).title == "Alien")
+
+    def test_bad_format(self):
+        """
+        Tests an unsupported input format.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            ingest.ingest(io.StringIO(), io.StringIO(), io.StringIO(),
+                          fmt="xml")
@@ -0,0 +1,89 @@
+import pytest
+import mediadb.models.languages as languages
+import mediadb.models.constants as const
+
+
+class TestLookup:
+    """
+    A test suite for mediadb.models.languages.lookup
+    """
+
+    def test_codes(self):
+        """
+        Tests looking up ISO 639-1 and 639-2 codes and BCP 47 tags.
+        Expected to give their language, whatever the case.
+        """
+        for code in ("FR", "fr", "fre", "fra", "FRA", "fr-CA", "fr_FR",
+                     " fre\x00"):
+            assert(languages.lookup(code) is const.Language.FRENCH)
+        assert(languages.lookup("ger") is const.Language.GERMAN)
+        assert(languages.lookup("zho") is const.Language.CHINESE)
+        assert(languages.lookup("chi") is const.Language.CHINESE)
+        assert(languages.lookup("pt-BR") is const.Language.PORTUGUESE)
+        assert(languages.lookup("und") is const.Language.UNKNOWN)
+        assert(languages.lookup("unknown") is const.Language.UNKNOWN)
+
+    def test_names(self):
+        """
+        Tests looking up English and native language names.
+        Expected to give their language, with or without accents.
+        """
+        assert(languages.lookup("English") is const.Language.ENGLISH)
+        assert(languages.lookup("Français") is const.Language.FRENCH)
+        assert(languages.lookup("FRANCAIS") is const.Language.FRENCH)
+        assert(languages.lookup("Español") is const.Language.SPANISH)
+        assert(languages.lookup("日本語") is const.Language.JAPANESE)
+        assert(languages.lookup("Norwegian Bokmål") is
+               const.Language.NORWEGIAN_BOKMAL)
+        assert(languages.lookup("scottish gaelic") is
+               const.Language.SCOTTISH_GAELIC)
+
+    def test_unknown(self):
+        """
+        Tests looking up values of no ISO 639-1 language.
+        Expected to give None.
+        """
+        for value in ("klingon", "tlh", "xx", "", "-"):
+            assert(languages.lookup(value) is None)
+
+    def test_table(self):
+        """
+        Tests the lookup table.
+        Expected to map the code of each language, in upper and lower
+        case, and its ISO 639-2 codes to the language.
+        """
+        for language in const.Language:
+            if language is const.Language.UNKNOWN:
+                continue
+            code = language.value.lower()
+            assert(languages.TABLE[language.value] is language)
+            assert(languages.TABLE[code] is language)
+            for alpha3 in languages.ALPHA3[code].split():
+                assert(languages.TABLE[alpha3] is language)
+        assert(len(languages.ALPHA3) == len(const.Language) - 1)
+
+
+class TestNormalize:
+    """
+    A test suite for mediadb.models.languages.normalize and parse
+    """
+
+    def test_normalize(self):
+        """
+        Tests normalizing codes.
+        Expected to give UNKNOWN for the values of no known language.
+        """
+        assert(languages.normalize("eng") is const.Language.ENGLISH)
+        assert(languages.normalize("de-AT") is const.Language.GERMAN)
+        assert(languages.normalize("tlh") is const.Language.UNKNOWN)
+
+    def test_parse(self):
+        """
+        Tests parsing codes and languages.
+        Expected to raise ValueError for the values of no known language.
+        """
+        assert(languages.parse("ita") is const.Language.ITALIAN)
+        assert(languages.parse(const.Language.DUTCH) is const.Language.DUTCH)
+        for value in ("klingon", None, 3):
+            with pytest.raises(ValueError):
+                languages.parse(value)
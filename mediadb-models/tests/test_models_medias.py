@@ -2,6 +2,7 @@ import pytest
 import mediadb.models.medias as medias
 import mediadb.models.constants as const
 import pathlib as path
+import pickle
 
 
 class TestMovie:
@@ -643,3 +644,214 @@ class TestSerie:
                          episode=episode,
                          episode_name=episode_name,
                          type=t)
+
+
+class TestTrusted:
+    """
+    A test suite for mediadb.models.medias.VideoMedia.from_trusted and
+    mediadb.models.medias.load_many
+    """
+
+    def test_from_trusted(self):
+        """
+        Tests building documents of all types from serialized values.
+        Expected to give the same documents as validating them, with the
+        type forced.
+        """
+        documents = [medias.Movie(title="Alien",
+                                  language=const.Language.ENGLISH,
+                                  subtitles=const.Language.FRENCH,
+                                  file=path.Path("/dir/file.media")),
+                     medias.Documentary(title="Bowling for Columbine",
+                                        file=path.Path("/dir/file.media")),
+                     medias.Serie(title="Generation Kill",
+                                  season=1,
+                                  episode=3,
+                                  file=path.Path("/dir/file.media"))]
+        for document in documents:
+            values = document.model_dump(mode="json")
+            values["type"] = const.VideoType.UNKNOWN.value
+            trusted = type(document).from_trusted(values)
+            assert(trusted == document)
+            assert(trusted.type == document.type) # invariant
+            assert(isinstance(trusted.file, path.Path))
+            assert(trusted.model_dump_json() == document.model_dump_json())
+
+    def test_from_trusted_missing(self):
+        """
+        Tests building a document without a required field.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            medias.Serie.from_trusted({"title": "Generation Kill",
+                                       "season": 1,
+                                       "file": "/dir/file.media"})
+
+    def test_load_many(self):
+        """
+        Tests building documents of mixed types, fields of other types
+        being given as None.
+        Expected to work.
+        """
+        records = [{"type": "movie", "title": "Alien", "file": "/a.mkv",
+                    "language": "EN", "season": None},
+                   {"type": "serie", "title": "Generation Kill",
+                    "file": "/gk.mkv", "season": 1, "episode": 3,
+                    "episode_name": None}]
+        assert(medias.load_many(records) ==
+               [medias.Movie(title="Alien",
+                             language=const.Language.ENGLISH,
+                             file=path.Path("/a.mkv")),
+                medias.Serie(title="Generation Kill",
+                             season=1,
+                             episode=3,
+                             file=path.Path("/gk.mkv"))])
+        with pytest.raises(ValueError):
+            medias.load_many([{"type": "unknown", "title": "Alien",
+                               "file": "/a.mkv"}])
+        with pytest.raises(ValueError):
+            medias.load_many([{"title": "Alien", "file": "/a.mkv"}])
+
+
+class TestAnyMedia:
+    """
+    A test suite for mediadb.models.medias.AnyMedia
+    """
+
+    def test_validate(self):
+        """
+        Tests validating documents of mixed types, from JSON and Python
+        objects.
+        Expected to pick the model matching the type field.
+        """
+        movie = medias.AnyMedia.validate_json(
+                    '{"title": "Alien", "type": "movie", "file": "/a.mkv"}')
+        assert(movie == medias.Movie(title="Alien", file="/a.mkv"))
+        documentary = medias.AnyMedia.validate_python(
+                        {"title": "Bowling for Columbine",
+                         "type": const.VideoType.DOCUMENTARY,
+                         "file": "/b.mkv"})
+        assert(isinstance(documentary, medias.Documentary))
+        serie = medias.AnyMedia.validate_json(
+                    b'{"title": "Generation Kill", "type": "serie", '
+                    b'"season": 1, "episode": 3, "file": "/gk.mkv"}')
+        assert(isinstance(serie, medias.Serie))
+        assert(serie.type == const.VideoType.SERIE)
+        assert(medias.AnyMedia.validate_python(serie) is serie)
+
+    def test_invalid(self):
+        """
+        Tests validating documents without type, of an unknown type or
+        with invalid fields.
+        Expected to raise ValueError.
+        """
+        for record in ({"title": "Alien", "file": "/a.mkv"},
+                       {"title": "Alien", "type": "unknown", "file": "/a.mkv"},
+                       {"title": "Alien", "type": "opera", "file": "/a.mkv"},
+                       {"title": "Generation Kill", "type": "serie",
+                        "season": 0, "episode": 3, "file": "/gk.mkv"}):
+            with pytest.raises(ValueError):
+                medias.AnyMedia.validate_python(record)
+
+    def test_dump(self):
+        """
+        Tests serializing documents of mixed types.
+        Expected to give back the same documents once validated.
+        """
+        documents = [medias.Movie(title="Alien", file="/a.mkv"),
+                     medias.Serie(title="Generation Kill",
+                                  season=1,
+                                  episode=3,
+                                  file="/gk.mkv")]
+        for document in documents:
+            data = medias.AnyMedia.dump_json(document)
+            assert(data == document.model_dump_json().encode())
+            assert(medias.AnyMedia.validate_json(data) == document)
+
+
+class TestFrozen:
+    """
+    A test suite for mediadb.models.medias.FrozenMedia and its models
+    """
+
+    def test_key(self):
+        """
+        Tests the identity keys of frozen documents.
+        Expected to be those of the mutable documents, copies of a media
+        in different files being equal and hashed the same.
+        """
+        serie = medias.FrozenSerie(title="Lost",
+                                   language=const.Language.ENGLISH,
+                                   season=1,
+                                   episode=2,
+                                   file="/a/lost.s01e02.mkv")
+        assert(serie.key == (const.VideoType.SERIE, "Lost", 1, 2,
+                             const.Language.ENGLISH))
+        copy = medias.AnyFrozenMedia.validate_json(
+                    serie.model_dump_json().replace("/a/", "/b/"))
+        assert(isinstance(copy, medias.FrozenSerie))
+        assert(copy == serie)
+        assert(hash(copy) == hash(serie))
+        assert(len({serie, copy, serie.model_copy(update={"episode": 3})})
+               == 2)
+        movie = medias.FrozenMovie(title="Lost", file="/a/lost.mkv")
+        assert(movie.key == medias.Movie(title="Lost",
+                                         file="/b/lost.mkv").key)
+        assert(movie != medias.FrozenDocumentary(title="Lost",
+                                                 file="/a/lost.mkv"))
+
+    def test_frozen(self):
+        """
+        Tests changing a field of a frozen document.
+        Expected to raise ValueError.
+        """
+        movie = medias.FrozenMovie(title="Alien", file="/a.mkv")
+        with pytest.raises(ValueError):
+            movie.title = "Aliens"
+
+    def test_freeze(self):
+        """
+        Tests freezing documents and loading frozen documents.
+        Expected to give the same fields, with their identity key.
+        """
+        documents = [medias.Movie(title="Alien", file="/a.mkv"),
+                     medias.Serie(title="Generation Kill",
+                                  season=1,
+                                  episode=3,
+                                  file="/gk.mkv")]
+        frozen = [medias.freeze(x) for x in documents]
+        assert([type(x) for x in frozen] ==
+               [medias.FrozenMovie, medias.FrozenSerie])
+        assert(medias.freeze(frozen[0]) is frozen[0])
+        assert(medias.load_many([x.model_dump(mode="json")
+                                 for x in documents], frozen=True) == frozen)
+        for document, x in zip(documents, frozen):
+            assert(x.model_dump() == document.model_dump())
+            assert(x.key == document.key)
+            assert(pickle.loads(pickle.dumps(x)) == x)
+
+
+class TestLanguages:
+    """
+    A test suite for the language fields of the media models
+    """
+
+    def test_normalize(self):
+        """
+        Tests building documents with language codes and names.
+        Expected to give their language, or to raise ValueError if not
+        known.
+        """
+        serie = medias.AnyMedia.validate_json(
+                    '{"title": "Lost", "type": "serie", "season": 1, '
+                    '"episode": 2, "language": "eng", "subtitles": "fr-CA", '
+                    '"file": "/lost.mkv"}')
+        assert(serie.language is const.Language.ENGLISH)
+        assert(serie.subtitles is const.Language.FRENCH)
+        movie = medias.Movie(title="Amélie",
+                             language="Français",
+                             file="/amelie.mkv")
+        assert(movie.language is const.Language.FRENCH)
+        assert(movie.model_dump()["language"] == "FR")
+        with pytest.raises(ValueError):
+            medias.Movie(title="Alien", language="klingon", file="/a.mkv")
@@ -0,0 +1,209 @@
+import pytest
+import io
+import json
+import pickle
+import mediadb.models.metrics as metrics
+import mediadb.models.ingest as ingest
+import mediadb.models.bulk as bulk
+
+
+@pytest.fixture
+def registry():
+    """
+    Enables the metrics for a test.
+    Returns: the registry.
+    """
+    yield metrics.enable()
+    metrics.disable()
+
+
+def records() \
+    -> str:
+    """
+    Returns: a JSONL stream of records, of documents of each type and of
+        invalid ones.
+    """
+    return "\n".join(json.dumps(x) for x in [
+        {"type": "movie", "title": "Alien", "file": "/movies/alien.mkv"},
+        {"type": "movie", "title": "", "file": "/movies/none.mkv"},
+        {"type": "documentary", "title": "Home", "file": "/docs/home.mkv"},
+        {"type": "serie", "title": "Lost", "season": 1, "episode": 1,
+         "file": "/series/lost.s01e01.mkv"},
+        {"type": "serie", "title": "Lost", "season": 0, "episode": 1,
+         "episode_name": "", "file": "/series/lost.s00e01.mkv"},
+        {"type": "concert", "title": "Live", "file": "/live.mkv"},
+    ])
+
+
+class TestRegistry:
+    """
+    A test suite for mediadb.models.metrics.Registry
+    """
+
+    def test_prometheus(self):
+        """
+        Tests exporting counters and histograms in the Prometheus format.
+        Expected to give one sample per counter and cumulative buckets.
+        """
+        r = metrics.Registry()
+        r.count(metrics.VALIDATED, model="Movie")
+        r.count(metrics.VALIDATED, 2, model="Movie")
+        r.count(metrics.REJECTED, model='a "b"')
+        r.observe(metrics.STAGE_SECONDS, 0.002, stage="read")
+        r.observe(metrics.STAGE_SECONDS, 20.0, stage="read")
+        lines = r.to_prometheus().splitlines()
+        assert("# TYPE mediadb_documents_validated_total counter" in lines)
+        assert('mediadb_documents_validated_total{model="Movie"} 3' in lines)
+        assert('mediadb_documents_rejected_total{model="a \\"b\\""} 1'
+               in lines)
+        assert("# TYPE mediadb_stage_seconds histogram" in lines)
+        assert('mediadb_stage_seconds_bucket{stage="read",le="0.001"} 0'
+               in lines)
+        assert('mediadb_stage_seconds_bucket{stage="read",le="0.0025"} 1'
+               in lines)
+        assert('mediadb_stage_seconds_bucket{stage="read",le="10.0"} 1'
+               in lines)
+        assert('mediadb_stage_seconds_bucket{stage="read",le="+Inf"} 2'
+               in lines)
+        assert('mediadb_stage_seconds_count{stage="read"} 2' in lines)
+        assert(len([x for x in lines if x.startswith("# TYPE")]) == 3)
+
+    def test_json(self):
+        """
+        Tests exporting counters and histograms in JSON format.
+        Expected to give the same values as the Prometheus format.
+        """
+        r = metrics.Registry()
+        r.count(metrics.VALIDATED, model="Serie")
+        r.observe(metrics.STAGE_SECONDS, 0.5, stage="write")
+        data = json.loads(r.to_json())
+        assert(data["counters"] == [{"name": metrics.VALIDATED,
+                                     "labels": {"model": "Serie"},
+                                     "value": 1}])
+        histogram, = data["histograms"]
+        assert(histogram["labels"] == {"stage": "write"})
+        assert(histogram["count"] == 1)
+        assert(histogram["sum"] == 0.5)
+        assert(histogram["buckets"][-1] == ["+Inf", 1])
+        assert([0.5, 1] in histogram["buckets"])
+        assert([0.25, 0] in histogram["buckets"])
+
+    def test_merge(self):
+        """
+        Tests merging a registry sent back by a worker, i.e. pickled.
+        Expected to add its counters and histograms to the others.
+        """
+        r = metrics.Registry()
+        r.count(metrics.VALIDATED, model="Movie")
+        r.observe(metrics.STAGE_SECONDS, 0.002, stage="read")
+        other = metrics.Registry()
+        other.count(metrics.VALIDATED, 2, model="Movie")
+        other.count(metrics.REJECTED, model="Serie")
+        other.observe(metrics.STAGE_SECONDS, 0.5, stage="read")
+        other.observe(metrics.STAGE_SECONDS, 0.5, stage="write")
+        r.merge(pickle.loads(pickle.dumps(other)))
+        assert(r.counters == {
+            (metrics.VALIDATED, (("model", "Movie"),)): 3,
+            (metrics.REJECTED, (("model", "Serie"),)): 1,
+        })
+        read = r.histograms[(metrics.STAGE_SECONDS, (("stage", "read"),))]
+        assert(read.count == 2)
+        assert(read.sum == 0.502)
+        assert(read.cumulative()[-1] == (float("inf"), 2))
+        assert(r.histograms[(metrics.STAGE_SECONDS,
+                             (("stage", "write"),))].count == 1)
+
+
+class TestInstrumentation:
+    """
+    A test suite for the metrics of the validation and of the stages
+    """
+
+    def test_ingest(self, registry):
+        """
+        Tests ingesting records with the metrics enabled.
+        Expected to count the documents validated and rejected by model,
+        the failures by validator, and to time each stage per record.
+        """
+        ingest.ingest(io.StringIO(records()), io.StringIO(), io.StringIO())
+        counters = {(name, labels): value
+                    for (name, labels), value in registry.counters.items()}
+        assert(counters == {
+            (metrics.VALIDATED, (("model", "Movie"),)): 1,
+            (metrics.VALIDATED, (("model", "Documentary"),)): 1,
+            (metrics.VALIDATED, (("model", "Serie"),)): 1,
+            (metrics.REJECTED, (("model", "Movie"),)): 1,
+            (metrics.REJECTED, (("model", "Serie"),)): 1,
+            (metrics.REJECTED, (("model", "unknown"),)): 1,
+            (metrics.VALIDATOR_FAILURES,
+             (("model", "Movie"), ("validator", "check_notempty"))): 1,
+            (metrics.VALIDATOR_FAILURES,
+             (("model", "Serie"), ("validator", "is_bigger_zero"))): 1,
+            (metrics.VALIDATOR_FAILURES,
+             (("model", "Serie"), ("validator", "check_notempty_serie"))): 1,
+        })
+        counts = {dict(labels)["stage"]: histogram.count
+                  for (_, labels), histogram in registry.histograms.items()}
+        assert(counts == {"read": 6, "validate": 6, "write": 6})
+
+    def test_bulk(self, registry):
+        """
+        Tests loading and dumping chunks of documents with the metrics
+        enabled.
+        Expected to count the documents by model and to time each chunk.
+        """
+        lines = records().splitlines()
+        lines = [lines[0], lines[2], lines[3]] * 3
+        documents = [x for chunk in bulk.load_jsonl(lines, chunk_size=4)
+                     for x in chunk]
+        bulk.dump_jsonl(documents, io.BytesIO(), chunk_size=5)
+        assert(sorted(value for (name, _), value
+                      in registry.counters.items()
+                      if name == metrics.VALIDATED) == [3, 3, 3])
+        counts = {dict(labels)["stage"]: histogram.count
+                  for (_, labels), histogram in registry.histograms.items()}
+        assert(counts == {"validate_chunk": 3, "dump_chunk": 2})
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_validate_file(self, registry, tmp_path, processes):
+        """
+        Tests validating a file of records, in shards of a single line,
+        with the metrics enabled.
+        Expected to count the documents validated and rejected, in the
+        calling process or in the workers, and to time each chunk.
+        """
+        file = tmp_path / "records.jsonl"
+        file.write_text(records() + "\n")
+        reports = list(bulk.validate_file(file, processes, shard_size=1))
+        assert(sum(x.valid for x in reports) == 3)
+        counters = {(name, labels): value
+                    for (name, labels), value in registry.counters.items()
+                    if name in (metrics.VALIDATED, metrics.REJECTED)}
+        assert(counters == {
+            (metrics.VALIDATED, (("model", "Movie"),)): 1,
+            (metrics.VALIDATED, (("model", "Documentary"),)): 1,
+            (metrics.VALIDATED, (("model", "Serie"),)): 1,
+            (metrics.REJECTED, (("model", "Movie"),)): 1,
+            (metrics.REJECTED, (("model", "Serie"),)): 1,
+            (metrics.REJECTED, (("model", "unknown"),)): 1,
+        })
+        counts = {dict(labels)["stage"]: histogram.count
+                  for (_, labels), histogram in registry.histograms.items()}
+        assert(counts == {"validate": 6, "validate_chunk": 6})
+
+    def test_disabled(self):
+        """
+        Tests the instrumented code with the metrics disabled.
+        Expected to record nothing, the iterables being left as they
+        are.
+        """
+        assert(metrics.REGISTRY is None)
+        ingest.ingest(io.StringIO(records()), io.StringIO(), io.StringIO())
+        items = [1, 2]
+        assert(metrics.timed(items, "read") is items)
+        with metrics.stage("read"):
+            metrics.count(metrics.VALIDATED, model="Movie")
+        registry = metrics.enable()
+        assert(metrics.enable() is registry)
+        assert(metrics.disable() is registry)
+        assert(not registry.counters and not registry.histograms)
@@ -0,0 +1,179 @@
+import io
+import json
+import struct
+import pytest
+import pathlib as path
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+import mediadb.models.snapshot as snapshot
+
+
+@pytest.fixture
+def documents():
+    """
+    Returns: a list of media documents of all types, the episodes of a
+        season sharing their title and the start of their file.
+    """
+    return [medias.Movie(title="Alien",
+                         language=const.Language.ENGLISH,
+                         subtitles=const.Language.FRENCH,
+                         file=path.Path("/movies/alien.mkv"),
+                         fingerprint="sample:1024:00ff"),
+            medias.Documentary(title="Bowling for Columbine",
+                               file=path.Path("/docs/bowling.mkv")),
+            medias.Serie(title="Generation Kill",
+                         language=const.Language.FRENCH,
+                         season=1,
+                         episode=3,
+                         episode_name="Screwby",
+                         file=path.Path("/series/gk/s01e03.mkv")),
+            medias.Serie(title="Generation Kill",
+                         season=1,
+                         episode=200,
+                         file=path.Path("/series/gk/s01e200.mkv")),
+            medias.Movie(title="Amélie " * 30,
+                         file=path.Path("/movies/amélie.mkv"))]
+
+
+class TestVarint:
+    """
+    A test suite for mediadb.models.snapshot._varint and _read_varint
+    """
+
+    def test_roundtrip(self):
+        """
+        Tests writing and reading integers of 1 to several bytes.
+        Expected to use 7 bits per byte and to read the same integers.
+        """
+        out = bytearray()
+        values = [0, 1, 127, 128, 300, 16384, 2 ** 40]
+        for value in values:
+            snapshot._varint(value, out)
+        assert(len(out) == 1 + 1 + 1 + 2 + 2 + 3 + 6)
+        pos = 0
+        for value in values:
+            read, pos = snapshot._read_varint(out, pos)
+            assert(read == value)
+        assert(pos == len(out))
+
+    def test_negative(self):
+        """
+        Tests writing a negative integer.
+        Expected to raise a ValueError.
+        """
+        with pytest.raises(ValueError):
+            snapshot._varint(-1, bytearray())
+
+
+class TestSnapshot:
+    """
+    A test suite for mediadb.models.snapshot.write and read
+    """
+
+    @pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+    def test_roundtrip(self, documents, compression):
+        """
+        Tests writing and reading documents, by blocks, with each
+        compression codec.
+        Expected to read the same documents, of the same types, in
+        blocks of the batch size.
+        """
+        if compression == "zstd":
+            pytest.importorskip("zstandard")
+        stream = io.BytesIO()
+        assert(snapshot.write(documents, stream, compression=compression,
+                              batch_size=2) == 5)
+        stream.seek(0)
+        batches = list(snapshot.read(stream))
+        assert([len(x) for x in batches] == [2, 2, 1])
+        read = [x for batch in batches for x in batch]
+        assert(read == documents)
+        assert([type(x) for x in read] == [type(x) for x in documents])
+        assert([x.model_dump_json() for x in read] ==
+               [x.model_dump_json() for x in documents])
+
+    def test_validate(self, documents):
+        """
+        Tests reading documents with validation.
+        Expected to read the same documents.
+        """
+        data = snapshot.dump(documents)
+        assert(snapshot.load(data, validate=True) == documents)
+
+    def test_empty(self):
+        """
+        Tests writing no documents.
+        Expected to give a header only, read as no documents.
+        """
+        data = snapshot.dump([])
+        assert(len(data) == 10)
+        assert(snapshot.load(data) == [])
+
+    def test_size(self, documents):
+        """
+        Tests the size of a snapshot without compression.
+        Expected to be less than half the size of the documents in JSON
+        format, the enumerations being codes and the season files
+        sharing their start.
+        """
+        size = len(snapshot.dump(documents * 100, compression="none"))
+        json_size = sum(len(x.model_dump_json()) + 1
+                        for x in documents * 100)
+        assert(size * 2 < json_size)
+
+    def test_compression(self, documents):
+        """
+        Tests writing documents with an unknown compression codec.
+        Expected to raise a ValueError.
+        """
+        with pytest.raises(ValueError):
+            snapshot.dump(documents, compression="lzma")
+
+    def test_not_snapshot(self):
+        """
+        Tests reading a stream that is not a snapshot, e.g. JSONL.
+        Expected to raise a ValueError.
+        """
+        with pytest.raises(ValueError, match="not a snapshot"):
+            snapshot.load(json.dumps({"type": "movie"}).encode())
+
+    def test_version(self, documents):
+        """
+        Tests reading a snapshot of another version or schema.
+        Expected to raise a ValueError.
+        """
+        data = snapshot.dump(documents)
+        with pytest.raises(ValueError, match="version"):
+            snapshot.load(data[:4] + bytes([snapshot.VERSION + 1]) +
+                          data[5:])
+        with pytest.raises(ValueError, match="schema"):
+            snapshot.load(data[:6] + struct.pack("<I", snapshot.SCHEMA + 1)
+                          + data[10:])
+
+    @pytest.mark.parametrize("compression", ["none", "zlib"])
+    def test_corrupted(self, documents, compression):
+        """
+        Tests reading truncated and corrupted snapshots.
+        Expected to raise a ValueError.
+        """
+        data = snapshot.dump(documents, compression=compression)
+        for end in (12, 20, len(data) - 1):
+            with pytest.raises(ValueError):
+                snapshot.load(data[:end])
+        # the number of records of the block
+        count = struct.pack("<I", len(documents) + 1)
+        with pytest.raises(ValueError):
+            snapshot.load(data[:10] + count + data[14:])
+
+    def test_unknown_type(self):
+        """
+        Tests reading a record of the unknown type.
+        Expected to raise a ValueError.
+        """
+        document = medias.Movie.model_construct(
+                        title="Alien",
+                        type=const.VideoType.UNKNOWN,
+                        file=path.Path("/movies/alien.mkv"))
+        data = snapshot.dump([document])
+        with pytest.raises(ValueError, match="type is not known"):
+            snapshot.load(data)
@@ -0,0 +1,119 @@
+import pytest
+import os
+import mediadb.scan.cache as cache
+import mediadb.scan.manifest as manifest
+import mediadb.scan.scanner as scanner
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Creates a small file store.
+    Returns: the store root.
+    """
+    root = tmp_path / "store"
+    for file in ["movies/Alien.1979.mkv",
+                 "movies/cover.mkv",
+                 "series/Lost/Season 1/Lost.S01E01.mkv",
+                 "series/Lost/Season 1/Lost.S01E02.mkv"]:
+        file = root / file
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+    return root
+
+
+def key(document) \
+    -> str:
+    """
+    Returns: the file of a document or Reject, to sort them.
+    """
+    return str(document.file)
+
+
+class TestCache:
+    """
+    A test suite for mediadb.scan.cache.Cache
+    """
+
+    def test_scan(self, store, tmp_path, monkeypatch):
+        """
+        Tests scanning a store twice through a persistent cache.
+        Expected to give the same documents and rejects, the second
+        time without building them.
+        """
+        file = tmp_path / "cache" / "documents.db"
+        with cache.Cache(file) as c:
+            first = sorted(c.scan(store), key=key)
+            assert(len(c) == 4)
+        assert(first == sorted(scanner.scan(store), key=key))
+
+        def fail(*args):
+            raise AssertionError("document built")
+
+        monkeypatch.setattr(scanner, "build_document", fail)
+        with cache.Cache(file) as c:
+            assert(sorted(c.scan(store), key=key) == first)
+
+    def test_changed(self, store):
+        """
+        Tests scanning a store whose files changed since cached.
+        Expected to build the documents of the changed files again.
+        """
+        with cache.Cache() as c:
+            list(c.scan(store))
+            file = store / "movies" / "Alien.1979.mkv"
+            os.rename(file, store / "movies" / "Aliens.1986.mkv")
+            (store / "movies" / "cover.mkv").write_bytes(b"cover")
+            titles = {x.title for x in c.scan(store)
+                      if not isinstance(x, scanner.Reject)}
+            assert("Aliens" in titles and "Alien" not in titles)
+            assert(len(c) == 5)
+
+    def test_context(self, store):
+        """
+        Tests scanning a store with other options.
+        Expected not to use the documents built with other options.
+        """
+        with cache.Cache() as c:
+            list(c.scan(store))
+            list(c.scan(store, probed=True))
+            assert(len(c) == 8)
+
+    def test_version(self, store, monkeypatch):
+        """
+        Tests scanning a store after a parser change.
+        Expected not to use the documents built by the former parser.
+        """
+        with cache.Cache() as c:
+            list(c.scan(store))
+            monkeypatch.setattr(cache, "version", lambda: "other")
+            list(c.scan(store))
+            assert(len(c) == 8)
+
+    def test_eviction(self, store, monkeypatch):
+        """
+        Tests caching more files than the cache size.
+        Expected to evict the least recently used directories.
+        """
+        with cache.Cache(max_size=3) as c:
+            list(c.scan(store / "series"))
+            list(c.scan(store / "movies"))
+            assert(len(c) == 2)
+
+            def fail(*args):
+                raise AssertionError("document built")
+
+            monkeypatch.setattr(scanner, "build_document", fail)
+            assert(len(list(c.scan(store / "movies"))) == 2)
+
+    def test_rescan(self, store):
+        """
+        Tests rescanning a store through a cache, without manifest.
+        Expected to give the same changes as without cache.
+        """
+        with cache.Cache() as c:
+            list(c.scan(store))
+            changes = sorted(manifest.rescan(store, {}, cached=c), key=key)
+        assert(changes == sorted(manifest.rescan(store, {}), key=key))
+        assert(len(changes) == 4)
@@ -0,0 +1,115 @@
+import pytest
+import mediadb.scan.filenames as filenames
+import mediadb.models.constants as const
+
+
+class TestIsVideo:
+    """
+    A test suite for mediadb.scan.filenames.is_video
+    """
+
+    def test_values(self):
+        assert(filenames.is_video("Alien.mkv"))
+        assert(filenames.is_video("Alien.MP4"))
+        assert(not filenames.is_video("Alien.srt"))
+        assert(not filenames.is_video("cover.jpg"))
+        assert(not filenames.is_video("mkv"))
+
+
+class TestParse:
+    """
+    A test suite for mediadb.scan.filenames.parse
+    """
+
+    def test_serie(self):
+        """
+        Tests a serie episode with a S01E03 episode number, an episode name,
+        release tags and a language.
+        Expected to work.
+        """
+        fields = filenames.parse("/media/series/Generation Kill/Season 1/"
+                                 "Generation.Kill.S01E03.Screwby.720p."
+                                 "FRENCH.mkv")
+        assert(fields["type"] == const.VideoType.SERIE)
+        assert(fields["title"] == "Generation Kill")
+        assert(fields["season"] == 1)
+        assert(fields["episode"] == 3)
+        assert(fields["episode_name"] == "Screwby")
+        assert(fields["language"] == const.Language.FRENCH)
+        assert("subtitles" not in fields)
+
+    def test_serie_alternative_numbers(self):
+        """
+        Tests serie episodes with 1x03 and season directory + E03 episode
+        numbers, where the title is given by the directory.
+        Expected to work.
+        """
+        fields = filenames.parse("/media/tv/Lost/Lost 4x05.avi")
+        assert(fields["type"] == const.VideoType.SERIE)
+        assert(fields["title"] == "Lost")
+        assert((fields["season"], fields["episode"]) == (4, 5))
+        fields = filenames.parse("/media/Generation Kill/Saison 2/"
+                                 "Episode 04 - The Cat.mkv")
+        assert(fields["type"] == const.VideoType.SERIE)
+        assert(fields["title"] == "Generation Kill")
+        assert((fields["season"], fields["episode"]) == (2, 4))
+        assert(fields["episode_name"] == "The Cat")
+
+    def test_serie_no_episode(self):
+        """
+        Tests a file in a serie directory without episode number.
+        Expected to be typed as a serie without season nor episode.
+        """
+        fields = filenames.parse("/media/series/Lost/bonus.mkv")
+        assert(fields["type"] == const.VideoType.SERIE)
+        assert("season" not in fields)
+        assert("episode" not in fields)
+
+    def test_movie(self):
+        """
+        Tests movies with release year, tags and languages.
+        Expected to work.
+        """
+        fields = filenames.parse("/media/movies/Alien (1979)/"
+                                 "Alien.1979.1080p.VOSTFR.mkv")
+        assert(fields["type"] == const.VideoType.MOVIE)
+        assert(fields["title"] == "Alien")
+        assert(fields["subtitles"] == const.Language.FRENCH)
+        assert("language" not in fields)
+        fields = filenames.parse("/media/movies/Le.Fabuleux.Destin.de."
+                                 "Amelie.Poulain.2001.FRENCH.sub.EN.mkv")
+        assert(fields["title"] == "Le Fabuleux Destin de Amelie Poulain")
+        assert(fields["language"] == const.Language.FRENCH)
+        assert(fields["subtitles"] == const.Language.ENGLISH)
+        fields = filenames.parse("/media/2001.A.Space.Odyssey.1968.mkv")
+        assert(fields["title"] == "2001 A Space Odyssey")
+
+    def test_movie_title_from_dir(self):
+        """
+        Tests a movie file without title.
+        Expected to use the directory name.
+        """
+        fields = filenames.parse("/media/The Thing/1982.mkv")
+        assert(fields["type"] == const.VideoType.MOVIE)
+        assert(fields["title"] == "The Thing")
+
+    def test_documentary(self):
+        """
+        Tests a file under a documentary directory.
+        Expected to work.
+        """
+        fields = filenames.parse("/media/Documentaries/"
+                                 "Bowling.for.Columbine.2002.mkv")
+        assert(fields["type"] == const.VideoType.DOCUMENTARY)
+        assert(fields["title"] == "Bowling for Columbine")
+
+    def test_root(self):
+        """
+        Tests that the directories above the root are not used to infer the
+        type.
+        Expected to work.
+        """
+        file = "/mnt/docs/store/Alien.1979.mkv"
+        assert(filenames.parse(file)["type"] == const.VideoType.DOCUMENTARY)
+        assert(filenames.parse(file, root="/mnt/docs/store")["type"] == \
+               const.VideoType.MOVIE)
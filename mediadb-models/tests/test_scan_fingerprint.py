@@ -0,0 +1,97 @@
+import pytest
+import os
+import mediadb.scan.fingerprint as fingerprint
+
+
+@pytest.fixture
+def large(tmp_path):
+    """
+    Creates a file larger than the samples.
+    Returns: the file path.
+    """
+    file = tmp_path / "large.mkv"
+    file.write_bytes(os.urandom(10 * fingerprint.SAMPLE_SIZE))
+    return file
+
+
+class TestFingerprint:
+    """
+    A test suite for mediadb.scan.fingerprint.fingerprint
+    """
+
+    def test_copies(self, large, tmp_path):
+        """
+        Tests the fingerprints of copies of a file.
+        Expected to be the same, whatever the path.
+        """
+        copy = tmp_path / "other" / "copy.mkv"
+        copy.parent.mkdir()
+        copy.write_bytes(large.read_bytes())
+        assert(fingerprint.fingerprint(large) ==
+               fingerprint.fingerprint(copy))
+        assert(fingerprint.fingerprint(large, full=True) ==
+               fingerprint.fingerprint(copy, full=True))
+
+    def test_samples(self, large, tmp_path):
+        """
+        Tests the fingerprints of files differing in their samples or
+        between them.
+        Expected to differ in the first case only, unless fully hashed.
+        """
+        data = large.read_bytes()
+        size = fingerprint.SAMPLE_SIZE
+        middle = (len(data) - size) // 2
+        value = fingerprint.fingerprint(large)
+        for offset in (0, middle + size - 1, len(data) - 1):
+            other = tmp_path / "other.mkv"
+            other.write_bytes(data[:offset] + bytes([data[offset] ^ 1]) +
+                              data[offset + 1:])
+            assert(fingerprint.fingerprint(other) != value)
+        other.write_bytes(data[:size] + bytes([data[size] ^ 1]) +
+                          data[size + 1:])
+        assert(fingerprint.fingerprint(other) == value)
+        assert(fingerprint.fingerprint(other, full=True) !=
+               fingerprint.fingerprint(large, full=True))
+
+    def test_small(self, tmp_path):
+        """
+        Tests the fingerprints of files smaller than the samples.
+        Expected to hash the whole files.
+        """
+        file = tmp_path / "small.mkv"
+        file.write_bytes(b"abc")
+        assert(fingerprint.fingerprint(file).startswith("sample:3:"))
+        other = tmp_path / "other.mkv"
+        other.write_bytes(b"abd")
+        assert(fingerprint.fingerprint(file) !=
+               fingerprint.fingerprint(other))
+
+    def test_missing(self, tmp_path):
+        """
+        Tests the fingerprint of a missing file.
+        Expected to raise an OSError.
+        """
+        with pytest.raises(OSError):
+            fingerprint.fingerprint(tmp_path / "missing.mkv")
+
+
+class TestFingerprintMany:
+    """
+    A test suite for mediadb.scan.fingerprint.fingerprint_many
+    """
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_many(self, large, tmp_path, processes):
+        """
+        Tests fingerprinting many files, in a process pool or not.
+        Expected to give every file its fingerprint, None if unreadable.
+        """
+        files = [large] * (fingerprint.BATCH_SIZE + 1) + \
+                [tmp_path / "missing.mkv"]
+        fingerprints = list(fingerprint.fingerprint_many(files,
+                                                         processes=processes))
+        assert(len(fingerprints) == len(files))
+        assert(fingerprints.count((str(large),
+                                   fingerprint.fingerprint(large))) ==
+               len(files) - 1)
+        assert((str(tmp_path / "missing.mkv"), None) in fingerprints)
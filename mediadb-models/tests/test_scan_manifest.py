@@ -0,0 +1,163 @@
+import pytest
+import os
+import gzip
+import mediadb.scan.manifest as manifest
+import mediadb.scan.scanner as scanner
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Creates a small file store.
+    Returns: the store root.
+    """
+    root = tmp_path / "store"
+    for file in ["movies/Alien.1979.mkv",
+                 "series/Lost/Season 1/Lost.S01E01.mkv",
+                 "series/Lost/Season 1/Lost.S01E02.mkv"]:
+        file = root / file
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+    return root
+
+
+class TestRescan:
+    """
+    A test suite for mediadb.scan.manifest.rescan
+    """
+
+    def test_first_scan(self, store):
+        """
+        Tests a scan with an empty manifest.
+        Expected to create all the documents.
+        """
+        entries = {}
+        changes = list(manifest.rescan(store, entries))
+        assert(all(x.action == manifest.CREATED for x in changes))
+        assert(sorted(x.document.title for x in changes) == ["Alien",
+                                                            "Lost",
+                                                            "Lost"])
+        assert(sorted(entries) == ["movies/Alien.1979.mkv",
+                                   "series/Lost/Season 1/Lost.S01E01.mkv",
+                                   "series/Lost/Season 1/Lost.S01E02.mkv"])
+        stat = os.stat(store / "movies" / "Alien.1979.mkv")
+        entry = entries["movies/Alien.1979.mkv"]
+        assert(entry.inode == stat.st_ino)
+        assert(entry.size == stat.st_size)
+        assert(entry.mtime == stat.st_mtime_ns)
+
+    def test_unchanged(self, store, monkeypatch):
+        """
+        Tests a rescan of an unchanged store.
+        Expected to yield nothing and to parse no file.
+        """
+        entries = {}
+        list(manifest.rescan(store, entries))
+        before = dict(entries)
+        def fail(files, root=None):
+            raise AssertionError("no file should be parsed")
+        monkeypatch.setattr(scanner, "build_documents", fail)
+        assert(list(manifest.rescan(store, entries)) == [])
+        assert(entries == before)
+
+    def test_changes(self, store):
+        """
+        Tests a rescan after a file was created, one was deleted, one was
+        renamed and one was modified without changing its document.
+        Expected to yield the created and deleted documents only.
+        """
+        entries = {}
+        list(manifest.rescan(store, entries))
+        (store / "movies" / "Aliens.1986.mkv").touch()
+        (store / "series" / "Lost" / "Season 1" / "Lost.S01E01.mkv").unlink()
+        (store / "series" / "Lost" / "Season 1" / "Lost.S01E02.mkv").rename(
+            store / "series" / "Lost" / "Season 1" / "Lost.S01E03.mkv")
+        (store / "movies" / "Alien.1979.mkv").write_bytes(b"new content")
+        changes = sorted(manifest.rescan(store, entries), key=lambda x: x.file)
+        assert([(x.action, os.path.relpath(x.file, store)) for x in changes] ==
+               [(manifest.CREATED, "movies/Aliens.1986.mkv"),
+                (manifest.DELETED, "series/Lost/Season 1/Lost.S01E01.mkv"),
+                (manifest.DELETED, "series/Lost/Season 1/Lost.S01E02.mkv"),
+                (manifest.CREATED, "series/Lost/Season 1/Lost.S01E03.mkv")])
+        assert(changes[3].document.episode == 3)
+        assert(changes[1].document is None)
+        assert(entries["movies/Alien.1979.mkv"].size == len(b"new content"))
+
+    def test_changed(self, store):
+        """
+        Tests a rescan after a document changed.
+        Expected to yield the changed document.
+        """
+        entries = {}
+        list(manifest.rescan(store, entries))
+        key = "movies/Alien.1979.mkv"
+        entries[key] = entries[key]._replace(mtime=0, digest="0")
+        changes = list(manifest.rescan(store, entries))
+        assert([x.action for x in changes] == [manifest.CHANGED])
+        assert(changes[0].document.type == const.VideoType.MOVIE)
+
+    def test_rejects(self, store):
+        """
+        Tests a store with a file that cannot be parsed.
+        Expected to be rejected on every scan and kept out of the manifest.
+        """
+        (store / "series" / "Lost" / "bonus.mkv").touch()
+        entries = {}
+        for _ in range(2):
+            rejects = [x for x in manifest.rescan(store, entries)
+                       if isinstance(x, scanner.Reject)]
+            assert(len(rejects) == 1)
+            assert("series/Lost/bonus.mkv" not in entries)
+
+    def test_now_rejected(self, store, monkeypatch):
+        """
+        Tests a rescan after a file that was valid is now rejected.
+        Expected to yield the deletion of its document, then the reject,
+        and to drop it from the manifest.
+        """
+        entries = {}
+        list(manifest.rescan(store, entries))
+        key = "movies/Alien.1979.mkv"
+        entries[key] = entries[key]._replace(mtime=0)
+        def reject(batches, root=None, processes=0, probed=False):
+            for files in batches:
+                for file in files:
+                    yield scanner.Reject(file, ["not valid"])
+        monkeypatch.setattr(scanner, "build_batches", reject)
+        changes = list(manifest.rescan(store, entries))
+        assert(len(changes) == 2)
+        assert(changes[0].action == manifest.DELETED)
+        assert(changes[0].file == str(store / key))
+        assert(isinstance(changes[1], scanner.Reject))
+        assert(key not in entries)
+        assert(list(manifest.rescan(store, entries)) == [changes[1]])
+
+
+class TestLoadSave:
+    """
+    A test suite for mediadb.scan.manifest.load and save
+    """
+
+    def test_round_trip(self, store, tmp_path):
+        """
+        Tests that a saved manifest is loaded back identical.
+        Expected to work.
+        """
+        file = tmp_path / "manifest.json.gz"
+        assert(manifest.load(file) == {})
+        entries = {}
+        list(manifest.rescan(store, entries))
+        manifest.save(file, entries)
+        assert(manifest.load(file) == entries)
+
+    def test_version(self, tmp_path):
+        """
+        Tests loading a manifest of another version.
+        Expected to raise ValueError.
+        """
+        file = tmp_path / "manifest.json.gz"
+        with gzip.open(file, "wt") as f:
+            f.write('{"version": 0, "entries": {}}')
+        with pytest.raises(ValueError):
+            manifest.load(file)
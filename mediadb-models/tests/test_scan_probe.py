@@ -0,0 +1,249 @@
+import pytest
+import os
+import struct
+import mediadb.scan.probe as probe
+import mediadb.scan.scanner as scanner
+import mediadb.models.constants as const
+
+
+def element(identifier: int, *content: bytes) \
+    -> bytes:
+    """
+    Encodes an EBML element.
+    Args:
+        identifier: the element identifier.
+        content: the element content, as one or more parts.
+    Returns: the element, with an 8 bytes size.
+    """
+    data = b"".join(content)
+    return identifier.to_bytes((identifier.bit_length() + 7) // 8, "big") + \
+           (len(data) | 1 << 56).to_bytes(8, "big") + data
+
+
+def track(kind: int, language: bytes = None, default: int = None) \
+    -> bytes:
+    """
+    Encodes a Matroska track entry.
+    Args:
+        kind: the track type.
+        language: the track language, the Matroska default if None.
+        default: the track default flag, the Matroska default if None.
+    Returns: the element.
+    """
+    return element(0xAE,
+                   element(0x83, bytes([kind])),
+                   b"" if language is None else element(0x22B59C, language),
+                   b"" if default is None else element(0x88, bytes([default])))
+
+
+def mkv(tracks: bytes, seek: bool = False) \
+    -> bytes:
+    """
+    Encodes a Matroska file.
+    Args:
+        tracks: the track entries.
+        seek: whether to write the tracks after a cluster, with a seek
+            head giving their position.
+    Returns: the file content.
+    """
+    header = element(0x1A45DFA3, element(0x4282, b"matroska"))
+    tracks = element(0x1654AE6B, tracks)
+    cluster = element(0x1F43B675, os.urandom(1 << 16))
+    if not seek:
+        return header + element(0x18538067, tracks, cluster)
+    seek_head = element(0x114D9B74,
+                        element(0x4DBB,
+                                element(0x53AB, b"\x16\x54\xae\x6b"),
+                                element(0x53AC, bytes(8))))
+    position = len(seek_head) + len(cluster)
+    seek_head = seek_head[:-8] + position.to_bytes(8, "big")
+    return header + element(0x18538067, seek_head, cluster, tracks)
+
+
+def box(kind: bytes, *content: bytes) \
+    -> bytes:
+    """
+    Encodes an ISO BMFF box.
+    Args:
+        kind: the box type.
+        content: the box content, as one or more parts.
+    Returns: the box.
+    """
+    data = b"".join(content)
+    return struct.pack(">I4s", len(data) + 8, kind) + data
+
+
+def trak(handler: bytes, language: str) \
+    -> bytes:
+    """
+    Encodes an ISO BMFF track box.
+    Args:
+        handler: the track handler type.
+        language: the ISO 639-2 track language.
+    Returns: the box.
+    """
+    packed = sum((ord(x) - 0x60) << shift
+                 for x, shift in zip(language, (10, 5, 0)))
+    mdhd = box(b"mdhd", bytes(20), struct.pack(">HH", packed, 0))
+    hdlr = box(b"hdlr", bytes(8), handler, bytes(13))
+    return box(b"trak", box(b"tkhd", bytes(84)),
+               box(b"mdia", mdhd, hdlr))
+
+
+@pytest.fixture
+def mp4(tmp_path):
+    """
+    Creates an MP4 file with its movie box after its media data.
+    Returns: the file path.
+    """
+    file = tmp_path / "movie.mp4"
+    file.write_bytes(box(b"ftyp", b"isom", bytes(4)) +
+                     box(b"mdat", os.urandom(1 << 16)) +
+                     box(b"moov",
+                         box(b"mvhd", bytes(100)),
+                         trak(b"vide", "und"),
+                         trak(b"soun", "fra"),
+                         trak(b"soun", "eng"),
+                         trak(b"sbtl", "eng")))
+    return file
+
+
+class TestProbe:
+    """
+    A test suite for mediadb.scan.probe.probe
+    """
+
+    def test_mkv(self, tmp_path):
+        """
+        Tests probing a Matroska file.
+        Expected to give the default tracks first, English for the
+        tracks without language.
+        """
+        file = tmp_path / "movie.mkv"
+        file.write_bytes(mkv(track(1, b"und") +
+                             track(2, b"eng", default=0) +
+                             track(2, b"fre") +
+                             track(17, b"ger", default=0) +
+                             track(17)))
+        assert(probe.probe(file) ==
+               probe.Tracks((const.Language.FRENCH,
+                             const.Language.ENGLISH),
+                            (const.Language.ENGLISH,
+                             const.Language.GERMAN)))
+
+    def test_mkv_seek(self, tmp_path):
+        """
+        Tests probing a Matroska file with its tracks after a cluster.
+        Expected to find the tracks through the seek head.
+        """
+        file = tmp_path / "movie.mkv"
+        file.write_bytes(mkv(track(2, b"ger"), seek=True))
+        assert(probe.probe(file).audio == (const.Language.GERMAN,))
+
+    def test_mp4(self, mp4):
+        """
+        Tests probing an MP4 file.
+        Expected to give the tracks in file order.
+        """
+        assert(probe.probe(mp4) ==
+               probe.Tracks((const.Language.FRENCH,
+                             const.Language.ENGLISH),
+                            (const.Language.ENGLISH,)))
+
+    def test_mp4_truncated(self, tmp_path):
+        """
+        Tests probing an MP4 file ending with an empty mdhd box, then
+        truncated within its header.
+        Expected to give an unknown language in both cases.
+        """
+        mdia = box(b"mdia", box(b"hdlr", bytes(8), b"soun", bytes(13)),
+                   box(b"mdhd"))
+        data = box(b"ftyp", b"isom", bytes(4)) + \
+            box(b"moov", box(b"trak", box(b"tkhd", bytes(84)), mdia))
+        file = tmp_path / "movie.mp4"
+        file.write_bytes(data)
+        assert(probe.probe(file).audio == (const.Language.UNKNOWN,))
+        file.write_bytes(data[:-4])
+        assert(probe.probe(file).audio == (const.Language.UNKNOWN,))
+
+    def test_not_supported(self, tmp_path):
+        """
+        Tests probing files that are neither Matroska nor MP4 files.
+        Expected to raise a ValueError.
+        """
+        for content in (b"", b"RIFF\x00\x00\x00\x00AVI LIST",
+                        b"\x1a\x45\xdf\xa3\x00"):
+            file = tmp_path / "movie.avi"
+            file.write_bytes(content)
+            with pytest.raises(ValueError):
+                probe.probe(file)
+
+
+class TestTracks:
+    """
+    A test suite for mediadb.scan.probe.Tracks
+    """
+
+    def test_fields(self):
+        """
+        Tests the document fields of tracks.
+        Expected to skip the tracks of unknown language.
+        """
+        tracks = probe.Tracks((const.Language.UNKNOWN,
+                               const.Language.FRENCH),
+                              (const.Language.UNKNOWN,))
+        assert(tracks.fields() == {"language": const.Language.FRENCH})
+        assert(probe.Tracks().fields() == {})
+
+
+class TestCache:
+    """
+    A test suite for mediadb.scan.probe.Cache
+    """
+
+    def test_cache(self, mp4, tmp_path):
+        """
+        Tests probing files through a cache.
+        Expected to probe files again only when changed, renamed files
+        being found, and to evict the least recently used files.
+        """
+        cache = probe.Cache(max_size=2)
+        tracks = cache.probe(mp4)
+        assert(tracks.audio[0] == const.Language.FRENCH)
+        os.rename(mp4, tmp_path / "renamed.mp4")
+        assert(cache.probe(tmp_path / "renamed.mp4") is tracks)
+        assert(len(cache) == 1)
+        other = tmp_path / "other.avi"
+        other.write_bytes(b"RIFF")
+        assert(cache.probe(other) is None)
+        assert(cache.probe(tmp_path / "missing.mkv") is None)
+        assert(len(cache) == 2)
+        third = tmp_path / "third.mkv"
+        third.write_bytes(mkv(track(2, b"ger")))
+        assert(cache.probe(third).audio == (const.Language.GERMAN,))
+        assert(len(cache) == 2)
+
+
+class TestScan:
+    """
+    A test suite for mediadb.scan.scanner.scan with probing
+    """
+
+    def test_probed(self, mp4):
+        """
+        Tests scanning files with their tracks probed.
+        Expected to fill the languages the paths do not give.
+        """
+        root = mp4.parent
+        os.makedirs(root / "movies")
+        os.rename(mp4, root / "movies" / "Heat.1995.mp4")
+        (root / "movies" / "Ronin.1998.VOSTEN.mkv").write_bytes(
+            mkv(track(2, b"ger") + track(17, b"fre")))
+        documents = {x.title: x
+                     for x in scanner.scan(root / "movies", probed=True)}
+        assert(documents["Heat"].language == const.Language.FRENCH)
+        assert(documents["Heat"].subtitles == const.Language.ENGLISH)
+        assert(documents["Ronin"].language == const.Language.GERMAN)
+        assert(documents["Ronin"].subtitles == const.Language.ENGLISH)
+        documents = list(scanner.scan(root / "movies"))
+        assert(all(x.language == const.Language.UNKNOWN for x in documents))
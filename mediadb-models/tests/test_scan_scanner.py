@@ -0,0 +1,90 @@
+import pytest
+import mediadb.scan.scanner as scanner
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Creates a small file store.
+    Returns: the store root.
+    """
+    files = ["movies/Alien (1979)/Alien.1979.mkv",
+             "movies/Alien (1979)/cover.jpg",
+             "movies/.hidden/Hidden.mkv",
+             "docs/Bowling.for.Columbine.2002.mp4",
+             "series/Lost/Season 1/Lost.S01E01.mkv",
+             "series/Lost/Season 1/Lost.S01E02.mkv",
+             "series/Lost/bonus.mkv"]
+    for file in files:
+        file = tmp_path / file
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+    return tmp_path
+
+
+class TestListDir:
+    """
+    A test suite for mediadb.scan.scanner.list_dir
+    """
+
+    def test_list(self, store):
+        """
+        Tests listing a directory with a video file, a non video file and
+        a hidden directory.
+        Expected to work.
+        """
+        subdirs, files = scanner.list_dir(str(store / "movies"))
+        assert(subdirs == [str(store / "movies" / "Alien (1979)")])
+        assert(files == [])
+        subdirs, files = scanner.list_dir(str(store / "movies" / "Alien (1979)"))
+        assert(subdirs == [])
+        assert(files == [str(store / "movies" / "Alien (1979)" / "Alien.1979.mkv")])
+
+    def test_missing(self, tmp_path):
+        """
+        Tests listing a directory that does not exist.
+        Expected to be empty.
+        """
+        assert(scanner.list_dir(str(tmp_path / "missing")) == ([], []))
+
+
+class TestScan:
+    """
+    A test suite for mediadb.scan.scanner.scan
+    """
+
+    def check(self, documents, store):
+        """
+        Checks the documents scanned from the store fixture.
+        """
+        rejects = [x for x in documents if isinstance(x, scanner.Reject)]
+        documents = sorted([x for x in documents
+                            if isinstance(x, medias.VideoMedia)],
+                           key=lambda x: str(x.file))
+        assert([x.file for x in rejects] ==
+               [str(store / "series" / "Lost" / "bonus.mkv")])
+        assert([x.type for x in documents] == [const.VideoType.DOCUMENTARY,
+                                               const.VideoType.MOVIE,
+                                               const.VideoType.SERIE,
+                                               const.VideoType.SERIE])
+        assert([x.title for x in documents] == ["Bowling for Columbine",
+                                                "Alien",
+                                                "Lost",
+                                                "Lost"])
+        assert([x.episode for x in documents[2:]] == [1, 2])
+
+    def test_threads(self, store):
+        """
+        Tests a scan with documents built in the calling process.
+        Expected to work.
+        """
+        self.check(list(scanner.scan(store, threads=4)), store)
+
+    def test_processes(self, store):
+        """
+        Tests a scan with documents built in a process pool.
+        Expected to work.
+        """
+        self.check(list(scanner.scan(store, threads=2, processes=2)), store)
@@ -0,0 +1,228 @@
+import pytest
+import os
+import errno
+import json
+import shutil
+import mediadb.scan.watch as watch
+import mediadb.scan.manifest as manifest
+import mediadb.scan.scanner as scanner
+import mediadb.scan.cache as cache
+import mediadb.store.catalogue as catalogue
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Creates a small file store.
+    Returns: the store root.
+    """
+    root = tmp_path / "store"
+    for file in ["movies/Alien.1979.mkv",
+                 "series/Lost/Season 1/Lost.S01E01.mkv"]:
+        file = root / file
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch()
+    return root
+
+
+def actions(changes) \
+    -> list:
+    """
+    Returns: the (action, file name) pairs of changes, sorted.
+    """
+    return sorted((x.action, os.path.basename(x.file)) for x in changes
+                  if isinstance(x, manifest.Change))
+
+
+def too_many(self, directory):
+    """
+    Fails to watch a directory as inotify does past its watch limit.
+    """
+    raise OSError(errno.ENOSPC, "No space left on device")
+
+
+@pytest.fixture(params=[False, True], ids=["inotify", "polled"])
+def watcher(request, store):
+    """
+    Watches the file store, with inotify and by polling.
+    Returns: the watcher.
+    """
+    with watch.Watcher(store,
+                       polled=request.param,
+                       delay=0.05,
+                       interval=0.05) as w:
+        yield w
+
+
+class TestWatcher:
+    """
+    A test suite for mediadb.scan.watch.Watcher
+    """
+
+    def test_changes(self, watcher, store):
+        """
+        Tests watching a file store being changed.
+        Expected to give the documents created, changed and deleted,
+        a batch of events at a time.
+        """
+        batches = watcher.batches()
+        assert(actions(next(batches)) ==
+               [("created", "Alien.1979.mkv"),
+                ("created", "Lost.S01E01.mkv")])
+        season = store / "series" / "Lost" / "Season 2"
+        season.mkdir()
+        for episode in (1, 2, 3):
+            (season / f"Lost.S02E0{episode}.mkv").write_bytes(b"video")
+        (season / "Lost.S02.nfo").touch()
+        assert(actions(next(batches)) ==
+               [("created", f"Lost.S02E0{x}.mkv") for x in (1, 2, 3)])
+        os.rename(store / "movies" / "Alien.1979.mkv",
+                  store / "movies" / "Aliens.1986.mkv")
+        (store / "series" / "Lost" / "Season 1" / "Lost.S01E01.mkv") \
+            .write_bytes(b"video")
+        assert(actions(next(batches)) ==
+               [("created", "Aliens.1986.mkv"),
+                ("deleted", "Alien.1979.mkv")])
+        os.rename(store / "series", store / "shows")
+        changes = next(batches)
+        assert(len(changes) == 8)
+        assert(sum(x.action == "created" for x in changes) == 4)
+        assert(watcher.files == {str(x) for x in store.rglob("*.mkv")})
+
+    def test_rejects(self, watcher, store):
+        """
+        Tests watching files from which no document can be built.
+        Expected to give a Reject and no document.
+        """
+        batches = watcher.batches()
+        next(batches)
+        (store / "series" / "Lost" / "bonus.mkv").touch()
+        changes = next(batches)
+        assert(len(changes) == 1)
+        assert(isinstance(changes[0], scanner.Reject))
+        assert(len(watcher.entries) == 2)
+
+    def test_manifest(self, store):
+        """
+        Tests watching a file store from the entries of a scan.
+        Expected to give the changes since the scan only.
+        """
+        entries = {}
+        list(manifest.rescan(store, entries))
+        os.remove(store / "movies" / "Alien.1979.mkv")
+        (store / "movies" / "Heat.1995.mkv").touch()
+        with watch.Watcher(store, entries, delay=0.05) as w:
+            assert(actions(next(w.batches())) ==
+                   [("created", "Heat.1995.mkv"),
+                    ("deleted", "Alien.1979.mkv")])
+
+    def test_cache(self, store, monkeypatch):
+        """
+        Tests watching a file store whose documents were cached by a
+        scan.
+        Expected to give the same documents without building them
+        again, and to cache the documents of the new files.
+        """
+        with cache.Cache() as c:
+            scanned = list(c.scan(store))
+            def fail(files, root=None, probed=False):
+                if files:
+                    raise AssertionError("no file should be built")
+                return []
+            monkeypatch.setattr(scanner, "build_documents", fail)
+            with watch.Watcher(store, delay=0.05, cached=c) as w:
+                changes = next(w.batches())
+            assert(sorted((x.document for x in changes),
+                          key=lambda x: x.file) ==
+                   sorted(scanned, key=lambda x: x.file))
+            monkeypatch.undo()
+            (store / "movies" / "Heat.1995.mkv").touch()
+            with watch.Watcher(store, delay=0.05, cached=c) as w:
+                assert(len(next(w.batches())) == 3)
+            assert(len(c) == 3)
+
+    def test_cache_relative(self, store, monkeypatch):
+        """
+        Tests watching a file store cached by a scan of its relative
+        path.
+        Expected to build no document again.
+        """
+        monkeypatch.chdir(store.parent)
+        with cache.Cache() as c:
+            scanned = list(c.scan(store.name))
+            def fail(files, root=None, probed=False):
+                if files:
+                    raise AssertionError("no file should be built")
+                return []
+            monkeypatch.setattr(scanner, "build_documents", fail)
+            with watch.Watcher(store.name, delay=0.05, cached=c) as w:
+                changes = next(w.batches())
+            assert(sorted((x.document for x in changes),
+                          key=lambda x: x.file) ==
+                   sorted(scanned, key=lambda x: x.file))
+
+    def test_overflow(self, store, monkeypatch):
+        """
+        Tests watching more directories than inotify allows.
+        Expected to fall back to polling.
+        """
+        monkeypatch.setattr(watch.Inotify, "add", too_many)
+        with watch.Watcher(store, delay=0.05, interval=0.05) as w:
+            batches = w.batches()
+            assert(len(next(batches)) == 2)
+            assert(isinstance(w.watcher, watch.Poller))
+            (store / "movies" / "Heat.1995.mkv").touch()
+            assert(actions(next(batches)) ==
+                   [("created", "Heat.1995.mkv")])
+
+    def test_overflow_deleted(self, store, monkeypatch):
+        """
+        Tests falling back to polling when a watched directory was
+        deleted since listed.
+        Expected to poll the other directories and to delete the
+        documents of the deleted one.
+        """
+        with watch.Watcher(store, delay=0.05, interval=0.05) as w:
+            batches = w.batches()
+            assert(len(next(batches)) == 2)
+            shutil.rmtree(store / "movies")
+            (store / "new").mkdir()
+            monkeypatch.setattr(watch.Inotify, "add", too_many)
+            w._watch(str(store / "new"))
+            assert(isinstance(w.watcher, watch.Poller))
+            assert(str(store / "movies") not in w.watcher.directories)
+            assert(str(store / "new") in w.watcher.directories)
+            assert(actions(next(batches)) ==
+                   [("deleted", "Alien.1979.mkv")])
+
+
+class TestOutputs:
+    """
+    A test suite for mediadb.scan.watch.JSONLOutput and CatalogueOutput
+    """
+
+    @pytest.mark.parametrize("kind", ["jsonl", "db"])
+    def test_apply(self, kind, store, tmp_path):
+        """
+        Tests keeping an output in sync with a watched file store.
+        Expected to hold the documents of the files, those of the other
+        files under the root being removed once synced.
+        """
+        file = tmp_path / f"documents.{kind}"
+        output = watch.JSONLOutput if kind == "jsonl" \
+                 else watch.CatalogueOutput
+        stale = str(store / "movies" / "Ronin.1998.mkv")
+        other = "/elsewhere/Heat.1995.mkv"
+        with output(file) as o:
+            o.apply([manifest.Change(manifest.CREATED, x,
+                     scanner.build_document(x)) for x in (stale, other)])
+        with watch.Watcher(store, delay=0.05) as w, output(file) as o:
+            o.apply(next(w.batches()))
+            o.retain(store, w.files)
+        if kind == "jsonl":
+            files = [json.loads(x)["file"]
+                     for x in file.read_text().splitlines()]
+        else:
+            with catalogue.Catalogue(file) as c:
+                files = [str(x.file) for x in c]
+        assert(sorted(files) == sorted(w.files | {other}))
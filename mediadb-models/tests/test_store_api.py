@@ -0,0 +1,183 @@
+import pytest
+import json
+import sqlite3
+import asyncio
+import threading
+import http.client
+import mediadb.store.api as api
+import mediadb.store.catalogue as catalogue
+
+
+@pytest.fixture
+def server(tmp_path):
+    """
+    Runs an API server in a thread, over an empty catalogue.
+    Returns: the server port.
+    """
+    loop = asyncio.new_event_loop()
+    s = api.Server(tmp_path / "catalogue.db")
+    port = loop.run_until_complete(s.start(port=0))
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    yield port
+    asyncio.run_coroutine_threadsafe(s.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def request(port: int,
+            method: str,
+            target: str,
+            body: object = None) \
+    -> tuple:
+    """
+    Sends a request to a server.
+    Args:
+        port: the server port.
+        method: the request method.
+        target: the request target.
+        body: the request body, encoded in JSON if not None.
+    Returns: the response status and body.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request(method, target,
+                       None if body is None else json.dumps(body))
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+
+def series(count: int) \
+    -> list:
+    """
+    Returns: the records of the episodes of a serie.
+    """
+    return [{"type": "serie",
+             "title": "Lost",
+             "language": "EN",
+             "season": 1 + i // 10,
+             "episode": 1 + i % 10,
+             "file": f"/series/Lost/Lost.{i}.mkv"}
+            for i in range(count)]
+
+
+class TestServer:
+    """
+    A test suite for mediadb.store.api.Server
+    """
+
+    def test_validate(self, server):
+        """
+        Tests validating documents.
+        Expected to answer the valid documents and the errors of the
+        others.
+        """
+        status, body = request(server, "POST", "/validate",
+                               {"type": "movie", "title": "Alien",
+                                "file": "/movies/alien.mkv"})
+        assert(status == 200)
+        assert(json.loads(body)["language"] == "unknown")
+        status, body = request(server, "POST", "/validate",
+                               {"type": "movie", "title": "",
+                                "file": "/movies/alien.mkv"})
+        assert(status == 422)
+        assert(json.loads(body)["errors"][0].startswith("movie.title"))
+        status, _ = request(server, "GET", "/validate")
+        assert(status == 405)
+        status, _ = request(server, "GET", "/missing")
+        assert(status == 404)
+
+    def test_pages(self, server):
+        """
+        Tests creating documents then getting them page by page.
+        Expected to give them all once, in creation order.
+        """
+        for record in series(25):
+            status, _ = request(server, "POST", "/medias", record)
+            assert(status == 201)
+        files = []
+        cursor = None
+        while True:
+            target = "/medias?title=Lost&limit=10"
+            if cursor is not None:
+                target += f"&cursor={cursor}"
+            status, body = request(server, "GET", target)
+            assert(status == 200)
+            page = json.loads(body)
+            files += [x["file"] for x in page["documents"]]
+            cursor = page["cursor"]
+            if cursor is None:
+                break
+        assert(files == [x["file"] for x in series(25)])
+        status, body = request(server, "GET", "/medias?min_season=3")
+        assert([x["episode"] for x in json.loads(body)["documents"]] ==
+               [1, 2, 3, 4, 5])
+
+    def test_stream(self, server):
+        """
+        Tests getting documents in JSONL format.
+        Expected to stream them all, or up to the limit.
+        """
+        for record in series(25):
+            request(server, "POST", "/medias", record)
+        status, body = request(server, "GET", "/medias?format=jsonl")
+        assert(status == 200)
+        lines = body.decode().splitlines()
+        assert([json.loads(x)["file"] for x in lines] ==
+               [x["file"] for x in series(25)])
+        _, body = request(server, "GET", "/medias?format=jsonl&limit=7")
+        assert(len(body.decode().splitlines()) == 7)
+
+    def test_invalid_query(self, server):
+        """
+        Tests getting documents with invalid query parameters.
+        Expected to answer a 400 error.
+        """
+        for target in ("/medias?language=klingon",
+                       "/medias?season=first",
+                       "/medias?color=red",
+                       "/medias?limit=0",
+                       "/medias?format=xml"):
+            status, body = request(server, "GET", target)
+            assert(status == 400)
+            assert(json.loads(body)["errors"])
+
+    def test_keep_alive(self, server):
+        """
+        Tests sending several requests on a connection.
+        Expected to answer them all.
+        """
+        connection = http.client.HTTPConnection("127.0.0.1", server)
+        for record in series(3):
+            connection.request("POST", "/medias", json.dumps(record))
+            assert(connection.getresponse().read())
+        connection.request("GET", "/medias?format=jsonl")
+        assert(len(connection.getresponse().read().splitlines()) == 3)
+        connection.close()
+
+    def test_catalogue_error(self, server, monkeypatch):
+        """
+        Tests adding and getting documents while the catalogue fails,
+        e.g. locked by another process, then once it works again.
+        Expected to answer a 500 error, then to answer as usual.
+        """
+        def locked(*args, **kwargs):
+            raise sqlite3.OperationalError("database is locked")
+        monkeypatch.setattr(catalogue.Catalogue, "add", locked)
+        monkeypatch.setattr(catalogue.Catalogue, "page", locked)
+        for method, target, body in (("POST", "/medias", series(1)[0]),
+                                     ("GET", "/medias", None),
+                                     ("GET", "/medias?format=jsonl", None)):
+            status, data = request(server, method, target, body)
+            assert(status == 500)
+            assert(json.loads(data) == {"errors": ["database is locked"]})
+        monkeypatch.undo()
+        assert(request(server, "POST", "/medias", series(1)[0])[0] == 201)
+        status, data = request(server, "GET", "/medias?format=jsonl")
+        assert(status == 200)
+        assert(len(data.splitlines()) == 1)
+        status, data = request(server, "GET", "/medias?format=jsonl&limit=0")
+        assert(status == 200)
+        assert(data == b"")
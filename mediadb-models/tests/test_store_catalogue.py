@@ -0,0 +1,292 @@
+import pytest
+import pathlib as path
+import mediadb.store.catalogue as catalogue
+import mediadb.store.query as query
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def documents():
+    """
+    Returns: a list of media documents of all types.
+    """
+    return [medias.Movie(title="Alien",
+                         language=const.Language.ENGLISH,
+                         subtitles=const.Language.FRENCH,
+                         file=path.Path("/movies/alien.mkv")),
+            medias.Documentary(title="Bowling for Columbine",
+                               file=path.Path("/docs/bowling.mkv"))] + \
+           [medias.Serie(title="Generation Kill",
+                         language=const.Language.FRENCH,
+                         season=season,
+                         episode=episode,
+                         episode_name=f"Episode {episode}",
+                         file=path.Path(f"/series/gk.s{season}e{episode}.mkv"))
+            for season in (3, 1, 2)
+            for episode in (2, 1)]
+
+
+class TestCatalogue:
+    """
+    A test suite for mediadb.store.catalogue.Catalogue
+    """
+
+    def test_round_trip(self, documents):
+        """
+        Tests that the documents added are got back identical.
+        Expected to work.
+        """
+        with catalogue.Catalogue(batch_size=3) as c:
+            assert(c.add_many(documents) == len(documents))
+            assert(len(c) == len(documents))
+            assert(list(c) == documents)
+            for document in documents:
+                assert(c.get(document.file) == document)
+            assert(c.get("/missing.mkv") is None)
+
+    def test_replace(self, documents):
+        """
+        Tests adding a document of a file already in the catalogue.
+        Expected to replace it.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            movie = medias.Movie(title="Aliens", file="/movies/alien.mkv")
+            c.add(movie)
+            assert(len(c) == len(documents))
+            assert(c.get("/movies/alien.mkv") == movie)
+
+    def test_remove(self, documents):
+        """
+        Tests removing documents.
+        Expected to work.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            assert(c.remove("/movies/alien.mkv"))
+            assert(not c.remove("/movies/alien.mkv"))
+            assert(c.remove_many(["/docs/bowling.mkv", "/missing.mkv"]) == 1)
+            assert(len(c) == len(documents) - 2)
+
+    def test_episodes(self, documents):
+        """
+        Tests getting the episodes of a serie, in a range of seasons.
+        Expected to work, in season and episode order.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            episodes = [(x.season, x.episode) for x in
+                        c.episodes("Generation Kill")]
+            assert(episodes == [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)])
+            episodes = [(x.season, x.episode) for x in
+                        c.episodes("Generation Kill", 2)]
+            assert(episodes == [(2, 1), (2, 2), (3, 1), (3, 2)])
+            episodes = [(x.season, x.episode) for x in
+                        c.episodes("Generation Kill", 1, 1)]
+            assert(episodes == [(1, 1), (1, 2)])
+            assert(list(c.episodes("Alien")) == [])
+
+    def test_indexes(self):
+        """
+        Tests that the lookups are index searches rather than scans.
+        Expected to work.
+        """
+        queries = ["SELECT * FROM medias WHERE file = ?",
+                   "SELECT * FROM medias WHERE title = ?",
+                   "SELECT * FROM medias WHERE type = ?",
+                   "SELECT * FROM medias WHERE language = ?",
+                   "SELECT * FROM medias WHERE subtitles = ?",
+                   "SELECT * FROM medias WHERE title = ? AND season > ?"]
+        with catalogue.Catalogue() as c:
+            for sql in queries:
+                plan = c.connection.execute(f"EXPLAIN QUERY PLAN {sql}",
+                                            (1,) * sql.count("?")).fetchall()
+                assert(all(x[-1].startswith("SEARCH") for x in plan))
+
+    def test_persistence(self, documents, tmp_path):
+        """
+        Tests that the documents are persisted in a WAL mode database.
+        Expected to work.
+        """
+        file = tmp_path / "catalogue.db"
+        with catalogue.Catalogue(file) as c:
+            c.add_many(documents)
+            mode = c.connection.execute("PRAGMA journal_mode").fetchone()[0]
+            assert(mode == "wal")
+        with catalogue.Catalogue(file) as c:
+            assert(list(c) == documents)
+
+    def test_find(self, documents):
+        """
+        Tests finding and counting documents with queries.
+        Expected to work.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            q = query.Query(type=const.VideoType.SERIE,
+                            title="Generation Kill",
+                            language=const.Language.FRENCH,
+                            subtitles=None) \
+                     .filter(query.SEASON >= 2) \
+                     .order_by(query.SEASON, query.EPISODE)
+            assert([(x.season, x.episode) for x in c.find(q)] ==
+                   [(2, 1), (2, 2), (3, 1), (3, 2)])
+            assert(c.count(q) == 4)
+            assert(len(list(c.find(q.limit(3)))) == 3)
+            assert(c.count(q.limit(3)) == 4)
+            q = query.Query(subtitles=const.Language.FRENCH)
+            assert(list(c.find(q)) == documents[:1])
+            assert(c.count(query.Query()) == len(documents))
+            assert(list(c.find(query.Query(title="Aliens"))) == [])
+
+    def test_page(self, documents):
+        """
+        Tests getting the documents matching a query page by page.
+        Expected to give them all once in insertion order, the pages
+        not shifting when documents are added or replaced.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            q = query.Query(type=const.VideoType.SERIE).limit(4)
+            page, key = c.page(q)
+            assert(page == documents[2:6])
+            c.add(medias.Serie(title="Generation Kill",
+                               season=4,
+                               episode=1,
+                               file="/series/gk.s4e1.mkv"))
+            c.add(documents[2])
+            page, key = c.page(q, key)
+            assert(page == documents[6:] + [c.get("/series/gk.s4e1.mkv")])
+            assert(key is None)
+            assert(c.page(q.limit(10)) == (list(c.find(
+                            query.Query(type=const.VideoType.SERIE))), None))
+            with pytest.raises(ValueError):
+                c.page(q.order_by(query.SEASON))
+
+    def test_find_indexes(self):
+        """
+        Tests that a query on a serie episodes uses the (title, season,
+        episode) index.
+        Expected to work.
+        """
+        with catalogue.Catalogue() as c:
+            q = query.Query(title="Generation Kill",
+                            language=const.Language.FRENCH) \
+                     .filter(query.SEASON >= 3)
+            sql, params = q.to_sql("SELECT * FROM medias")
+            plan = c.connection.execute(f"EXPLAIN QUERY PLAN {sql}",
+                                        params).fetchall()
+            assert(all(x[-1].startswith("SEARCH") for x in plan))
+
+    def test_search(self, documents):
+        """
+        Tests searching documents by title and episode name with typos.
+        Expected to work, best matches first.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            c.add(medias.Movie(title="Alien Resurrection",
+                               file="/movies/alien4.mkv"))
+            results = c.search("alien resurection")
+            assert(results[0][1].title == "Alien Resurrection")
+            assert(results[1][1].title == "Alien")
+            assert(results[0][0] > results[1][0])
+            results = c.search("genration kil", limit=2)
+            assert(len(results) == 2)
+            assert(all(x.title == "Generation Kill" for _, x in results))
+            results = c.search("episod 2")
+            assert(results[0][1].episode_name == "Episode 2")
+            assert(c.search("predator") == [])
+            assert(c.search("") == [])
+
+    def test_search_incremental(self, documents, tmp_path):
+        """
+        Tests that the search index follows the documents added and removed,
+        in small and bulk changes, and by other connections.
+        Expected to work.
+        """
+        file = tmp_path / "catalogue.db"
+        with catalogue.Catalogue(file) as c1, catalogue.Catalogue(file) as c2:
+            c1.add_many(documents)
+            assert(c2.search("bowling")[0][1].title == "Bowling for Columbine")
+            c1.add(medias.Movie(title="Predator", file="/movies/predator.mkv"))
+            assert(c2.search("predatr")[0][1].title == "Predator")
+            c2.remove("/docs/bowling.mkv")
+            assert(c1.search("bowling") == [])
+            c2.batch_size = catalogue.SMALL_CHANGE + 1
+            c2.add_many([medias.Movie(title=f"Friday the {i}th",
+                                      file=f"/movies/friday{i}.mkv")
+                         for i in range(catalogue.SMALL_CHANGE + 1)])
+            assert(not c1.vocabulary.is_synced())
+            assert(c1.search("fridya")[0][1].title.startswith("Friday"))
+            c2.add(medias.Movie(title="Predator 2",
+                                file="/movies/predator.mkv"))
+            assert(c1.search("predator")[0][1].title == "Predator 2")
+
+    def test_search_existing(self, documents, tmp_path):
+        """
+        Tests opening a catalogue created without full-text index.
+        Expected to index the existing documents.
+        """
+        file = tmp_path / "catalogue.db"
+        with catalogue.Catalogue(file) as c:
+            c.add_many(documents)
+            c.connection.execute("DROP TABLE medias_search")
+        with catalogue.Catalogue(file) as c:
+            assert(c.search("alien")[0][1].title == "Alien")
+
+    def test_under(self, documents):
+        """
+        Tests getting the documents under a directory.
+        Expected to work, with a range of the file index.
+        """
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            c.add(medias.Movie(title="Alien", file="/movies0/alien.mkv"))
+            assert([x.file for x in c.under("/movies")] ==
+                   [path.Path("/movies/alien.mkv")])
+            assert(len(list(c.under(path.Path("/series/")))) == 6)
+            assert(len(list(c.under("/"))) == len(documents) + 1)
+            assert(list(c.under("/mov")) == [])
+            plan = c.connection.execute(
+                        "EXPLAIN QUERY PLAN SELECT * FROM medias "
+                        "WHERE file >= ? AND file < ? ORDER BY file",
+                        ("/a/", "/a0")).fetchall()
+            assert(all(x[-1].startswith("SEARCH") for x in plan))
+
+    def test_fingerprints(self, documents):
+        """
+        Tests recording fingerprints and getting the duplicates.
+        Expected to group the documents sharing a fingerprint only.
+        """
+        with catalogue.Catalogue(batch_size=2) as c:
+            c.add_many(documents)
+            assert(list(c.duplicates()) == [])
+            n = c.set_fingerprints([("/movies/alien.mkv", "sample:1:a"),
+                                    ("/series/gk.s1e1.mkv", "sample:1:a"),
+                                    ("/docs/bowling.mkv", "sample:2:b"),
+                                    ("/missing.mkv", "sample:1:a")])
+            assert(n == 3)
+            assert(c.get("/docs/bowling.mkv").fingerprint == "sample:2:b")
+            groups = list(c.duplicates())
+            assert(len(groups) == 1)
+            assert([x.file for x in groups[0]] ==
+                   [path.Path("/movies/alien.mkv"),
+                    path.Path("/series/gk.s1e1.mkv")])
+            assert(all(x.fingerprint == "sample:1:a" for x in groups[0]))
+
+    def test_fingerprints_existing(self, documents, tmp_path):
+        """
+        Tests opening a catalogue created without fingerprints.
+        Expected to add the fingerprint column.
+        """
+        file = tmp_path / "catalogue.db"
+        with catalogue.Catalogue(file) as c:
+            c.add_many(documents)
+            c.connection.execute("DROP INDEX medias_fingerprint")
+            c.connection.execute("ALTER TABLE medias DROP COLUMN fingerprint")
+        with catalogue.Catalogue(file) as c:
+            assert(list(c) == documents)
+            c.set_fingerprints([("/movies/alien.mkv", "sample:1:a")])
+            assert(c.get("/movies/alien.mkv").fingerprint == "sample:1:a")
@@ -0,0 +1,115 @@
+import pytest
+import pathlib as path
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+pa = pytest.importorskip("pyarrow")
+import mediadb.store.columnar as columnar
+
+
+@pytest.fixture
+def documents():
+    """
+    Returns: a list of media documents of all types.
+    """
+    return [medias.Movie(title="Alien",
+                         language=const.Language.ENGLISH,
+                         subtitles=const.Language.FRENCH,
+                         file=path.Path("/movies/alien.mkv")),
+            medias.Documentary(title="Bowling for Columbine",
+                               file=path.Path("/docs/bowling.mkv")),
+            medias.Serie(title="Generation Kill",
+                         language=const.Language.FRENCH,
+                         season=1,
+                         episode=3,
+                         episode_name="Screwby",
+                         file=path.Path("/series/gk.s01e03.mkv"))]
+
+
+class TestTable:
+    """
+    A test suite for mediadb.store.columnar.to_table and from_table
+    """
+
+    def test_layout(self, documents):
+        """
+        Tests the columns of the documents.
+        Expected to dictionary encode the enumerations, the serie fields
+        being null for the other types.
+        """
+        table = columnar.to_table(documents, batch_size=2)
+        assert(table.schema == columnar.SCHEMA)
+        assert(table.num_rows == 3)
+        assert(pa.types.is_dictionary(table.schema.field("language").type))
+        assert(table.column("type").to_pylist() ==
+               ["movie", "documentary", "serie"])
+        assert(table.column("subtitles").to_pylist() == ["FR", None, None])
+        assert(table.column("season").to_pylist() == [None, None, 1])
+        assert(table.column("file").to_pylist()[0] == "/movies/alien.mkv")
+
+    def test_round_trip(self, documents):
+        """
+        Tests converting documents into a table and back, trusting or
+        validating them.
+        Expected to give back the same documents.
+        """
+        table = columnar.to_table(documents, batch_size=2)
+        assert(columnar.from_table(table) == documents)
+        assert(columnar.from_table(table, validate=True) == documents)
+
+    def test_large_numbers(self):
+        """
+        Tests converting a serie of a season and an episode over 32 bits.
+        Expected to give back the same document.
+        """
+        documents = [medias.Serie(title="Generation Kill",
+                                  season=2 ** 33,
+                                  episode=2 ** 40,
+                                  file=path.Path("/series/gk.mkv"))]
+        table = columnar.to_table(documents)
+        assert(columnar.from_table(table, validate=True) == documents)
+
+    def test_invalid(self, documents):
+        """
+        Tests validating a table with an invalid document.
+        Expected to raise ValueError.
+        """
+        table = columnar.to_table(documents)
+        table = table.set_column(1, "title", pa.array(["", "a", "b"]))
+        with pytest.raises(ValueError):
+            columnar.from_table(table, validate=True)
+
+
+class TestFile:
+    """
+    A test suite for mediadb.store.columnar.write and read
+    """
+
+    @pytest.mark.parametrize("fmt", columnar.FORMATS)
+    def test_round_trip(self, documents, tmp_path, fmt):
+        """
+        Tests writing and reading documents in all formats.
+        Expected to give back the same documents, the format being
+        recognized.
+        """
+        file = tmp_path / f"catalogue.{fmt}"
+        assert(columnar.write(iter(documents), file, fmt, batch_size=2) == 3)
+        assert(columnar.read_table(file).schema == columnar.SCHEMA)
+        assert(columnar.read(file) == documents)
+
+    def test_empty(self, tmp_path):
+        """
+        Tests writing no documents.
+        Expected to give back no documents.
+        """
+        file = tmp_path / "catalogue.parquet"
+        assert(columnar.write([], file) == 0)
+        assert(columnar.read(file) == [])
+
+    def test_bad_format(self, documents, tmp_path):
+        """
+        Tests writing in an unsupported format.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            columnar.write(documents, tmp_path / "catalogue.csv", "csv")
@@ -0,0 +1,65 @@
+import mediadb.store.paths as paths
+
+
+class TestSplit:
+    """
+    A test suite for mediadb.store.paths.split
+    """
+
+    def test_values(self):
+        assert(paths.split("/media/series") == ["/", "media", "series"])
+        assert(paths.split("media/series/") == ["media", "series"])
+        assert(paths.split("/") == ["/"])
+        assert(paths.split("") == [])
+
+
+class TestDirectories:
+    """
+    A test suite for mediadb.store.paths.Directories
+    """
+
+    def test_add(self):
+        """
+        Tests adding directories sharing prefixes.
+        Expected to store each directory once and give back their path.
+        """
+        directories = paths.Directories()
+        s1 = directories.add("/media/series/Generation Kill/Season 1")
+        s2 = directories.add("/media/series/Generation Kill/Season 2")
+        assert(directories.add("/media/series/Generation Kill/Season 1/")
+               == s1)
+        assert(len(directories) == 7)
+        assert(directories[s1] == "/media/series/Generation Kill/Season 1")
+        assert(directories[s2] == "/media/series/Generation Kill/Season 2")
+        assert(directories[directories.add("series")] == "series")
+        assert(directories[paths.ROOT] == "")
+        assert(directories.add("") == paths.ROOT)
+
+    def test_get(self):
+        """
+        Tests getting the identifier of known and unknown directories.
+        Expected to work, None for unknown directories.
+        """
+        directories = paths.Directories()
+        identifier = directories.add("/media/movies")
+        assert(directories.get("/media/movies") == identifier)
+        assert(directories.get("/media") == directories.parents[identifier])
+        assert(directories.get("/media/docs") is None)
+        assert(directories.get("media/movies") is None)
+
+    def test_subtree(self):
+        """
+        Tests getting the directories under a directory.
+        Expected to work.
+        """
+        directories = paths.Directories()
+        s1 = directories.add("/media/series/Generation Kill/Season 1")
+        s2 = directories.add("/media/series/Generation Kill/Season 2")
+        movies = directories.add("/media/movies")
+        series = directories.get("/media/series")
+        assert(directories.subtree(s1) == {s1})
+        assert(directories.subtree(series) ==
+               {series, directories.get("/media/series/Generation Kill"),
+                s1, s2})
+        assert(movies not in directories.subtree(series))
+        assert(directories.subtree(paths.ROOT) == set(range(len(directories))))
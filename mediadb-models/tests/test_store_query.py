@@ -0,0 +1,105 @@
+import pytest
+import mediadb.store.query as query
+import mediadb.models.constants as const
+
+
+class TestField:
+    """
+    A test suite for mediadb.store.query.Field
+    """
+
+    def test_operators(self):
+        """
+        Tests that comparisons build conditions.
+        Expected to work.
+        """
+        assert((query.SEASON == 1) == query.Condition("season", "==", 1))
+        assert((query.SEASON != 1) == query.Condition("season", "!=", 1))
+        assert((query.SEASON < 1) == query.Condition("season", "<", 1))
+        assert((query.SEASON <= 1) == query.Condition("season", "<=", 1))
+        assert((query.SEASON > 1) == query.Condition("season", ">", 1))
+        assert((query.SEASON >= 1) == query.Condition("season", ">=", 1))
+        assert(query.EPISODE.in_([1, 2]) ==
+               query.Condition("episode", "in", (1, 2)))
+
+    def test_conversion(self):
+        """
+        Tests that values are converted to the field type, enumerations
+        being given by value.
+        Expected to work.
+        """
+        assert((query.LANGUAGE == "FR").value == "FR")
+        assert((query.LANGUAGE == const.Language.FRENCH).value == "FR")
+        assert((query.LANGUAGE == "fre").value == "FR")
+        assert((query.SUBTITLES == "English").value == "EN")
+        assert((query.TYPE == const.VideoType.SERIE).value == "serie")
+        assert((query.SEASON == "3").value == 3)
+        assert((query.SUBTITLES == None).value is None)
+
+    def test_invalid(self):
+        """
+        Tests invalid values and comparisons.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            query.LANGUAGE == "XX"
+        with pytest.raises(ValueError):
+            query.TYPE == None
+        with pytest.raises(ValueError):
+            query.SEASON == "three"
+        with pytest.raises(ValueError):
+            query.SUBTITLES > None
+        with pytest.raises(ValueError):
+            query.SEASON.condition("~", 1)
+
+
+class TestQuery:
+    """
+    A test suite for mediadb.store.query.Query
+    """
+
+    def test_empty(self):
+        """
+        Tests compiling a query without conditions.
+        Expected to select everything.
+        """
+        assert(query.Query().to_sql("SELECT *") == ("SELECT *", []))
+
+    def test_to_sql(self):
+        """
+        Tests compiling a query with all the kinds of conditions.
+        Expected to work.
+        """
+        q = query.Query(type=const.VideoType.SERIE,
+                        title="Generation Kill",
+                        subtitles=None) \
+                 .filter(query.SEASON >= 3, language="FR") \
+                 .filter(query.EPISODE.in_([1, 2])) \
+                 .order_by(query.SEASON, query.EPISODE) \
+                 .limit(10)
+        sql, params = q.to_sql("SELECT *")
+        assert(sql == "SELECT * WHERE type = ? AND title = ? AND "
+                      "subtitles IS NULL AND season >= ? AND language = ? "
+                      "AND episode IN (?, ?) ORDER BY season, episode LIMIT ?")
+        assert(params == ["serie", "Generation Kill", 3, "FR", 1, 2, 10])
+
+    def test_immutable(self):
+        """
+        Tests that building a query does not modify the original one.
+        Expected to work.
+        """
+        q1 = query.Query(title="Alien")
+        q2 = q1.filter(query.SEASON > 1).order_by(query.TITLE).limit(1)
+        assert(q1.to_sql("SELECT *") == ("SELECT * WHERE title = ?",
+                                         ["Alien"]))
+        assert(len(q2.conditions) == 2)
+
+    def test_unknown_field(self):
+        """
+        Tests a query on a field that cannot be queried.
+        Expected to raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            query.Query(file="/dir/file.media")
+        with pytest.raises(ValueError):
+            query.Query().filter(episode_name="Screwby")
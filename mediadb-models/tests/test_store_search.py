@@ -0,0 +1,105 @@
+import pytest
+import sqlite3
+import mediadb.store.search as search
+
+
+class TestNormalize:
+    """
+    A test suite for mediadb.store.search.normalize and tokens
+    """
+
+    def test_values(self):
+        assert(search.normalize("Amélie") == "amelie")
+        assert(search.normalize("  Alien:  RESURRECTION! ") ==
+               "alien resurrection")
+        assert(search.normalize("L'Été_meurtrier") == "l ete meurtrier")
+        assert(search.tokens("Alien³ - 2nd cut") == ["alien3", "2nd", "cut"])
+        assert(search.tokens("") == [])
+
+
+class TestEditDistance:
+    """
+    A test suite for mediadb.store.search.edit_distance
+    """
+
+    def test_values(self):
+        assert(search.edit_distance("alien", "alien") == 0)
+        assert(search.edit_distance("resurection", "resurrection") == 1)
+        assert(search.edit_distance("alein", "alien") == 1)
+        assert(search.edit_distance("kitten", "sitting") == 3)
+        assert(search.edit_distance("", "abc") == 3)
+
+
+class TestDeletes:
+    """
+    A test suite for mediadb.store.search.deletes
+    """
+
+    def test_values(self):
+        assert(search.deletes("abc", 0) == {"abc"})
+        assert(search.deletes("abc", 1) == {"abc", "bc", "ac", "ab"})
+        assert(search.deletes("abc", 2) == {"abc", "bc", "ac", "ab",
+                                            "a", "b", "c"})
+
+
+class TestVocabulary:
+    """
+    A test suite for mediadb.store.search.Vocabulary
+    """
+
+    @pytest.fixture
+    def index(self):
+        """
+        Returns: a connection to a database with a table of indexed words.
+        """
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE words (word TEXT)")
+        connection.executemany("INSERT INTO words VALUES (?)",
+                               [("alien",), ("aliens",), ("resurrection",),
+                                ("the",), ("thing",)])
+        return connection
+
+    def test_lookup(self, index):
+        """
+        Tests looking up exact and misspelled words, once the vocabulary is
+        synchronized with the index.
+        Expected to work, closest words first.
+        """
+        vocabulary = search.Vocabulary(index, "SELECT word FROM words")
+        vocabulary.touch()
+        assert(vocabulary.lookup("alien") == [("alien", 0), ("aliens", 1)])
+        assert(vocabulary.lookup("alein") == [("alien", 1)])
+        assert(vocabulary.lookup("resurection") == [("resurrection", 1)])
+        assert(vocabulary.lookup("resurecton") == [("resurrection", 2)])
+        assert(vocabulary.lookup("thr") == [])
+        assert(vocabulary.lookup("the") == [("the", 0)])
+        assert(vocabulary.is_synced())
+
+    def test_incremental(self, index):
+        """
+        Tests adding and removing words and synchronizing the vocabulary
+        after bulk changes of the index.
+        Expected to work.
+        """
+        vocabulary = search.Vocabulary(index, "SELECT word FROM words")
+        vocabulary.add(["predator"])
+        assert(vocabulary.lookup("predatr") == [("predator", 1)])
+        vocabulary.remove(["predator"])
+        assert(vocabulary.lookup("predator") == [])
+        index.execute("DELETE FROM words WHERE word = 'aliens'")
+        vocabulary.touch()
+        assert(not vocabulary.is_synced())
+        assert(vocabulary.lookup("alien") == [("alien", 0)])
+        assert(vocabulary.is_synced())
+
+
+class TestExpression:
+    """
+    A test suite for mediadb.store.search.expression
+    """
+
+    def test_values(self):
+        assert(search.expression([["alien", "aliens"], ["resurrection"]],
+                                 "AND") ==
+               '("alien" OR "aliens") AND ("resurrection")')
+        assert(search.expression([["alien"]], "OR") == '("alien")')
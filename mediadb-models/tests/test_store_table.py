@@ -0,0 +1,115 @@
+import pytest
+import pathlib as path
+import mediadb.store.table as table
+import mediadb.store.catalogue as catalogue
+import mediadb.store.query as query
+import mediadb.models.medias as medias
+import mediadb.models.constants as const
+
+
+@pytest.fixture
+def documents():
+    """
+    Returns: a list of media documents of all types.
+    """
+    return [medias.Movie(title="Alien",
+                         language=const.Language.ENGLISH,
+                         subtitles=const.Language.FRENCH,
+                         file=path.Path("/movies/alien.mkv")),
+            medias.Documentary(title="Bowling for Columbine",
+                               file=path.Path("bowling.mkv"))] + \
+           [medias.Serie(title="Generation Kill",
+                         language=const.Language.FRENCH,
+                         season=season,
+                         episode=episode,
+                         episode_name=f"Episode {episode}" if episode > 1
+                                      else None,
+                         file=path.Path(f"/series/gk/s{season}e{episode}.mkv"))
+            for season in (3, 1, 2)
+            for episode in (2, 1)]
+
+
+class TestMediaTable:
+    """
+    A test suite for mediadb.store.table.MediaTable
+    """
+
+    def test_round_trip(self, documents):
+        """
+        Tests that the documents added are got back identical.
+        Expected to work.
+        """
+        t = table.MediaTable(documents)
+        assert(len(t) == len(documents))
+        assert(list(t) == documents)
+        assert(t[-1] == documents[-1])
+        with pytest.raises(IndexError):
+            t[len(documents)]
+
+    def test_append(self, documents):
+        """
+        Tests adding documents one by one, after a bulk addition.
+        Expected to work.
+        """
+        t = table.MediaTable(documents[:3])
+        for document in documents[3:]:
+            t.append(document)
+        assert(list(t) == documents)
+
+    def test_large_numbers(self, documents):
+        """
+        Tests adding series of a season and an episode over 32 bits.
+        Expected to give them back and to find them.
+        """
+        large = [medias.Serie(title="Generation Kill",
+                              season=2 ** 33,
+                              episode=2 ** 40 + episode,
+                              file=path.Path(f"/series/gk/e{episode}.mkv"))
+                 for episode in (1, 2)]
+        t = table.MediaTable(documents)
+        t.extend(large)
+        assert(list(t) == documents + large)
+        assert(list(t.find(query.Query(season=2 ** 33))) == large)
+        assert(list(t.find(query.Query().filter(
+                    query.EPISODE > 2 ** 40 + 1))) == large[1:])
+
+    def test_find(self, documents):
+        """
+        Tests finding and counting documents with queries.
+        Expected to give the same documents as the catalogue.
+        """
+        queries = [query.Query(),
+                   query.Query(type=const.VideoType.SERIE,
+                               title="Generation Kill",
+                               language=const.Language.FRENCH,
+                               subtitles=None)
+                        .filter(query.SEASON >= 2)
+                        .order_by(query.SEASON, query.EPISODE),
+                   query.Query(subtitles=const.Language.FRENCH),
+                   query.Query().filter(query.SUBTITLES != None),
+                   query.Query().filter(query.SEASON < 3,
+                                        query.EPISODE.in_([2]))
+                        .order_by(query.SEASON).limit(2),
+                   query.Query().filter(query.TITLE > "B")
+                        .order_by(query.SEASON, query.TITLE),
+                   query.Query(title="Aliens")]
+        t = table.MediaTable(documents)
+        with catalogue.Catalogue() as c:
+            c.add_many(documents)
+            for q in queries:
+                assert(list(t.find(q)) == list(c.find(q)))
+                assert(t.count(q) == c.count(q))
+
+    def test_under(self, documents):
+        """
+        Tests finding the documents under a directory.
+        Expected to work, in insertion order.
+        """
+        t = table.MediaTable(documents)
+        t.append(medias.Movie(title="Alien", file="/movies0/alien.mkv"))
+        assert(list(t.under("/movies")) == documents[:1])
+        assert(list(t.under(path.Path("/series"))) == documents[2:])
+        assert(list(t.under("/series/gk/")) == documents[2:])
+        assert(len(list(t.under("/"))) == len(documents))
+        assert(list(t.under("")) == list(t))
+        assert(list(t.under("/mov")) == [])